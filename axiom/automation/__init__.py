@@ -74,6 +74,7 @@ def generate_payloads(instance):
             # Add the variables included in this batch
             payload.variables = list(batch)
             payload.output_frequency = instance['frequency']
+            payload.output_frequencies = None
 
             # Write the payload file, with a batch identifier
             output_filename = payload.get_filename().replace('.json', f'.{bbb}.json')
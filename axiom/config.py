@@ -90,16 +90,112 @@ class Config(dict):
         self.update(defaults)
 
 
+class ReadOnlyMixin:
+
+    """Mixin that blocks in-place modification of a dict or list. Copies (i.e. dict(obj), obj.copy()) are mutable."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f'{type(self).__name__} is read-only, make a copy before modifying it.')
+
+    __setitem__ = __delitem__ = __setattr__ = __iadd__ = __imul__ = _read_only
+    update = pop = popitem = clear = setdefault = _read_only
+    append = extend = insert = remove = sort = reverse = _read_only
+
+
+class ReadOnlyDict(ReadOnlyMixin, dict):
+
+    """Read-only dictionary."""
+
+    def copy(self):
+        return dict(self)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class ReadOnlyList(ReadOnlyMixin, list):
+
+    """Read-only list."""
+
+    def copy(self):
+        return list(self)
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+class ReadOnlyConfig(ReadOnlyMixin, Config):
+
+    """Read-only configuration object, as returned from load_config."""
+
+    def copy(self):
+        return Config(self)
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def freeze(obj):
+    """Recursively convert dicts and lists into read-only equivalents.
+
+    Args:
+        obj (object): Object to freeze.
+
+    Returns:
+        object: Read-only object.
+    """
+    if isinstance(obj, dict):
+        return ReadOnlyDict({key: freeze(value) for key, value in obj.items()})
+
+    if isinstance(obj, list):
+        return ReadOnlyList(freeze(value) for value in obj)
+
+    return obj
+
+
+# Process-wide cache of loaded configuration, keyed by name (see load_config)
+_CONFIG_CACHE = dict()
+
+
+def _get_mtime(filepath):
+    """Get the modification time of a file, None if it does not exist."""
+    try:
+        return os.stat(filepath).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 def load_config(config_name, defaults_only=False):
     """Shorthand to load a configuration object.
 
+    Configuration is cached for the life of the process and reloaded when the installed or user file is modified.
+    The object returned is shared and therefore read-only, copy anything that needs modifying.
+
     Args:
         config_name (str): Name of the config file.
         defaults_only (bool, optional): Load only the defaults. Defaults to False.
 
     Returns:
-        axiom.Config: Configuration object.
+        axiom.config.ReadOnlyConfig: Configuration object.
     """
+    default_filepath = os.path.join(au.get_installed_data_root(), f'{config_name}.json')
+    user_filepath = None if defaults_only else os.path.join(au.get_user_data_root(), f'{config_name}.json')
+
+    key = (config_name, default_filepath, user_filepath)
+    mtimes = (_get_mtime(default_filepath), _get_mtime(user_filepath) if user_filepath else None)
+
+    cached = _CONFIG_CACHE.get(key)
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+
     config = Config()
     config.load(config_name, defaults_only=defaults_only)
-    return config
\ No newline at end of file
+    config = ReadOnlyConfig({key: freeze(value) for key, value in config.items()})
+
+    _CONFIG_CACHE[key] = (mtimes, config)
+    return config
+
+
+def clear_config_cache():
+    """Clear the configuration cache, forcing the next load_config to read from disk."""
+    _CONFIG_CACHE.clear()
@@ -2,30 +2,44 @@
 from genericpath import isfile
 import os
 import argparse
+import time
 from datetime import datetime
 from uuid import uuid4
 import xarray as xr
 import axiom.utilities as au
 import axiom.drs.utilities as adu
+import axiom.drs.instrumentation as ain
+import axiom.drs.checkpoints as acp
+import axiom.drs.staging as ast
+import axiom.drs.encoding as aen
 from axiom.drs.domain import Domain
+from axiom.drs.index import InputIndex
+import axiom.drs.runtimes as art
 import axiom.schemas as axs
 import json
 import sys
+import signal
 from distributed import Client, LocalCluster
 from axiom.config import load_config
 from axiom import __version__ as axiom_version
 from axiom.exceptions import NoFilesToProcessException, DRSContextInterpolationException
 import shutil
-from dask.distributed import progress, wait
+from concurrent.futures import CancelledError
+from dask.distributed import progress, wait, as_completed, get_client
+import dask
 import numpy as np
-from axiom.supervisor import Supervisor
+from axiom.supervisor import Watchdog
 
 
-def consume(json_filepath):
+def consume(json_filepath, client=None):
     """Consume a json payload (for message passing)
 
     Args:
         json_filepath (str): Path to the JSON file.
+        client (distributed.Client, optional): Dask client to reuse between payloads (see start_client). Defaults to None.
+
+    Returns:
+        bool : True if the payload was consumed, False if it was skipped.
     """
     logger = au.get_logger(__name__)
 
@@ -33,39 +47,466 @@ def consume(json_filepath):
     consumed_filepath = json_filepath.replace('.json', '.consumed')
     if os.path.isfile(consumed_filepath):
         logger.info(
-            f'{json_filepath} has already been consumed and needs to be cleaned up by another process. Terminating.')
-        sys.exit()
+            f'{json_filepath} has already been consumed and needs to be cleaned up by another process. Skipping.')
+        return False
+
+    config = load_config('drs')
 
-    # Check if the file is locked
-    if au.is_locked(json_filepath):
+    # Lock the file, unless it is locked by another process (stale locks are reclaimed)
+    if not au.try_lock(json_filepath, stale_seconds=config.locking['stale_seconds']):
+        owner = au.read_lock(json_filepath)
         logger.info(
-            f'{json_filepath} is locked, possibly by another process. Terminating.')
-        sys.exit()
+            f'{json_filepath} is locked by another process ({owner}). Skipping.')
+        return False
+
+    try:
+
+        # Convert to dict
+        payload = json.loads(open(json_filepath, 'r').read())
+
+        # Allow rerun of failed variables (do this after all other variables have been processed!)
+        failures_path = f'{json_filepath}_001.failed'
+        if config.rerun_failures and os.path.exists(failures_path):
+            failed_variables = open(failures_path, 'r').read().splitlines()
+            payload['variables'] = failed_variables
+
+        # Process, touching the lock periodically to show that it is not stale. Reruns of the payload share a run id,
+        # so outputs completed by an earlier attempt are skipped even with overwrite (see checkpoints in drs.json).
+        with au.Heartbeat(json_filepath, seconds=config.locking['heartbeat_seconds']):
+            process_multi(client=client, run_id=acp.get_payload_run_id(json_filepath), **payload)
+
+        # Mark consumed by touching another file.
+        au.touch(consumed_filepath)
+
+    # Unlock, also releasing the payload for another process should this one crash. A lock reclaimed by another
+    # process (i.e. after the heartbeat stalled) is theirs and is left in place.
+    finally:
+        if not au.release_lock(json_filepath):
+            logger.warning(f'{json_filepath} is no longer locked by this process, leaving the lock in place.')
+
+    return True
+
+
+def drain(path, max_payloads=None, max_seconds=None, client=None):
+    """Consume payloads from a directory until there are none left or a budget is used.
+
+    Payloads are claimed one at a time with the same .lock/.consumed files as consume, so any number of jobs can
+    drain the same payloads. A payload is not started if the longest payload so far would overrun max_seconds.
+
+    Args:
+        path (str): Globbable path of payload files.
+        max_payloads (int, optional): Maximum number of payloads to consume. Defaults to None (no limit).
+        max_seconds (float, optional): Time budget in seconds. Defaults to None (no limit).
+        client (distributed.Client, optional): Dask client to reuse between payloads (see start_client). Defaults to None.
+
+    Returns:
+        list : Payloads consumed by this process.
+    """
+    logger = au.get_logger(__name__)
+
+    timer = au.Timer()
+    timer.start()
+
+    consumed = list()
+    attempted = set()
+    longest = 0
+
+    # Release the claim if the scheduler terminates the job (i.e. walltime)
+    def _terminate(signum, frame):
+        raise SystemExit(f'Terminated by signal {signum}.')
+
+    previous_handler = signal.signal(signal.SIGTERM, _terminate)
+
+    try:
+
+        # Keep listing until there is nothing left to claim, other processes may add or release payloads.
+        claimed = True
+        while claimed:
+
+            claimed = False
+
+            for json_filepath in sorted(au.auto_glob(path)):
+
+                if json_filepath in attempted:
+                    continue
+
+                if max_payloads is not None and len(consumed) >= max_payloads:
+                    logger.info(f'Payload budget of {max_payloads} used.')
+                    return consumed
+
+                elapsed = timer.elapsed()
+                if max_seconds is not None and elapsed + longest > max_seconds:
+                    logger.info(f'Time budget of {max_seconds} seconds used ({elapsed:.0f} elapsed).')
+                    return consumed
+
+                started = timer.elapsed()
+
+                try:
+                    success = consume(json_filepath, client=client)
+
+                # Don't claim it again, it will likely fail the same way
+                except Exception as ex:
+                    log_exception(f'Unable to consume {json_filepath}, moving on.', ex)
+                    attempted.add(json_filepath)
+                    continue
+
+                # Consumed or locked by another process
+                if not success:
+                    continue
+
+                attempted.add(json_filepath)
+                longest = max(longest, timer.elapsed() - started)
+                consumed.append(json_filepath)
+                claimed = True
+
+                logger.info(f'Consumed {json_filepath} ({len(consumed)} so far).')
+
+        logger.info('No payloads left to claim.')
+        return consumed
+
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+
+
+def start_client():
+    """Start a dask client as configured in drs.json.
+
+    The client attaches to dask.scheduler_address if set, otherwise a LocalCluster is started from dask.cluster
+    (with the local directory on PBS_JOBFS when available).
+
+    Returns:
+        distributed.Client : Dask client, None if dask is disabled.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    if not config.dask['enable']:
+        return None
+
+    # Attach to an existing scheduler
+    scheduler_address = config.dask.get('scheduler_address')
+    if scheduler_address:
+        logger.info(f'Connecting to dask scheduler at {scheduler_address}.')
+        client = Client(scheduler_address)
+
+    else:
+        logger.info('Starting dask client.')
+
+        cluster_config = dict(config.dask['cluster'])
+
+        # Add PBS_JOBFS if set
+        if 'PBS_JOBFS' in os.environ.keys():
+            cluster_config['local_directory'] = os.getenv('PBS_JOBFS')
+
+        cluster = LocalCluster(**cluster_config)
+        client = Client(cluster)
+
+    logger.info(client)
+    return client
+
+
+def stop_client(client):
+    """Close a dask client and, if it started one, its LocalCluster.
+
+    Args:
+        client (distributed.Client): Dask client from start_client, may be None.
+    """
+    if client is None:
+        return
+
+    cluster = client.cluster
+    client.close()
+
+    if cluster is not None:
+        cluster.close()
+
+
+def find_input_files(input_files, variables, start_year):
+    """Glob and filter the input files for the variables and start year.
+
+    Args:
+        input_files (str or list): Globbable string or list of filepaths.
+        variables (str or list): Variable(s) that the files are required for.
+        start_year (int): Start year.
+
+    Returns:
+        list : List of filepaths to load.
+
+    Raises:
+        NoFilesToProcessException : When there is nothing left to process after filtering.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    logger.info('Searching for files matching the following path:')
+    logger.info(input_files)
+
+    # Query the input index rather than globbing, if enabled
+    if config.input_index['enable'] and isinstance(input_files, str):
+        with ain.span('index'):
+            input_files = find_indexed_input_files(input_files, variables, start_year)
+
+    else:
+        with ain.span('glob'):
+            input_files = au.auto_glob(input_files)
+
+        with ain.span('filter'):
+            input_files = filter_input_files(input_files, variables, start_year)
+
+    # Is there anything left to process?
+    if len(input_files) == 0:
+        raise NoFilesToProcessException()
+
+    # Dump filepaths prior to loading
+    if config.get('dump_filepaths_prior_to_loading', default=False):
+        logger.debug('Dumping filepaths prior to loading... there may be a lot.')
+        for input_file in input_files:
+            logger.debug(input_file)
+
+    return input_files
+
+
+def filter_input_files(input_files, variables, start_year):
+    """Filter the input files by variable name and year (see filename_filtering in drs.json).
+
+    Args:
+        input_files (list): List of filepaths.
+        variables (str or list): Variable(s) that the files are required for.
+        start_year (int): Start year.
+
+    Returns:
+        list : List of filtered filepaths.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    num_files = len(input_files)
+    logger.debug(f'{num_files} to consider before filtering.')
+
+    filtering = config.filename_filtering
+
+    # Filter by those that actually have the variable in the filename.
+    _variables = variables if filtering['variable'] else None
+
+    # Filter by those that actually have the year in the filename (plus or minus an offset).
+    years = None
+    if filtering['year']:
+        years = (start_year - filtering['year_offset'], start_year + filtering['year_offset'])
+
+    if _variables is not None or years is not None:
+        input_files = adu.filter_filepaths(input_files, variables=_variables, years=years, variable_regex=filtering['variable_regex'])
+        num_files = len(input_files)
+        logger.debug(f'{num_files} to consider after filename filtering.')
+
+    return input_files
+
 
-    # Lock the file
-    au.lock(json_filepath)
+def find_indexed_input_files(input_files, variables, start_year):
+    """Query the input index for the input files (see input_index in drs.json).
 
-    # Convert to dict
-    payload = json.loads(open(json_filepath, 'r').read())
+    Args:
+        input_files (str): Globbable string.
+        variables (str or list): Variable(s) that the files are required for.
+        start_year (int): Start year.
 
-    # Allow rerun of failed variables (do this after all other variables have been processed!)
+    Returns:
+        list : List of filepaths.
+    """
+    logger = au.get_logger(__name__)
     config = load_config('drs')
-    failures_path = f'{json_filepath}_001.failed'
-    if config.rerun_failures and os.path.exists(failures_path):
-        failed_variables = open(failures_path, 'r').read().splitlines()
-        payload['variables'] = failed_variables
 
-    # Process
-    process_multi(**payload)
+    with InputIndex(config.input_index['filepath']) as index:
+
+        logger.info(f'Querying input index at {index.filepath}')
+
+        # Incremental update, only changed directories will be listed
+        if config.input_index['auto_update']:
+            index.update(input_files, read_time_axis=config.input_index['read_time_axis'])
+
+        years = None
+        if config.filename_filtering['year']:
+            offset = config.filename_filtering['year_offset']
+            years = (start_year - offset, start_year + offset)
+
+        input_files = index.query(
+            input_files,
+            variables=variables if config.filename_filtering['variable'] else None,
+            years=years
+        )
+
+    num_files = len(input_files)
+    logger.debug(f'{num_files} to consider after querying the index.')
+
+    return input_files
+
+
+def load_project_and_model(project, model):
+    """Load the project and model configuration.
+
+    Args:
+        project (str): Project key from projects.json.
+        model (str): Model key from models.json.
+
+    Returns:
+        tuple : Project and model configuration dictionaries.
+    """
+    logger = au.get_logger(__name__)
+
+    # Load project config
+    logger.info(f'Loading project config ({project})')
+    project_config = load_config('projects')[project]
 
-    # Mark consumed by touching another file.
-    au.touch(consumed_filepath)
+    # Ensure it actually exists
+    assert isinstance(project_config, dict), f'Project {project} not found, does it exist in projects.json?'
+
+    # Load model config
+    logger.info(f'Loading model config ({model})')
+    model_config = load_config('models')[model]
+
+    # Ensure it actually exists
+    assert isinstance(model_config, dict), f'Model {model} not found, does it exist in models.json?'
 
-    # Unlock
-    au.unlock(json_filepath)
+    return project_config, model_config
 
-    # Explicit exit (#125)
-    sys.exit(0)
+
+def load_domain(domain):
+    """Load a domain.
+
+    Args:
+        domain (str or Domain): Registered domain (domains.json), domain directive or Domain object.
+
+    Returns:
+        Domain : Domain.
+    """
+    logger = au.get_logger(__name__)
+
+    logger.info(f'Parsing domain {domain}')
+    if isinstance(domain, str):
+
+        # Registered domain
+        if adu.is_registered_domain(domain):
+            domain = adu.get_domain(domain)
+
+        # Attempt to parse
+        else:
+            domain = Domain.from_directive(domain)
+
+    # We will only otherwise accept a domain object.
+    elif isinstance(domain, Domain) == False:
+        raise Exception(f'Unable to parse domain {domain}.')
+
+    logger.debug('Domain: ' + domain.to_directive())
+    return domain
+
+
+def get_preprocess(preprocessor, preprocess_args, variables, domain):
+    """Get the function applied to each input file as it is opened.
+
+    The model preprocessor is followed by the selection of the variables (and bounds) and the domain, so that only
+    data within them is ever read or persisted.
+
+    Args:
+        preprocessor (str): Data preprocessor to activate on input data, may be None.
+        preprocess_args (dict): Keyword arguments for the preprocessor, the arguments to process().
+        variables (str or list): Variable(s) to select.
+        domain (Domain): Domain to select.
+
+    Returns:
+        callable : Preprocess function for open_mfdataset.
+    """
+    _preprocessor = adu.load_preprocessor(preprocessor)
+
+    def preprocess(ds, *args, **kwargs):
+        ds = _preprocessor(ds, **preprocess_args)
+        ds = adu.select_variables(ds, variables)
+        return domain.subset_xarray(ds, drop=True)
+
+    return preprocess
+
+
+def _get_input_chunks(filepath, variables, output_frequencies):
+    """Get the chunks to load the inputs with (see input_chunking and streaming in drs.json).
+
+    When streaming, the chunks are bounded by the chunk budget as well, as the inputs are no longer persisted and each
+    input chunk is read whole by the tasks that write the outputs.
+
+    Args:
+        filepath (str): A representative input file.
+        variables (str or list): Variable(s) to be processed.
+        output_frequencies (str or list): Output frequencies.
+
+    Returns:
+        dict : Chunks by dimension name (see adu.get_input_chunks), None to use xarray.open_dataset.chunks in drs.json.
+    """
+    config = load_config('drs')
+
+    targets = list()
+
+    if config.input_chunking['enable']:
+        targets.append(config.input_chunking['target_mb'])
+
+    if config.streaming['enable']:
+        targets.append(config.streaming['chunk_budget_mb'])
+
+    if len(targets) == 0:
+        return None
+
+    return adu.get_input_chunks(filepath, variables, output_frequencies, min(targets))
+
+
+def load_inputs(input_files, start_year, preprocess, fixed=False, chunks=None):
+    """Load the input files and subset them to the start year.
+
+    Args:
+        input_files (list): List of filepaths.
+        start_year (int): Start year.
+        preprocess (callable): Preprocessing function applied to each file on load.
+        fixed (bool, optional): Data is time-invariant, only the first file will be loaded. Defaults to False.
+        chunks (dict, optional): Chunks to load with (see adu.get_input_chunks). Defaults to None (xarray.open_dataset.chunks in drs.json).
+
+    Returns:
+        xarray.Dataset : Lazily-loaded data.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    logger.debug(
+        'Loading files into distributed memory, this may take some time.')
+
+    # Load the open_dataset configuration
+    open_dataset_kwargs = config['xarray']['open_dataset'].copy()
+
+    if chunks is not None:
+        open_dataset_kwargs['chunks'] = chunks
+
+    with ain.span('open') as record:
+
+        # Account for fixed variables, if defined
+        if fixed:
+
+            # Load just the first file
+            ds = xr.open_dataset(input_files[0], **open_dataset_kwargs)
+            ds = preprocess(ds)
+            record['bytes_read'] = ain.get_filesizes(input_files[:1])
+
+        else:
+
+            ds = xr.open_mfdataset(
+                input_files,
+                preprocess=preprocess,
+                **open_dataset_kwargs
+            )
+            record['bytes_read'] = ain.get_filesizes(input_files)
+
+        record['files'] = 1 if fixed else len(input_files)
+
+    # Subset temporally
+    if not adu.is_time_invariant(ds):
+        logger.info(f'Subsetting times to {start_year}')
+        time_slice = slice(f'{start_year}-01-01', f'{start_year}-12-31')
+        ds = ds.sel(time=time_slice, drop=True)
+
+    return ds
 
 
 def process(
@@ -82,6 +523,7 @@ def process(
     overwrite=True,
     preprocessor=None,
     postprocessor=None,
+    run_id=None,
     **kwargs
 ):
     """Method to process a single variable/domain/resolution combination.
@@ -94,11 +536,12 @@ def process(
         model (str): Model metadata to apply (loaded from user config).
         start_year (int): Start year.
         end_year (int): End year.
-        output_frequency (str): Output frequency to process.
+        output_frequency (str or list): Output frequency to process, or several to resample in a cascade (see adu.resample_cascade).
         input_resolution (float, optional): Input resolution in km. Leave black to auto-detect from filepaths.
         overwrite (bool): Overwrite the data at the destination. Defaults to True.
         preprocessor (str): Data preprocessor to activate on input data. Defaults to None.
         postprocesser (str): Data postprocess to activate before writing data. Defaults to None.
+        run_id (str, optional): Identifies reruns of the same payload (see acp.get_payload_run_id), whose completed outputs are skipped even with overwrite. Defaults to None.
         **kwargs: Additional keyword arguments used in metadata interpolation.
     """
 
@@ -118,39 +561,11 @@ def process(
         jobid = os.getenv('PBS_JOBID')
         logger.info(f'My PBS_JOBID is {jobid}')
 
-    logger.info('Searching for files matching the following path:')
-    logger.info(input_files)
+    # Label the spans of this variable
+    ain.set_context(variable=variable, output_frequency=output_frequency, start_year=start_year)
 
-    # Get a list of the potential filepaths
-    input_files = au.auto_glob(input_files)
-    num_files = len(input_files)
-    logger.debug(f'{num_files} to consider before filtering.')
-
-    # Filter by those that actually have the variable in the filename.
-    if config.filename_filtering['variable']:
-
-        input_files = adu.filter_by_variable_name(input_files, variable)
-        num_files = len(input_files)
-        logger.debug(
-            f'{num_files} to consider after filename variable filtering.')
-
-    # Filter by those that actually have the year in the filename (plus or minus an offset).
-    if config.filename_filtering['year']:
-        
-        input_files = filter_years(
-            input_files, start_year, offset=config.filename_filtering['year_offset'])
-        num_files = len(input_files)
-        logger.debug(f'{num_files} to consider after filename year filtering.')
-
-    # Is there anything left to process?
-    if len(input_files) == 0:
-        raise NoFilesToProcessException()
-
-    # Dump filepaths prior to loading
-    if config.get('dump_filepaths_prior_to_loading', default=False):
-        logger.debug('Dumping filepaths prior to loading... there may be a lot.')
-        for input_file in input_files:
-            logger.debug(input_file)
+    # Get a list of the filepaths to load
+    input_files = find_input_files(input_files, variable, start_year)
 
     # Detect the input resolution if it it not supplied
     if input_resolution is None:
@@ -158,76 +573,258 @@ def process(
         input_resolution = adu.detect_resolution(input_files)
         logger.debug(f'Input resolution detected as {input_resolution} km')
 
-    # Load project config
-    logger.info(f'Loading project config ({project})')
-    project_key = project
-    project = load_config('projects')[project_key]
+    project_config, model_config = load_project_and_model(project, model)
+
+    # TODO: Remove!!!! This is just to make CCAM work in the short term
+    if preprocessor is None and 'ccam' in input_files[0] and config.auto_detect_ccam == True:
+        logger.warn('CCAM preprocessor override used')
+        preprocessor = 'ccam'
+        postprocessor = 'ccam'
+
+    # Load a preprocessor, if one exists, selecting the variable and domain from each file as it is opened.
+    preprocess = get_preprocess(preprocessor, local_args, variable, load_domain(domain))
+
+    # Fixed variables only need a single file.
+    fixed = 'variables_fixed' in project_config.keys() and variable in project_config['variables_fixed']
+
+    # Derive the chunks from the inputs and output frequency, rather than a fixed number of time steps
+    chunks = None if fixed else _get_input_chunks(input_files[0], variable, output_frequency)
+
+    ds = load_inputs(input_files, start_year, preprocess, fixed=fixed, chunks=chunks)
+
+    # Collect the writes and compute them together
+    writes = list() if config.concurrent_writes else None
+
+    _process_dataset(ds, local_args, project_config, model_config, input_resolution, postprocessor, writes=writes, input_files=input_files)
+
+    if writes:
+        failed = compute_writes(writes)
+        if len(failed) > 0:
+            raise failed[0]['exception']
+
+    elapsed_time = timer.stop()
+    logger.info(f'DRS processing task took {elapsed_time} seconds.')
+
+
+def process_batch(
+    input_files,
+    output_directory,
+    variables,
+    project,
+    model,
+    domain,
+    start_year, end_year,
+    output_frequencies,
+    level=None,
+    input_resolution=None,
+    overwrite=True,
+    preprocessor=None,
+    postprocessor=None,
+    client=None,
+    run_id=None,
+    **kwargs
+):
+    """Process multiple variables and output frequencies from a single load of the input files.
+
+    Suited to multi-variable inputs (i.e. CCAM), where each variable would otherwise reopen the same files. Each
+    variable/output_frequency combination is processed in isolation, so a failure will not stop the remainder.
+
+    Args:
+        input_files (str or list): Globbable string or list of filepaths.
+        output_directory (str) : Path from which to build DRS structure.
+        variables (list): Variables to process.
+        project (str): Project metadata to apply (loaded from user config).
+        model (str): Model metadata to apply (loaded from user config).
+        start_year (int): Start year.
+        end_year (int): End year.
+        output_frequencies (list): Output frequencies to process.
+        input_resolution (float, optional): Input resolution in km. Leave black to auto-detect from filepaths.
+        overwrite (bool): Overwrite the data at the destination. Defaults to True.
+        preprocessor (str): Data preprocessor to activate on input data. Defaults to None.
+        postprocesser (str): Data postprocess to activate before writing data. Defaults to None.
+        client (distributed.Client, optional): Dask client. Defaults to None.
+        run_id (str, optional): Identifies reruns of the same payload (see process). Defaults to None.
+        **kwargs: Additional keyword arguments used in metadata interpolation.
+    """
+
+    # Start the clock
+    timer = au.Timer()
+    timer.start()
+
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    # Arguments shared by each variable, as process() would have captured them.
+    shared_args = dict(
+        input_files=input_files,
+        output_directory=output_directory,
+        project=project,
+        model=model,
+        domain=domain,
+        start_year=start_year,
+        end_year=end_year,
+        level=level,
+        input_resolution=input_resolution,
+        overwrite=overwrite,
+        preprocessor=preprocessor,
+        postprocessor=postprocessor,
+        run_id=run_id,
+        kwargs=kwargs
+    )
+
+    project_config, model_config = load_project_and_model(project, model)
+
+    # The shared load is not for any one variable
+    ain.set_context(variable=None, output_frequency=None, start_year=start_year)
+
+    def _process_individually(_variables):
+        for variable in _variables:
+            for output_frequency in adu.group_output_frequencies(output_frequencies):
+                instance_kwargs = shared_args.copy()
+                instance_kwargs.update(instance_kwargs.pop('kwargs'))
+                instance_kwargs['variable'] = variable
+                instance_kwargs['output_frequency'] = output_frequency
+                process_with_recovery(lambda: process(**instance_kwargs), variable, output_frequency, client=client)
+
+    # Fixed variables only load a single file, these go through the normal chain.
+    fixed_variables = project_config['variables_fixed'] if 'variables_fixed' in project_config.keys() else list()
+    batch_variables = [variable for variable in variables if variable not in fixed_variables]
+    _process_individually([variable for variable in variables if variable in fixed_variables])
+
+    if len(batch_variables) == 0:
+        return
+
+    # Load everything once
+    logger.info(f'Loading inputs once for {len(batch_variables)} variable(s).')
+
+    try:
+
+        _input_files = find_input_files(input_files, batch_variables, start_year)
+
+        # Detect the input resolution if it it not supplied
+        _input_resolution = input_resolution
+        if _input_resolution is None:
+            logger.debug('No input resolution supplied, auto-detecting')
+            _input_resolution = adu.detect_resolution(_input_files)
+            logger.debug(f'Input resolution detected as {_input_resolution} km')
+
+        # TODO: Remove!!!! This is just to make CCAM work in the short term
+        if preprocessor is None and 'ccam' in _input_files[0] and config.auto_detect_ccam == True:
+            logger.warn('CCAM preprocessor override used')
+            preprocessor = 'ccam'
+            postprocessor = 'ccam'
+
+        # Preprocess for all of the variables at once.
+        load_args = shared_args.copy()
+        load_args['variable'] = batch_variables
+        load_args['output_frequency'] = output_frequencies
+        preprocess = get_preprocess(preprocessor, load_args, batch_variables, load_domain(domain))
+
+        # Derive the chunks from the inputs and output frequencies, rather than a fixed number of time steps
+        chunks = _get_input_chunks(_input_files[0], batch_variables, output_frequencies)
+
+        ds = load_inputs(_input_files, start_year, preprocess, chunks=chunks)
+
+    except NoFilesToProcessException:
+        logger.info(f'No files to process for {batch_variables}')
+        return
+
+    # Fall back to loading each variable separately, this will track failures as usual.
+    except Exception as ex:
+        log_exception('Unable to load inputs for the batch, processing variables individually.', ex)
+        _process_individually(batch_variables)
+        return
+
+    for variable in batch_variables:
+
+        # Collect the writes of each variable and compute them together, so only one variable is held on the cluster
+        writes = list() if config.concurrent_writes else None
+
+        for output_frequency in adu.group_output_frequencies(output_frequencies):
+
+            local_args = shared_args.copy()
+            local_args['variable'] = variable
+            local_args['output_frequency'] = output_frequency
+
+            def _process():
 
-    # Ensure it actually exists
-    assert isinstance(project, dict), f'Project {project_key} not found, does it exist in projects.json?'
+                if variable not in ds.data_vars.keys():
+                    raise NoFilesToProcessException()
 
-    # Load model config
-    logger.info(f'Loading model config ({model})')
-    model_key = model
-    model = load_config('models')[model_key]
+                # Drop the other variables in the batch
+                others = [other for other in batch_variables if other != variable and other in ds.data_vars.keys()]
+                _process_dataset(ds.drop_vars(others), local_args, project_config, model_config, _input_resolution, postprocessor, writes=writes, input_files=_input_files)
 
-    # Ensure it actually exists
-    assert isinstance(model, dict), f'Model {model_key} not found, does it exist in models.json?'
+            # The client is not restarted while writes are pending, it is restarted once they are done
+            process_with_recovery(_process, variable, output_frequency, client=client, restart=writes is None)
 
-    logger.debug(
-        'Loading files into distributed memory, this may take some time.')
+        # Write every file of the variable together, failures are tracked but not retried.
+        if writes:
+            for failure in compute_writes(writes, client=client):
+                track_failure(failure['variable'], failure['exception'])
 
-    # TODO: Remove!!!! This is just to make CCAM work in the short term
-    if preprocessor is None and 'ccam' in input_files[0] and config.auto_detect_ccam == True:
-        logger.warn('CCAM preprocessor override used')
-        preprocessor = 'ccam'
-        postprocessor = 'ccam'
+        if writes is not None:
+            restart_client(client)
+
+    elapsed_time = timer.stop()
+    logger.info(f'DRS batch processing task took {elapsed_time} seconds.')
 
-    # Load a preprocessor, if one exists.
-    preprocessor = adu.load_preprocessor(preprocessor)
-    def preprocess(ds, *args, **kwargs): return preprocessor(ds, **local_args)
 
-    # Load the open_dataset configuration
-    open_dataset_kwargs = config['xarray']['open_dataset']
+def _process_dataset(ds, local_args, project_config, model_config, input_resolution, postprocessor=None, writes=None, input_files=None):
+    """Process a loaded dataset for a single variable/output_frequency into the DRS structure.
 
-    # Account for fixed variables, if defined
-    if 'variables_fixed' in project.keys() and variable in project['variables_fixed']:
+    Args:
+        ds (xarray.Dataset): Data, as returned from load_inputs.
+        local_args (dict): Arguments to process(), used for interpolation context and pre/post processing.
+        project_config (dict): Project configuration.
+        model_config (dict): Model configuration.
+        input_resolution (float): Input resolution in km.
+        postprocessor (str, optional): Data postprocess to activate before writing data. Defaults to None.
+        writes (list, optional): Defer the writes by appending them to this list (see compute_writes). Defaults to None (write immediately).
+        input_files (list, optional): Input filepaths, changes to which invalidate completion records. Defaults to None.
+    """
 
-        # Load just the first file
-        ds = xr.open_dataset(input_files[0], **open_dataset_kwargs)
-        ds = preprocess(ds, variable=variable)
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
 
-    else:
-        
-        ds = xr.open_mfdataset(
-            input_files,
-            preprocess=preprocess,
-            **open_dataset_kwargs
-        )
+    output_directory = local_args['output_directory']
+    variable = local_args['variable']
+    domain = local_args['domain']
+    start_year, end_year = local_args['start_year'], local_args['end_year']
+    output_frequencies = au.pluralise(local_args['output_frequency'])
+    overwrite = local_args['overwrite']
+    kwargs = local_args['kwargs']
 
-    # Subset temporally
-    if not adu.is_time_invariant(ds):
-        logger.info(f'Subsetting times to {start_year}')
-        # ixs = np.where(ds['time.year'] == start_year)
-        time_slice = slice(f'{start_year}-01-01', f'{start_year}-12-31')
-        # ds = ds.isel(time=slice(ixs[0][0], ixs[0][-1] + 1))
-        ds = ds.sel(time=time_slice, drop=True)
+    # Label the spans of this variable
+    ain.set_context(variable=variable, output_frequency=local_args['output_frequency'], start_year=start_year)
 
     # Skip over the file if subdaily resampling is disabled, this will stop 
     native_frequency = adu.detect_input_frequency(ds)
 
+    logger.info(f'native_frequency = {native_frequency}, output_frequency = {", ".join(output_frequencies)}')
+
     # Ensure blank output frequency is indeed fixed and only one can be written
     if adu.is_time_invariant(ds):
-        output_frequency = 'fx'
+        output_frequencies = output_frequencies[:1]
         overwrite = False
 
-    logger.info(f'native_frequency = {native_frequency}, output_frequency = {output_frequency}')
-    if config.allow_subdaily_resampling == False and native_frequency != output_frequency and 'H' in output_frequency:
-        logger.info(f'Subdaily resampling has been disabled and input/output frequencies do not match, skipping {variable}.')
-        return
+    elif config.allow_subdaily_resampling == False:
+
+        subdaily = [output_frequency for output_frequency in output_frequencies if native_frequency != output_frequency and 'H' in output_frequency]
+        if len(subdaily) > 0:
+            logger.info(f'Subdaily resampling has been disabled and input/output frequencies do not match, skipping {variable} {", ".join(subdaily)}.')
 
-    # Persist now, get it on the cluster while the rest of the metadata assembly continues
-    ds = ds.persist()
+        output_frequencies = [output_frequency for output_frequency in output_frequencies if output_frequency not in subdaily]
+        if len(output_frequencies) == 0:
+            return
+
+    # Stream each output straight to disk rather than holding the data in cluster memory
+    streaming = config.streaming['enable']
+
+    # Outputs completed by an earlier attempt at this run are skipped. With overwrite, only reruns of the same payload
+    # are earlier attempts (see consume), otherwise everything is reprocessed.
+    run = acp.get_run_key(local_args, input_files) if config.checkpoints['enable'] else None
+    resume = run is not None and (not overwrite or local_args.get('run_id') is not None)
 
     # Determine time-invariance
     time_invariant = 'time' not in list(ds.coords.keys())
@@ -243,8 +840,8 @@ def process(
     context.update(kwargs)
 
     # Add project and model metadata
-    context.update(project)
-    context.update(model)
+    context.update(project_config)
+    context.update(model_config)
 
     # Add additional args
     context.update(local_args)
@@ -257,7 +854,12 @@ def process(
         if coord in ds.coords.keys():
             sort_coords.append(coord)
 
-    ds = ds.sortby(sort_coords)
+    # Only coordinates that are out of order are sorted, the path taken for each is recorded
+    with ain.span('sort') as record:
+        ds, paths = adu.sort_lazily(ds, sort_coords)
+        record['paths'] = paths
+
+    logger.debug(f'Sorted {paths}')
 
     logger.debug('Applying metadata schema')
 
@@ -267,216 +869,586 @@ def process(
     else:
         schema_key = config['default_schema']
 
-    schema = axs.load_schema(schema_key)
-    ds = au.apply_schema(ds, schema)
+    # Compiled once per schema (see axs.load_attribute_maps), applied for every year
+    with ain.span('schema'):
+        schema_plan = axs.load_attribute_maps(schema_key)
+        ds = au.apply_schema_plan(ds, schema_plan)
 
-    logger.info(f'Parsing domain {domain}')
-    if isinstance(domain, str):
+    domain = load_domain(domain)
 
-        # Registered domain
-        if adu.is_registered_domain(domain):
-            domain = adu.get_domain(domain)
+    # Subset the geographical domain, a no-op if this was done as the inputs were opened
+    logger.debug('Subsetting geographical domain.')
+    with ain.span('subset'):
+        ds = domain.subset_xarray(ds, drop=True)
 
-        # Attempt to parse
-        else:
-            domain = Domain.from_directive(domain)
+    # Each output interpolates its own copy of the context, so nothing is carried over from another frequency
+    base_context = context
 
-    # We will only otherwise accept a domain object.
-    elif isinstance(domain, Domain) == False:
-        raise Exception(f'Unable to parse domain {domain}.')
+    # Outputs completed by an earlier attempt at this run are found before anything is read, years without any
+    # outstanding outputs are skipped entirely. Filenames derived from the data are only known once it is resampled.
+    pending = dict()
+    directories = set()
 
-    logger.debug('Domain: ' + domain.to_directive())
+    for year in adu.generate_years_list(start_year, end_year):
 
-    # Subset the geographical domain
-    logger.debug('Subsetting geographical domain.')
-    ds = domain.subset_xarray(ds, drop=True)
+        pending[year] = list()
+
+        for requested_frequency in output_frequencies:
+            output_frequency = _get_output_frequency(ds, requested_frequency, native_frequency)
+            _context = _get_output_context(base_context, year, requested_frequency, output_frequency)
+            output_filepath = _get_output_filepath(_context, output_directory, adu.is_time_invariant(ds))
+            directories.add(os.path.dirname(output_filepath))
+
+            if resume and not config.derive_filename_times_from_data and acp.is_complete(output_filepath, output_directory, run):
+                logger.info(f'{output_filepath} was completed by an earlier attempt, skipping.')
+            else:
+                pending[year].append(requested_frequency)
+
+    # Temporary files left next to the outputs by killed jobs (see adu.get_temporary_filepath)
+    for directory in sorted(directories):
+        for filepath in adu.remove_stale_temporary_files(directory):
+            logger.info(f'Removed {filepath}, left by a process that is no longer running.')
+
+    if not any(pending.values()):
+        logger.info(f'Every output of {variable} was completed by an earlier attempt, skipping.')
+        return
+
+    # Persist now that the data outside the domain is dropped, so it is never loaded
+    if not streaming:
+        with ain.span('persist') as record:
+            record['tasks'] = ain.count_tasks(ds)
+            ds = ds.persist()
+
+    # Load a postprocessor, if one exists.
+    postprocessor = adu.load_postprocessor(postprocessor)
 
     # TODO: Need to find a less manual way to do this.
     for year in adu.generate_years_list(start_year, end_year):
 
+        if not pending[year]:
+            logger.info(f'Every output of {year} was completed by an earlier attempt, skipping.')
+            continue
+
         logger.info(f'Processing {year}')
 
+        # Each output file (and each wait on it) covers a single year of data, as keyed in the runtime store
+        years = 1
+
         # Subset the data into just this year
         if not time_invariant:
             time_slice = slice(f'{year}-01-01', f'{year}-12-31')
-            _ds = ds.sel(time=time_slice, drop=True)
+            _ds_year = ds.sel(time=time_slice, drop=True)
         else:
-            _ds = ds.copy()
+            _ds_year = ds.copy()
 
-        # Historical cutoff is defined in $HOME/.axiom/drs.json
-        if config.enable_historical_cutoff == True:
-            context['experiment'] = 'historical' if year < config.historical_cutoff else context['rcp']
-        
         logger.info(f'Native frequency of data detected as {native_frequency}')
 
-        # Automatically detect the output_frequency from the input data, this will not require resampling
+        # The requested frequency may differ from that of the output, i.e. from_input or fx
+        for requested_frequency, output_frequency, _ds, resampling_applied in _resample_outputs(_ds_year, pending[year], native_frequency, year, persist=not streaming):
+
+            ain.set_context(output_frequency=requested_frequency)
+
+            # Start persisting the computation now
+            if not streaming:
+                with ain.span('persist', year=year) as record:
+                    record['tasks'] = ain.count_tasks(_ds)
+                    _ds = _ds.persist()
+
+            # Interpolate context
+            logger.info('Interpolating context.')
+            context = _get_output_context(base_context, year, requested_frequency, output_frequency)
+
+            # Assemble the global meta, add axiom details
+            logger.debug('Assembling global metadata.')
+            global_attrs = dict(
+                axiom_version=axiom_version,
+                axiom_schema=schema_key
+            )
+
+            for key, value in config.metadata_defaults.items():
+                global_attrs[key] = str(value) % context
+
+            # Strip and reapply metadata
+            logger.debug('Applying metadata')
+            _ds.attrs = global_attrs
+
+            # Add in the variable to the context
+            context['variable'] = variable
+
+            # Reapply the schema
+            logger.info('Reapplying schema')
+            _ds = au.apply_schema_plan(_ds, schema_plan)
+
+            # Copy coordinate attributes straight off the inputs
+            if config.copy_coordinates_from_inputs:
+                for coord in list(_ds.coords.keys()):
+                    _ds[coord].attrs = ds[coord].attrs
+
+            # Assemble the encoding dictionaries (to ensure time units work!)
+            logger.debug('Applying encoding')
+            encoding = dict()
+
+            for coord in list(_ds.coords.keys()):
+                if coord not in config.encoding.keys():
+                    logger.warn(
+                        f'Coordinate {coord} is not specified in drs.json file, omitting encoding.')
+                    continue
+                encoding[coord] = config.encoding[coord].copy()
+
+            # Apply a blanket variable encoding, with the chunking/compression profile for this frequency and rank.
+            encoding[variable], engine = aen.get_variable_encoding(_ds[variable], output_frequency)
+
+            # Postprocess data if required
+            def postprocess(_ds, *args, **kwargs):
+                combined = dict()
+                combined.update(kwargs)
+                combined.update(local_args)
+                combined['output_frequency'] = requested_frequency
+                combined['resampling_applied'] = resampling_applied
+    
+                return postprocessor(_ds, **combined)
         
-        # Flag to trigger cell_method update below.
-        resampling_applied = False
+            with ain.span('postprocess', year=year):
+                _ds = postprocess(_ds)
+
+            # Update the cell methods
+            if resampling_applied:
+                _ds = update_cell_methods(_ds, variable, dim='time', method='mean')
+
+            # Get the full output filepath with string interpolation
+            logger.debug('Working out output paths')
+
+            # Derive the start/end date strings from the actual timeseries and override
+            if config.derive_filename_times_from_data:
+                logger.info(
+                    'User has requested that filename times reflect the actual timeseries.')
+                str_times = _ds.time.dt.strftime('%Y%m%d').data
+                context['start_date'] = str_times[0]
+                context['end_date'] = str_times[-1]
+                logger.debug(
+                    'start_date = %(start_date)s, end_date = %(end_date)s' % context)
+
+            # Assemble the output filepath
+            output_filepath = _get_output_filepath(context, output_directory, adu.is_time_invariant(_ds))
+            logger.debug(f'output_filepath = {output_filepath}')
+
+            # Skip if completed by an earlier attempt at this run (i.e. before a timeout)
+            if resume and acp.is_complete(output_filepath, output_directory, run):
+                logger.info(f'{output_filepath} was completed by an earlier attempt, skipping.')
+                continue
+
+            # Skip if already there and overwrite is not set, otherwise continue
+            if os.path.isfile(output_filepath) and overwrite == False:
+                logger.debug(
+                    f'{output_filepath} exists and overwrite is set to False, skipping.')
+                continue
+
+            # Check for uninterpolated keys in the output path, which should fail at this point.
+            uninterpolated_keys = adu.get_uninterpolated_placeholders(
+                output_filepath)
+
+            if len(uninterpolated_keys) > 0:
+                logger.error('Uninterpolated keys remain in the output filepath.')
+                logger.error(f'output_filepath = {output_filepath}')
+                raise DRSContextInterpolationException(uninterpolated_keys)
+
+            # Create the output directory
+            output_dir = os.path.dirname(output_filepath)
+            logger.debug(f'Creating {output_dir}')
+            os.makedirs(output_dir, exist_ok=True)
+
+            # Get the output format from config
+            output_format = config.get('output_format', 'NETCDF4')
+
+            # Bound the memory of each chunk in flight, the write then computes chunk-by-chunk
+            if streaming:
+                _ds = adu.chunk_to_budget(_ds, config.streaming['chunk_budget_mb'])
+
+            # Write to node-local storage, to be copied into place in the background (see axiom.drs.staging)
+            stager = ast.get_stager()
+            if stager is not None:
+                write_filepath = adu.get_temporary_filepath(output_filepath, config.staging['directory'])
+
+            # Write to a temporary file and move it into place once complete, so a killed job leaves no partial output
+            elif config.atomic_writes['enable']:
+                write_filepath = adu.get_temporary_filepath(output_filepath, config.atomic_writes['tmp_directory'])
+            else:
+                write_filepath = output_filepath
+
+            # Defer the write to be computed alongside others
+            if writes is not None:
+                logger.debug(f'Deferring write of {output_filepath}')
+                write = _ds.to_netcdf(
+                    write_filepath,
+                    format=output_format,
+                    engine=engine,
+                    encoding=encoding,
+                    unlimited_dims=['time'],
+                    compute=False
+                )
+                writes.append(dict(
+                    variable=variable,
+                    output_frequency=requested_frequency,
+                    resolution=input_resolution,
+                    years=years,
+                    filepath=output_filepath,
+                    write=write,
+                    write_filepath=write_filepath,
+                    output_directory=output_directory,
+                    run=run
+                ))
+                continue
+
+            try:
+
+                if streaming:
+
+                    logger.debug(f'Streaming {output_filepath}')
+                    write = _ds.to_netcdf(
+                        write_filepath,
+                        format=output_format,
+                        engine=engine,
+                        encoding=encoding,
+                        unlimited_dims=['time'],
+                        compute=False
+                    )
+
+                    # Supervise this job to ensure that it does in fact complete, cancelling the work if not.
+                    timeout = art.get_timeout('streaming', variable, requested_frequency, input_resolution, years=years)
+                    with Watchdog(seconds=timeout, error_msg=f'Variable {variable} took too long to complete, moving on.') as watchdog:
+                        logger.info('Waiting for computations to finish.')
+                        start = time.perf_counter()
+
+                        # Computation and writing are interleaved when streaming, so this is recorded as a write.
+                        with ain.span('write', year=year, streaming=True) as record:
+                            record['tasks'] = ain.count_tasks(write)
+                            write = watchdog.watch(write.persist())
+                            progress(write)
+                            write.compute()
+                            record['bytes_written'] = os.path.getsize(write_filepath)
+
+                    art.record_runtime('streaming', variable, requested_frequency, input_resolution, time.perf_counter() - start, years=years)
+
+                else:
+
+                    # Supervise this job to ensure that it does in fact complete, cancelling the work if not.
+                    timeout = art.get_timeout('compute', variable, requested_frequency, input_resolution, years=years)
+                    with Watchdog(seconds=timeout, error_msg=f'Variable {variable} took too long to complete, moving on.') as watchdog:
+                        logger.info('Waiting for computations to finish.')
+                        start = time.perf_counter()
+                        with ain.span('compute', year=year):
+                            progress(watchdog.watch(_ds))
+
+                    art.record_runtime('compute', variable, requested_frequency, input_resolution, time.perf_counter() - start, years=years)
+
+                    logger.debug(f'Writing {output_filepath}')
+                    with ain.span('write', year=year) as record:
+                        write = _ds.to_netcdf(
+                            write_filepath,
+                            format=output_format,
+                            engine=engine,
+                            encoding=encoding,
+                            unlimited_dims=['time']
+                        )
+                        record['bytes_written'] = os.path.getsize(write_filepath)
+
+            except BaseException:
+                if write_filepath != output_filepath:
+                    adu.discard_output(write_filepath)
+                raise
+
+            _submit_output(dict(variable=variable, filepath=output_filepath, write_filepath=write_filepath, output_directory=output_directory, run=run))
+
+
+def _get_output_frequency(ds, requested_frequency, native_frequency):
+    """Get the frequency of an output before resampling, as _resample_outputs would.
+
+    Args:
+        ds (xarray.Dataset): Input data.
+        requested_frequency (str): Requested output frequency, from_input for the frequency of the inputs.
+        native_frequency (str): Frequency of the inputs.
+
+    Returns:
+        str : Output frequency, fx for time-invariant data.
+    """
+    if requested_frequency == 'from_input' or requested_frequency == native_frequency:
+        return adu.detect_input_frequency(ds)
+
+    if adu.is_time_invariant(ds):
+        return 'fx'
+
+    return requested_frequency
+
+
+def _get_output_context(base_context, year, requested_frequency, output_frequency):
+    """Interpolate the context of a single output from a copy of the context shared by the outputs of a variable.
+
+    Args:
+        base_context (dict): Context shared by the outputs.
+        year (int): Year being processed.
+        requested_frequency (str): Requested output frequency.
+        output_frequency (str): Output frequency (see _get_output_frequency).
+
+    Returns:
+        dict : Interpolated context.
+    """
+    config = load_config('drs')
+    context = base_context.copy()
+
+    # Historical cutoff is defined in $HOME/.axiom/drs.json
+    if config.enable_historical_cutoff == True:
+        context['experiment'] = 'historical' if year < config.historical_cutoff else context['rcp']
+
+    context['output_frequency'] = requested_frequency
+
+    # Map the frequency to something DRS-compliant
+    context['frequency_mapping'] = 'fx' if output_frequency == 'fx' else config['frequency_mapping'][output_frequency]
+
+    # Monthly data should have the days truncated
+    context['start_date'], context['end_date'] = adu.get_start_and_end_dates(year, output_frequency)
+
+    # Tracking info
+    context['creation_date'] = datetime.utcnow()
+    context['uuid'] = uuid4()
+
+    return adu.interpolate_context(context)
+
+
+def _get_output_filepath(context, output_directory, fixed=False):
+    """Get the path of an output from its context.
+
+    Args:
+        context (dict): Interpolated context of the output (see _get_output_context).
+        output_directory (str): Root of the DRS structure.
+        fixed (bool, optional): Use the filename template of fixed (time-invariant) variables. Defaults to False.
+
+    Returns:
+        str : Output filepath.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    drs_path = adu.get_template(config, 'drs_path') % context
+    filename_template = adu.get_template(config, 'filename')
+
+    # Override for fixed variables
+    if fixed:
+        logger.debug('Overriding output filename template with fixed alternative.')
+        filename_template = adu.get_template(config, 'filename_fixed')
 
+    return os.path.join(output_directory, drs_path, filename_template % context)
+
+
+def _resample_outputs(ds, output_frequencies, native_frequency, year, persist=False):
+    """Resample a year of data to each output frequency, in a cascade when there are several (see adu.resample_cascade).
+
+    Args:
+        ds (xarray.Dataset): Data for the year.
+        output_frequencies (list): Output frequencies, from_input for the frequency of the inputs.
+        native_frequency (str): Frequency of the inputs.
+        year (int): Year being processed.
+        persist (bool, optional): Persist each frequency of a cascade before deriving the next. Defaults to False.
+
+    Returns:
+        list : Tuples of requested frequency, output frequency, data and whether resampling was applied.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    outputs = list()
+    resample = list()
+
+    for output_frequency in output_frequencies:
+
+        # Automatically detect the output_frequency from the input data, this will not require resampling
         if output_frequency == 'from_input' or output_frequency == native_frequency:
-            output_frequency = adu.detect_input_frequency(_ds)
-            logger.info(
-                f'output_frequency detected from inputs ({output_frequency})')
-            logger.info(f'No need to resample.')
-            # Map the frequency to something DRS-compliant
-            context['frequency_mapping'] = config['frequency_mapping'][output_frequency]
-
-        # Fixed variables, just change the frequency_mapping
-        elif adu.is_time_invariant(_ds):
-            output_frequency = 'fx'
-            logger.info(
-                'Data is time-invariant (fixed variable), overriding frequency_mapping to fx')
-            context['frequency_mapping'] = 'fx'
-
-        # Actually perform the resample
+            detected = adu.detect_input_frequency(ds)
+            logger.info(f'output_frequency detected from inputs ({detected})')
+            logger.info('No need to resample.')
+            outputs.append((output_frequency, detected, ds, False))
+
+        # Fixed variables
+        elif adu.is_time_invariant(ds):
+            logger.info('Data is time-invariant (fixed variable), overriding frequency_mapping to fx')
+            outputs.append((output_frequency, 'fx', ds, False))
+
         else:
-            logger.debug(f'Resampling to {output_frequency} mean.')
-            context['frequency_mapping'] = config['frequency_mapping'][output_frequency]
-            _ds = _ds.resample(time=output_frequency, label='left').mean()
+            resample.append(output_frequency)
 
-            # Update the cell methods below
-            resampling_applied = True
+    # Read once, each frequency derived from a finer one
+    if len(resample) > 1:
+        logger.debug(f'Resampling to {", ".join(resample)} mean in a cascade.')
+        with ain.span('resample', year=year, output_frequency=resample) as record:
+            cascade = adu.resample_cascade(ds, resample, persist=persist)
+            record['tasks'] = len(dask.base.collections_to_dsk(list(cascade.values()), optimize_graph=False))
 
-        # Start persisting the computation now
-        _ds = _ds.persist()
+        outputs += [(output_frequency, output_frequency, _ds, True) for output_frequency, _ds in cascade.items()]
 
-        # Monthly data should have the days truncated
-        # context['start_date'] = f'{year}0101' if output_frequency[-1] != 'M' else f'{year}01'
-        # context['end_date'] = f'{year}1231' if output_frequency[-1] != 'M' else f'{year}12'
+    # Actually perform the resample
+    elif len(resample) == 1:
+        output_frequency = resample[0]
+        logger.debug(f'Resampling to {output_frequency} mean.')
+        with ain.span('resample', year=year) as record:
+            if config.resample_engine == 'blockwise':
+                _ds = adu.resample_mean(ds, output_frequency)
+            else:
+                _ds = ds.resample(time=output_frequency, label='left').mean()
+            record['tasks'] = ain.count_tasks(_ds)
 
-        context['start_date'], context['end_date'] = adu.get_start_and_end_dates(year, output_frequency)
+        outputs.append((output_frequency, output_frequency, _ds, True))
 
-        # Tracking info
-        context['creation_date'] = datetime.utcnow()
-        context['uuid'] = uuid4()
+    return outputs
 
-        # Interpolate context
-        logger.info('Interpolating context.')
-        context = adu.interpolate_context(context)
 
-        # Assemble the global meta, add axiom details
-        logger.debug('Assembling global metadata.')
-        global_attrs = dict(
-            axiom_version=axiom_version,
-            axiom_schema=schema_key
-        )
+def compute_writes(writes, client=None):
+    """Compute deferred writes together so that they overlap with each other and with the computation.
 
-        for key, value in config.metadata_defaults.items():
-            global_attrs[key] = str(value) % context
+    Each file is logged as it completes. The writes are supervised with the concurrent_writes timeout (see
+    watchdog.timeouts and adaptive_timeouts in drs.json) of the slowest file, cancelling those still running on
+    timeout. Files are only moved into place once every write has finished in time, otherwise they are all discarded
+    as failed.
 
-        # Strip and reapply metadata
-        logger.debug('Applying metadata')
-        _ds.attrs = global_attrs
+    Args:
+        writes (list): Deferred writes from _process_dataset (dicts with variable, output_frequency, resolution, years, filepath and write keys).
+        client (distributed.Client, optional): Dask client. Defaults to None (current client, if any, otherwise dask.compute).
 
-        # Add in the variable to the context
-        context['variable'] = variable
+    Returns:
+        list : Writes that failed, with the exception added under the exception key.
+    """
+    logger = au.get_logger(__name__)
 
-        # Reapply the schema
-        logger.info('Reapplying schema')
-        _ds = au.apply_schema(_ds, schema)
+    if client is None:
+        try:
+            client = get_client()
+        except ValueError:
+            client = None
 
-        # Copy coordinate attributes straight off the inputs
-        if config.copy_coordinates_from_inputs:
-            for coord in list(_ds.coords.keys()):
-                _ds[coord].attrs = ds[coord].attrs
+    logger.info(f'Writing {len(writes)} file(s) concurrently.')
 
-        # Assemble the encoding dictionaries (to ensure time units work!)
-        logger.debug('Applying encoding')
-        encoding = dict()
+    handled = list()
+    failed = list()
 
-        for coord in list(_ds.coords.keys()):
-            if coord not in config.encoding.keys():
-                logger.warn(
-                    f'Coordinate {coord} is not specified in drs.json file, omitting encoding.')
-                continue
-            encoding[coord] = config.encoding[coord]
+    # Seconds taken by each finished write, keyed by filepath
+    finished = dict()
 
-        # Apply a blanket variable encoding.
-        encoding[variable] = config.encoding['variables']
+    # Files are written concurrently, so the writes are allowed as long as the slowest of them
+    seconds = max(
+        art.get_timeout('concurrent_writes', write['variable'], write['output_frequency'], write.get('resolution'), years=write.get('years', 1))
+        for write in writes
+    )
+    start = time.perf_counter()
 
-        # Postprocess data if required
-        postprocessor = adu.load_postprocessor(postprocessor)
+    # Writes may span several variables, which are listed on the span instead
+    ain.set_context(variable=None)
+    variables = sorted(set(write['variable'] for write in writes))
 
-        def postprocess(_ds, *args, **kwargs):
-            combined = dict()
-            combined.update(kwargs)
-            combined.update(local_args)
-            combined['resampling_applied'] = resampling_applied
-    
-            return postprocessor(_ds, **combined)
-        
-        _ds = postprocess(_ds)
-
-        # Update the cell methods
-        if resampling_applied:
-            _ds = update_cell_methods(_ds, variable, dim='time', method='mean')
-
-        # Get the full output filepath with string interpolation
-        logger.debug('Working out output paths')
-
-        # Derive the start/end date strings from the actual timeseries and override
-        if config.derive_filename_times_from_data:
-            logger.info(
-                'User has requested that filename times reflect the actual timeseries.')
-            str_times = _ds.time.dt.strftime('%Y%m%d').data
-            context['start_date'] = str_times[0]
-            context['end_date'] = str_times[-1]
-            logger.debug(
-                'start_date = %(start_date)s, end_date = %(end_date)s' % context)
-
-        drs_path = adu.get_template(config, 'drs_path') % context
-        filename_template = adu.get_template(config, 'filename')
-
-        # Override for fixed variables
-        if adu.is_time_invariant(_ds):
-            logger.debug('Overriding output filename template with fixed alternative.')
-            filename_template = adu.get_template(config, 'filename_fixed')
-
-        # Assemble the output filepath
-        output_filename = filename_template % context
-        output_filepath = os.path.join(
-            output_directory, drs_path, output_filename)
-        logger.debug(f'output_filepath = {output_filepath}')
-
-        # Skip if already there and overwrite is not set, otherwise continue
-        if os.path.isfile(output_filepath) and overwrite == False:
-            logger.debug(
-                f'{output_filepath} exists and overwrite is set to False, skipping.')
+    def _fail(write, exception):
+        handled.append(write['filepath'])
+        _discard_output(write)
+        failed.append(dict(write, exception=exception))
+
+    try:
+
+        with Watchdog(seconds=seconds, error_msg='Writes took too long to complete, moving on.', client=client) as watchdog, ain.span('write', files=len(writes), variables=variables) as record:
+
+            # No client, it is all or nothing
+            if client is None:
+                dask.compute(*[write['write'] for write in writes])
+                for write in writes:
+                    finished[write['filepath']] = time.perf_counter() - start
+
+            else:
+                futures = watchdog.watch(client.compute([write['write'] for write in writes]))
+                lookup = {future.key: write for future, write in zip(futures, writes)}
+
+                for future in as_completed(futures):
+
+                    write = lookup[future.key]
+
+                    if future.status == 'finished':
+                        logger.info(f'Computed {write["filepath"]}')
+                        finished[write['filepath']] = time.perf_counter() - start
+
+                    elif future.status == 'error':
+                        exception = future.exception()
+                        log_exception(f'Unable to write {write["filepath"]}.', exception)
+                        _fail(write, exception)
+
+                    # Cancelled (i.e. by the watchdog), the file is incomplete and is failed below
+
+            # Computation and writing are interleaved when deferred, so this is recorded as a write.
+            record['tasks'] = sum(ain.count_tasks(write['write']) or 0 for write in writes)
+            record['bytes_written'] = ain.get_filesizes([write.get('write_filepath', write['filepath']) for write in writes if write['filepath'] in finished])
+
+    except Exception as ex:
+
+        log_exception('Concurrent writes failed.', ex)
+
+        # Nothing is moved into place unless every write completed in time
+        for write in writes:
+            if write['filepath'] not in handled:
+                _fail(write, ex)
+
+        return failed
+
+    for write in writes:
+
+        if write['filepath'] in handled:
             continue
 
-        # Check for uninterpolated keys in the output path, which should fail at this point.
-        uninterpolated_keys = adu.get_uninterpolated_placeholders(
-            output_filepath)
+        if write['filepath'] not in finished:
+            logger.error(f'Writing {write["filepath"]} was cancelled.')
+            _fail(write, CancelledError(f'Writing {write["filepath"]} was cancelled.'))
+            continue
 
-        if len(uninterpolated_keys) > 0:
-            logger.error('Uninterpolated keys remain in the output filepath.')
-            logger.error(f'output_filepath = {output_filepath}')
-            raise DRSContextInterpolationException(uninterpolated_keys)
+        art.record_runtime('concurrent_writes', write['variable'], write['output_frequency'], write.get('resolution'), finished[write['filepath']], years=write.get('years', 1))
 
-        # Create the output directory
-        output_dir = os.path.dirname(output_filepath)
-        logger.debug(f'Creating {output_dir}')
-        os.makedirs(output_dir, exist_ok=True)
+        try:
+            _submit_output(write)
+            logger.info(f'Written {write["filepath"]}')
+        except Exception as ex:
+            log_exception(f'Unable to move {write["filepath"]} into place.', ex)
+            failed.append(dict(write, exception=ex))
 
-        # Supervise this job to ensure that it does in fact complete.
-        with Supervisor(seconds=config.processing_timeout_seconds, error_msg=f'Variable {variable} took too long to complete, moving on.'):
-            logger.info('Waiting for computations to finish.')
-            progress(_ds)
+    return failed
 
-        # Get the output format from config
-        output_format = config.get('output_format', 'NETCDF4')
-        
-        logger.debug(f'Writing {output_filepath}')
-        write = _ds.to_netcdf(
-            output_filepath,
-            format=output_format,
-            encoding=encoding,
-            unlimited_dims=['time']
-        )
 
-    elapsed_time = timer.stop()
-    logger.info(f'DRS processing task took {elapsed_time} seconds.')
+def _submit_output(write):
+    """Move a completed write into place now, or in the background if staging (see axiom.drs.staging).
+
+    Args:
+        write (dict): Write from _process_dataset.
+    """
+    stager = ast.get_stager()
+
+    if stager is not None and write.get('write_filepath', write['filepath']) != write['filepath']:
+        stager.submit(write, _commit_output)
+    else:
+        _commit_output(write)
+
+
+def _commit_output(write, discard=True):
+    """Move a completed write into place (see adu.commit_output) and record its completion, if checkpointing (see axiom.drs.checkpoints).
+
+    Args:
+        write (dict): Write from _process_dataset.
+        discard (bool, optional): Remove the temporary file if the move fails. Defaults to True.
+    """
+    if write.get('write_filepath', write['filepath']) != write['filepath']:
+        adu.commit_output(write['write_filepath'], write['filepath'], variable=write['variable'], discard=discard)
+
+    if write.get('run'):
+        acp.record_complete(write['filepath'], write['output_directory'], write['run'])
+
+
+def _discard_output(write):
+    """Remove the temporary file of a failed write, if any.
+
+    Args:
+        write (dict): Write from _process_dataset.
+    """
+    if write.get('write_filepath', write['filepath']) != write['filepath']:
+        adu.discard_output(write['write_filepath'])
 
 
 def load_variable_config(project_config):
@@ -503,20 +1475,124 @@ def load_variable_config(project_config):
     return variables
 
 
-def process_multi(variables, domain, project, **kwargs):
+def process_with_recovery(func, variable, output_frequency, client=None, restart=True):
+    """Run a processing function for a single variable/output_frequency, isolating and tracking failures.
+
+    Recoverable errors (see recoverable_errors in drs.json) are retried up to rerun_attempts times.
+
+    Args:
+        func (callable): Function to call (without arguments).
+        variable (str): Variable being processed.
+        output_frequency (str or list): Output frequency (or frequencies) being processed.
+        client (distributed.Client, optional): Dask client. Defaults to None.
+        restart (bool, optional): Restart the client afterwards, if requested in drs.json (see restart_client). Set to False while writes are pending. Defaults to True.
+
+    Returns:
+        bool : True if the function completed successfully, False otherwise.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    attempt = 1
+    no_files = False
+    success = False
+
+    rerun_attempts = config.get('rerun_attempts', default=1)
+
+    while attempt <= rerun_attempts and no_files == False and success == False:
+
+        logger.info(f'Processing {variable} {output_frequency}')
+
+        if client is not None:
+            logger.info('Waiting for dask workers')
+            client.wait_for_workers(1, timeout=config['dask']['restart_timeout_seconds'])
+            logger.info(client)
+            logger.info(f'Dashboard located at {client.dashboard_link}')
+
+        try:
+
+            func()
+            success = True
+
+        # Not technically an error, filtering has discounted all available files.
+        except NoFilesToProcessException as ex:
+
+            logger.info(f'No files to process for {variable}')
+            no_files = True
+
+        # Something wrong with the inputs regarding time.
+        except IndexError as ex:
+
+            # Log the exception
+            log_exception('Timeseries inconsistency, check input data.', ex)
+
+            # Check recoverability
+            if is_error_recoverable(ex) and attempt <= rerun_attempts:
+                logger.info('Error is recoverable, incrementing attempts.')
+                attempt += 1
+                continue
+            
+            # Track the failure and max out the attempts to execute the finally clause
+            track_failure(variable, ex)
+            attempt = rerun_attempts + 1
+
+        # Unknown exception
+        except Exception as ex:
+            
+            log_exception(
+                f'Variable {variable} failed for output_frequency {output_frequency}. Error to follow',
+                ex
+            )
+
+            # Check recoverability
+            if is_error_recoverable(ex) and attempt <= rerun_attempts:
+                logger.info(
+                    'Error is recoverable, incrementing attempts.')
+                attempt += 1
+                continue
+
+            # Track the failure and max out the attempts to execute the finally clause
+            track_failure(variable, ex)
+            attempt = rerun_attempts + 1
+
+        # Run regardless of success/failure
+        finally:
+            
+            if restart and no_files == False:
+                restart_client(client)
+
+    return success
+
+
+def restart_client(client):
+    """Restart the dask client between variables, if requested in drs.json (restart_client_between_variables).
+
+    Args:
+        client (distributed.Client): Dask client, may be None.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    if client is not None and config.dask['restart_client_between_variables']:
+        logger.info('User has requested dask client restarts between each variable (for resilience), restarting now.')
+        client.restart()
+        logger.info(client)
+
+
+def process_multi(variables, domain, project, batch_variables=None, client=None, **kwargs):
     """Start a processing chain of multiple variables.
 
     Args:
         variables (list): List of variables to process.
         domain (str): Domain to process from domains.json.
         project (str): Project metadata to use from projects.json.
+        batch_variables (bool, optional): Load the inputs once and process all variables from them (see process_batch). Defaults to None (batch_variables in drs.json).
+        client (distributed.Client, optional): Dask client to use. Defaults to None (one is started and stopped here, see start_client).
         **kwargs: Additional keyword arguments to pass to the processing chain.
     """
 
     logger = au.get_logger(__name__)
 
-    # Load the project metadata
-    project_config = load_config('projects')[project]
     config = load_config('drs')
 
     # Load all variables if nothing was supplied
@@ -542,107 +1618,86 @@ def process_multi(variables, domain, project, **kwargs):
     num_variables = len(variables)
     logger.info(f'{num_variables} variable(s) to process.')
 
-    # Start the cluster if requested
-    if config.dask['enable']:
-        logger.info('Starting dask client.')
-
-        cluster_config = config.dask['cluster']
-
-        # Add PBS_JOBFS if set
-        if 'PBS_JOBFS' in os.environ.keys():
-            cluster_config['local_directory'] = os.getenv('PBS_JOBFS')
-
-        cluster = LocalCluster(**cluster_config)
-        client = Client(cluster)
-        logger.info(client)
+    # Start the cluster if requested and not supplied
+    own_client = client is None
+    if own_client:
+        client = start_client()
 
-    output_frequencies = au.pluralise(kwargs['output_frequency'])
-    
-    # Yes this is a nested loop, but a single variable/domain/output_freq combination could still be 10K+ files, which WILL be processed in parallel.
-    for variable in variables:
-        for output_frequency in output_frequencies:
+    try:
+        _process_multi(variables, domain, project, batch_variables, client, **kwargs)
 
-            attempt = 1
-            no_files = False
-            success = False
+    finally:
+        if own_client:
+            stop_client(client)
 
-            rerun_attempts = config.get('rerun_attempts', default=1)
+    logger.info('DRS processing complete, please see consumed/lock/log files for further detail.')
 
-            while attempt <= rerun_attempts and no_files == False and success == False:
 
-                logger.info(f'Processing {variable} {output_frequency}')
-                instance_kwargs = kwargs.copy()
-                instance_kwargs['variable'] = variable
-                instance_kwargs['domain'] = domain
-                instance_kwargs['project'] = project
-                instance_kwargs['output_frequency'] = output_frequency
+def _process_multi(variables, domain, project, batch_variables, client, **kwargs):
+    """Process multiple variables on an existing client (see process_multi).
 
-                if config.dask['enable']:
-                    logger.info('Waiting for dask workers')
-                    client.wait_for_workers(1, timeout=config['dask']['restart_timeout_seconds'])
-                    logger.info(client)
-                    logger.info(f'Dashboard located at {client.dashboard_link}')
+    Args:
+        variables (list): List of variables to process.
+        domain (str): Domain to process from domains.json.
+        project (str): Project metadata to use from projects.json.
+        batch_variables (bool): Load the inputs once and process all variables from them, None to use batch_variables in drs.json.
+        client (distributed.Client): Dask client, may be None.
+        **kwargs: Additional keyword arguments to pass to the processing chain.
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
 
-                try:
+    # Payloads list the frequencies of a cascade separately (see Payload.get_output_frequencies)
+    output_frequency = kwargs.pop('output_frequency')
+    output_frequencies = kwargs.pop('output_frequencies', None) or au.pluralise(output_frequency)
 
-                    process(**instance_kwargs)
-                    success = True
+    # Batch processing loads the inputs once for all variables and output frequencies.
+    if batch_variables is None:
+        batch_variables = config.batch_variables
 
-                # Not technically an error, filtering has discounted all available files.
-                except NoFilesToProcessException as ex:
+    # Stage outputs on node-local storage, copying them into place while the next variable computes
+    stager = ast.Stager() if config.staging['enable'] else None
 
-                    logger.info(f'No files to process for {variable}')
-                    no_files = True
+    try:
 
-                # Something wrong with the inputs regarding time.
-                except IndexError as ex:
+        if batch_variables:
+            logger.info('Processing variables in a single batch.')
+            process_batch(
+                variables=variables,
+                domain=domain,
+                project=project,
+                output_frequencies=output_frequencies,
+                client=client,
+                **kwargs
+            )
 
-                    # Log the exception
-                    log_exception(f'Timeseries inconsistency, check input data.', ex)
+        else:
 
-                    # Check recoverability
-                    if is_error_recoverable(ex) and attempt <= rerun_attempts:
-                        logger.info('Error is recoverable, incrementing attempts.')
-                        attempt += 1
-                        continue
-                    
-                    # Track the failure and max out the attempts to execute the finally clause
-                    track_failure(variable, ex)
-                    attempt = rerun_attempts + 1
+            # Yes this is a nested loop, but a single variable/domain/output_freq combination could still be 10K+ files, which WILL be processed in parallel.
+            for variable in variables:
+                for output_frequency in adu.group_output_frequencies(output_frequencies):
 
-                # Unknown exception
-                except Exception as ex:
-                    
-                    log_exception(
-                        f'Variable {variable} failed for output_frequency {output_frequency}. Error to follow',
-                        ex
-                    )
+                    instance_kwargs = kwargs.copy()
+                    instance_kwargs['variable'] = variable
+                    instance_kwargs['domain'] = domain
+                    instance_kwargs['project'] = project
+                    instance_kwargs['output_frequency'] = output_frequency
 
-                    # Check recoverability
-                    if is_error_recoverable(ex) and attempt <= rerun_attempts:
-                        logger.info(
-                            'Error is recoverable, incrementing attempts.')
-                        attempt += 1
-                        continue
-
-                    # Track the failure and max out the attempts to execute the finally clause
-                    track_failure(variable, ex)
-                    attempt = rerun_attempts + 1
-
-                # Run regardless of success/failure
-                finally:
-                    
-                    if config.dask['enable'] and config.dask['restart_client_between_variables'] and no_files == False:
-                        logger.info('User has requested dask client restarts between each variable (for resilience), restarting now.')
-                        client.restart()
-                        logger.info(client)
+                    process_with_recovery(lambda: process(**instance_kwargs), variable, output_frequency, client=client)
 
-    logger.info('DRS processing complete, please see consumed/lock/log files for further detail.')
+    # Wait for the copies, even if processing failed
+    finally:
+        if stager is not None:
+            for failure in stager.close():
+                track_failure(failure['variable'], failure['exception'])
 
 
 def filter_years(filepaths, year, offset=0):
     """Filter filepaths based on a year, plus or minus an offset.
 
+    The year range of each file is parsed from the date (range) at the end of its filename (see
+    adu.parse_filenames), files that overlap the range, or have no date, are kept once each.
+
     Args:
         filepaths (list): List of filepaths.
         year (int): Year.
@@ -651,14 +1706,7 @@ def filter_years(filepaths, year, offset=0):
     Returns:
         list : List of filtered filepaths.
     """
-    _filepaths = list()
-    years = range(year-offset, year+offset+1)
-    for filepath in filepaths:
-        for year in years:
-            if str(year) in os.path.basename(filepath):
-                _filepaths.append(filepath)
-    
-    return _filepaths
+    return adu.filter_filepaths(filepaths, years=(year - offset, year + offset))
 
 
 def update_cell_methods(ds, variable, dim='time', method='mean'):
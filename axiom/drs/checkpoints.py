@@ -0,0 +1,185 @@
+"""Completion records of DRS outputs, so that reruns of a payload can skip files that are already complete."""
+import os
+import json
+import hashlib
+from datetime import datetime
+from axiom.config import load_config
+from axiom.drs.domain import Domain
+
+
+# Arguments to process() that determine the outputs of a run, variable and output_frequency are in the filepath.
+RUN_ARGS = [
+    'input_files', 'output_directory', 'project', 'model', 'domain', 'start_year', 'end_year', 'level',
+    'input_resolution', 'preprocessor', 'postprocessor', 'kwargs', 'run_id'
+]
+
+
+def get_payload_run_id(json_filepath):
+    """Get the run id of a payload, which is the same each time the payload file is consumed.
+
+    A regenerated (or touched) payload is a new run, so outputs recorded for the previous one are reprocessed.
+
+    Args:
+        json_filepath (str): Path to the payload.
+
+    Returns:
+        str : Run id.
+    """
+    return f'{os.path.abspath(json_filepath)}@{os.stat(json_filepath).st_mtime_ns}'
+
+
+def get_run_key(local_args, input_files=None):
+    """Get a key identifying a run from the arguments to process().
+
+    The key is the same for a rerun of the same payload (i.e. drs_rerun_failures), regardless of the variables or
+    overwrite flag, as long as the input files have not changed since.
+
+    Args:
+        local_args (dict): Arguments to process().
+        input_files (list, optional): Input filepaths, whose size and mtime are included. Defaults to None.
+
+    Returns:
+        str : Hex digest.
+    """
+    run_args = {key: local_args.get(key) for key in RUN_ARGS}
+
+    if isinstance(run_args['domain'], Domain):
+        run_args['domain'] = run_args['domain'].to_directive()
+
+    # Changed inputs invalidate the records
+    if input_files is not None:
+        run_args['input_stats'] = list()
+        for input_file in sorted(input_files):
+            stat = os.stat(input_file)
+            run_args['input_stats'].append([input_file, stat.st_size, stat.st_mtime_ns])
+
+    raw = json.dumps(run_args, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_record_filepath(output_filepath, output_directory):
+    """Get the path to the completion record of an output file.
+
+    Records mirror the DRS structure under a .checkpoints directory, keeping them out of the published tree.
+
+    Args:
+        output_filepath (str): Path to the output file.
+        output_directory (str): Root of the DRS structure.
+
+    Returns:
+        str : Path to the record.
+    """
+    relpath = os.path.relpath(output_filepath, output_directory)
+    return os.path.join(output_directory, '.checkpoints', relpath + '.json')
+
+
+def get_checksum(filepath, algorithm='sha256', blocksize=2**23):
+    """Calculate the checksum of a file.
+
+    Args:
+        filepath (str): Path to the file.
+        algorithm (str, optional): Any algorithm in hashlib. Defaults to 'sha256'.
+        blocksize (int, optional): Bytes read at a time. Defaults to 8MB.
+
+    Returns:
+        str : Hex digest.
+    """
+    checksum = hashlib.new(algorithm)
+
+    with open(filepath, 'rb') as data:
+        for block in iter(lambda: data.read(blocksize), b''):
+            checksum.update(block)
+
+    return checksum.hexdigest()
+
+
+def record_complete(output_filepath, output_directory, run, checksum=None):
+    """Record that an output file has been written completely.
+
+    The record is written to a temporary file and renamed into place, so it is either complete or absent. Calculating
+    the checksum rereads the whole file, so it is only done if requested.
+
+    Args:
+        output_filepath (str): Path to the output file.
+        output_directory (str): Root of the DRS structure.
+        run (str): Run key (see get_run_key).
+        checksum (str, optional): Checksum algorithm, any in hashlib. Defaults to None (checkpoints.checksum in drs.json, null for none).
+
+    Returns:
+        dict : The record.
+    """
+    algorithm = checksum or load_config('drs').checkpoints['checksum']
+
+    stat = os.stat(output_filepath)
+
+    record = dict(
+        filepath=os.path.relpath(output_filepath, output_directory),
+        run=run,
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        checksum_algorithm=algorithm,
+        checksum=get_checksum(output_filepath, algorithm) if algorithm else None,
+        completed=datetime.utcnow().isoformat(),
+        jobid=os.getenv('PBS_JOBID')
+    )
+
+    record_filepath = get_record_filepath(output_filepath, output_directory)
+    os.makedirs(os.path.dirname(record_filepath), exist_ok=True)
+
+    tmp_filepath = f'{record_filepath}.{os.getpid()}.tmp'
+    with open(tmp_filepath, 'w') as tmp:
+        json.dump(record, tmp, indent=4)
+
+    os.replace(tmp_filepath, record_filepath)
+    return record
+
+
+def read_record(output_filepath, output_directory):
+    """Read the completion record of an output file.
+
+    Args:
+        output_filepath (str): Path to the output file.
+        output_directory (str): Root of the DRS structure.
+
+    Returns:
+        dict : The record, None if there is no readable record.
+    """
+    try:
+        with open(get_record_filepath(output_filepath, output_directory), 'r') as record:
+            return json.load(record)
+    except (OSError, ValueError):
+        return None
+
+
+def is_complete(output_filepath, output_directory, run, verify=None):
+    """Check if an output file was completed by this run and has not changed since.
+
+    Args:
+        output_filepath (str): Path to the output file.
+        output_directory (str): Root of the DRS structure.
+        run (str): Run key (see get_run_key).
+        verify (bool, optional): Recalculate the checksum rather than trusting size and mtime. Defaults to None (checkpoints.verify in drs.json).
+
+    Returns:
+        bool : True if complete and valid.
+    """
+    record = read_record(output_filepath, output_directory)
+
+    if record is None or record['run'] != run:
+        return False
+
+    try:
+        stat = os.stat(output_filepath)
+    except OSError:
+        return False
+
+    if stat.st_size != record['size'] or stat.st_mtime != record['mtime']:
+        return False
+
+    if verify is None:
+        verify = load_config('drs').checkpoints['verify']
+
+    if verify and record['checksum']:
+        return get_checksum(output_filepath, record['checksum_algorithm']) == record['checksum']
+
+    return True
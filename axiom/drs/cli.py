@@ -7,11 +7,16 @@ import argparse
 import axiom.utilities as au
 from axiom.config import load_config
 import axiom.drs.payload as adp
+import axiom.drs as ad
 import axiom.drs.utilities as adu
+import axiom.drs.instrumentation as ain
+import axiom.drs.encoding as aen
+from axiom.drs.index import InputIndex
 from tqdm import tqdm
 from pathlib import Path
 import shutil
 import datetime
+import pandas as pd
 
 
 def split_args(values):
@@ -118,7 +123,7 @@ def drs_launch(path, jobscript, log_dir, batches=None, dry_run=True, interactive
         batches (int): Number of batches to split variables into (for parallel processing).
         dry_run (bool): Print out the commands rather than executing.
         interactive (bool): Dump the interactive flag into the qsub command when dumping.
-        unlock (bool): Unlock locked payloads prior to submission (for rerunning walltime overruns)
+        unlock (bool): Unlock locked payloads prior to submission (stale locks from walltime overruns are otherwise detected, see locking in drs.json)
         **launch_context: Additional arguments that will be interpolated as launch context.
     """
 
@@ -128,6 +133,9 @@ def drs_launch(path, jobscript, log_dir, batches=None, dry_run=True, interactive
     if not dry_run:
         os.makedirs(log_dir, exist_ok=True)
 
+    config = load_config('drs')
+    stale_seconds = config.locking['stale_seconds']
+
     for payload in payloads:
 
         # Load the payload to get the project, where we can get the variables and work out what the batch_size will be
@@ -144,14 +152,14 @@ def drs_launch(path, jobscript, log_dir, batches=None, dry_run=True, interactive
         else:
             _batches = [1]
 
-        # Unlock the file if requested
+        # Unlock the file if requested (stale locks are reclaimed on consumption anyway)
         if au.is_locked(payload) and unlock == True:
             print(f'Unlocking {payload} for resubmission')
             au.unlock(payload)
         
         # Skip if not
-        elif au.is_locked(payload):
-            print(f'{payload} is locked.')
+        elif au.is_locked(payload, stale_seconds=stale_seconds):
+            print(f'{payload} is locked by {au.read_lock(payload)}.')
             continue
 
         # Convert the path to the jobscript to an absolute path for reproducibility
@@ -167,7 +175,7 @@ def drs_launch(path, jobscript, log_dir, batches=None, dry_run=True, interactive
 
             # Assemble the command from configuration
             config = load_config('drs')
-            directives = config['launch']['directives']
+            directives = list(config['launch']['directives'])
 
             # Add interactive flag when dry running
             if dry_run and interactive:
@@ -233,7 +241,7 @@ def get_parser_launch(parent=None):
     parser.add_argument('-d', '--dry_run', action='store_true', default=False, help='Print commands without executing.')
     parser.add_argument('-i', '--interactive', action='store_true', default=False, help='Dump the interactive flag into the qsub command when dry-running.')
     parser.add_argument('--walltime', type=str, help='Override walltime in job script.')
-    parser.add_argument('--unlock', help='Unlock locked payloads prior to submission', action='store_true', default=False)
+    parser.add_argument('--unlock', help='Unlock locked payloads prior to submission, stale locks are detected without this.', action='store_true', default=False)
     parser.set_defaults(func=drs_launch)
 
     return parser
@@ -375,4 +383,151 @@ def get_parser_generate_user_config(parent=None):
     parser = argparse.ArgumentParser() if parent is None else parent.add_parser('drs_gen_user_config')
     parser.description = 'Copy installation configuration to the user space (backing up anything already there).'
     parser.set_defaults(func=adu.generate_user_config)
-    return parser
\ No newline at end of file
+    return parser
+
+
+def drs_index(input_files, index_filepath=None, read_time_axis=False, check_files=False):
+    """Build or incrementally update the input index.
+
+    Args:
+        input_files (str): Globbable path to input files.
+        index_filepath (str, optional): Path to the index database. Defaults to None (input_index in drs.json).
+        read_time_axis (bool, optional): Open new/changed files to summarise the time axis. Defaults to False.
+        check_files (bool, optional): Stat every file, to pick up files rewritten in place. Defaults to False.
+    """
+    with InputIndex(index_filepath) as index:
+
+        print(f'Updating index at {index.filepath}')
+        counts = index.update(input_files, read_time_axis=read_time_axis, check_files=check_files)
+        print(f'{counts["updated"]} file(s) added/updated, {counts["removed"]} removed.')
+
+        num_files = len(index.query(input_files))
+        years = index.years(input_files)
+
+    if years:
+        print(f'{num_files} file(s) indexed, covering {years[0]}-{years[-1]}.')
+    else:
+        print(f'{num_files} file(s) indexed.')
+
+
+def get_parser_index(parent=None):
+    """Get a parser for building the input index.
+
+    Args:
+        parent (object, optional): Parent parser. Defaults to None.
+    """
+    parser = argparse.ArgumentParser() if parent is None else parent.add_parser('drs_index')
+    parser.description = 'Build or incrementally update the input file index (see input_index in drs.json).'
+    parser.add_argument('input_files', type=str, help='Globbable path to input files, use quotes.')
+    parser.add_argument('--index_filepath', type=str, default=None, help='Path to the index, defaults to the configured path.')
+    parser.add_argument('--read_time_axis', action='store_true', default=False, help='Open new/changed files to summarise the time axis and variables.')
+    parser.add_argument('--check_files', action='store_true', default=False, help='Stat every file, to pick up files rewritten in place.')
+    parser.set_defaults(func=drs_index)
+    return parser
+
+
+def drs_drain(path, max_payloads=None, max_seconds=None):
+    """Consume payloads from a directory until none are left or a budget is used (see axiom.drs.drain).
+
+    Args:
+        path (str): Globbable path of payload files.
+        max_payloads (int, optional): Maximum number of payloads to consume. Defaults to None (no limit).
+        max_seconds (float, optional): Time budget in seconds. Defaults to None (no limit).
+    """
+    logger = au.get_logger(__name__)
+
+    # One client for the whole job, reused across payloads
+    client = ad.start_client()
+
+    try:
+        consumed = ad.drain(path, max_payloads=max_payloads, max_seconds=max_seconds, client=client)
+        logger.info(f'{len(consumed)} payload(s) consumed.')
+
+    finally:
+        ad.stop_client(client)
+
+    # Explicit exit (#125)
+    sys.exit(0)
+
+
+def get_parser_drain(parent=None):
+    """Get a parser for draining a directory of payloads.
+
+    Args:
+        parent (object, optional): Parent parser. Defaults to None.
+    """
+    parser = argparse.ArgumentParser() if parent is None else parent.add_parser('drs_drain')
+    parser.description = 'Claim and consume payloads until none are left or a budget is used, any number of jobs may drain the same payloads.'
+    parser.add_argument('path', type=str, help='Globbable path to payload files (use quotes).')
+    parser.add_argument('--max_payloads', type=int, default=None, help='Maximum number of payloads to consume.')
+    parser.add_argument('--max_seconds', type=float, default=None, help='Time budget in seconds, i.e. a little under the walltime.')
+    parser.set_defaults(func=drs_drain)
+    return parser
+
+
+def drs_spans(path, by='stage'):
+    """Summarise the spans recorded by one or more jobs (see axiom.drs.instrumentation).
+
+    Args:
+        path (str): Globbable path of span files.
+        by (str, optional): Comma-separated columns to group by. Defaults to 'stage'.
+    """
+    spans = ain.load_spans(path)
+
+    if len(spans) == 0:
+        print('No spans found.')
+        sys.exit(1)
+
+    with pd.option_context('display.max_rows', None, 'display.width', None):
+        print(ain.aggregate_spans(spans, by=split_args(by)))
+
+    summary = ain.summarise_io(spans)
+    print(f'\nI/O: {summary["io_seconds"]:.1f}s, compute: {summary["compute_seconds"]:.1f}s, I/O share: {summary["io_share"]:.1%}')
+
+
+def get_parser_spans(parent=None):
+    """Get a parser for summarising spans.
+
+    Args:
+        parent (object, optional): Parent parser. Defaults to None.
+    """
+    parser = argparse.ArgumentParser() if parent is None else parent.add_parser('drs_spans')
+    parser.description = 'Summarise the per-stage spans recorded when instrumentation is enabled.'
+    parser.add_argument('path', type=str, help='Globbable path to span files (use quotes).')
+    parser.add_argument('--by', type=str, default='stage', help='Comma-separated columns to group by, i.e. stage,variable.')
+    parser.set_defaults(func=drs_spans)
+    return parser
+
+
+def drs_benchmark_encoding(filepath, profiles=None, variable=None, repeats=3, directory=None):
+    """Benchmark the encoding profiles on a sample output (see axiom.drs.encoding.benchmark_profiles).
+
+    Args:
+        filepath (str): Sample output file.
+        profiles (str, optional): Comma-separated profile names. Defaults to None (all profiles).
+        variable (str, optional): Variable to benchmark. Defaults to None (auto-detect).
+        repeats (int, optional): Repeats of each read. Defaults to 3.
+        directory (str, optional): Directory for the rewritten files. Defaults to None (a temporary directory).
+    """
+    profiles = split_args(profiles) if profiles else None
+    results = aen.benchmark_profiles(filepath, profiles=profiles, variable=variable, repeats=repeats, directory=directory)
+
+    with pd.option_context('display.max_rows', None, 'display.width', None, 'display.float_format', '{:.2f}'.format):
+        print(results)
+
+
+def get_parser_benchmark_encoding(parent=None):
+    """Get a parser for benchmarking encoding profiles.
+
+    Args:
+        parent (object, optional): Parent parser. Defaults to None.
+    """
+    parser = argparse.ArgumentParser() if parent is None else parent.add_parser('drs_benchmark_encoding')
+    parser.description = 'Report write speed, file size and time-series/map read latency of encoding profiles on a sample output.'
+    parser.add_argument('filepath', type=str, help='Sample output file.')
+    parser.add_argument('--profiles', type=str, default=None, help='Comma-separated profile names from encoding_profiles in drs.json, defaults to all.')
+    parser.add_argument('--variable', type=str, default=None, help='Variable to benchmark, defaults to the data variable with the most dimensions.')
+    parser.add_argument('--repeats', type=int, default=3, help='Repeats of each read, the median is reported.')
+    parser.add_argument('--directory', type=str, default=None, help='Directory for the rewritten files (i.e. on the filesystem the outputs will be read from), defaults to a temporary directory.')
+    parser.set_defaults(func=drs_benchmark_encoding)
+    return parser
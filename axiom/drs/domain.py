@@ -1,3 +1,13 @@
+"""Geographical domains, with subsetting of xarray objects by integer index."""
+import hashlib
+import numpy as np
+import xarray as xr
+
+
+# Index slices by domain bounds and grid signature, see Domain.get_indexers
+_INDEXERS = dict()
+
+
 class Domain:
 
     """Domain specification class.
@@ -80,6 +90,38 @@ class Domain:
         return f'{self.name},{self.dx},{self.lat_min},{self.lat_max},{self.lon_min},{self.lon_max}'
 
 
+    def get_indexers(self, ds):
+        """Get the integer index slices of this domain on the grid of an xarray object.
+
+        Slices are computed once per grid (see get_grid_signature) and cached. A domain that crosses the antimeridian
+        (lon_max < lon_min) is selected modulo 360, which may take two slices in longitude, ordered from lon_min
+        (see subset_xarray).
+
+        Args:
+            ds (xarray.Dataset or xarray.DataArray): Data with 1D lat and lon coordinates.
+
+        Returns:
+            dict : List of slices for lat and lon.
+        """
+        key = (self.lat_min, self.lat_max, self.lon_min, self.lon_max, get_grid_signature(ds.lat), get_grid_signature(ds.lon))
+
+        if key not in _INDEXERS.keys():
+
+            lat, lon = ds.lat.values, ds.lon.values
+            lat_mask = (lat >= self.lat_min) & (lat <= self.lat_max)
+
+            if self.lon_max < self.lon_min:
+                offsets = (lon - self.lon_min) % 360
+                lon_mask = offsets <= (self.lon_max - self.lon_min) % 360
+            else:
+                offsets = None
+                lon_mask = (lon >= self.lon_min) & (lon <= self.lon_max)
+
+            _INDEXERS[key] = dict(lat=get_index_slices(lat_mask), lon=get_index_slices(lon_mask, offsets))
+
+        return _INDEXERS[key]
+
+
     def subset_xarray(self, ds, drop=True):
         """Subset an xarray object with this domain object.
 
@@ -90,14 +132,21 @@ class Domain:
         Returns:
             xarray.Dataset or xarray.DataArray : Object subset with this domain.
         """
+        for dim, slices in self.get_indexers(ds).items():
+
+            # Across the antimeridian, join the parts either side of it
+            parts = [ds.isel({dim: _slice}) for _slice in slices]
 
-        lon_min, lon_max = self.lon_min, self.lon_max
+            if len(parts) == 1:
+                ds = parts[0]
+                continue
 
-        # Fix to cross the meridian
-        if lon_max < lon_min:
-            lon_min, lon_max = lon_max, lon_min
+            ds = xr.concat(parts, dim=dim, data_vars='minimal', coords='minimal', compat='override')
 
-        return ds.sel(lat=slice(self.lat_min, self.lat_max), lon=slice(lon_min, lon_max))
+            if dim == 'lon':
+                ds = unwrap_longitude(ds)
+
+        return ds
     
 
     def from_config(key, config):
@@ -112,4 +161,65 @@ class Domain:
         return Domain(
             name=key,
             **elements
-        )
\ No newline at end of file
+        )
+
+
+def get_grid_signature(coord):
+    """Get a signature of a coordinate, identifying a grid.
+
+    Args:
+        coord (xarray.DataArray): 1D coordinate.
+
+    Returns:
+        tuple : Name, dtype, size and hash of the values.
+    """
+    values = np.ascontiguousarray(coord.values)
+    return (coord.name, values.dtype.str, values.size, hashlib.sha1(values.tobytes()).hexdigest())
+
+
+def unwrap_longitude(ds, dim='lon'):
+    """Make longitude increase across the antimeridian (i.e. 170, 180, 190 rather than 170, -180, -170).
+
+    Bounds (the bounds attribute of the coordinate, otherwise lon_bnds) are shifted with it.
+
+    Args:
+        ds (xarray.Dataset or xarray.DataArray): Data.
+        dim (str, optional): Longitude dimension. Defaults to 'lon'.
+
+    Returns:
+        xarray.Dataset or xarray.DataArray : Data with unwrapped longitude.
+    """
+    lon = ds[dim].values
+    unwrapped = np.unwrap(lon, period=360)
+    shift = xr.DataArray(unwrapped - lon, dims=dim)
+
+    bounds = ds[dim].attrs.get('bounds', f'{dim}_bnds')
+    ds = ds.assign_coords({dim: ds[dim].copy(data=unwrapped)})
+
+    if isinstance(ds, xr.Dataset) and bounds in ds.data_vars.keys():
+        with xr.set_options(keep_attrs=True):
+            ds[bounds] = ds[bounds] + shift
+
+    return ds
+
+
+def get_index_slices(mask, offsets=None):
+    """Get the contiguous runs of a mask as slices.
+
+    Args:
+        mask (numpy.ndarray): 1D boolean mask.
+        offsets (numpy.ndarray, optional): Order the runs by the offset of their first element. Defaults to None (in order).
+
+    Returns:
+        list : Slices, a single empty slice if nothing is selected.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], mask, [False]]).astype(int)))
+    slices = [slice(int(start), int(stop)) for start, stop in zip(edges[::2], edges[1::2])]
+
+    if len(slices) == 0:
+        return [slice(0, 0)]
+
+    if offsets is not None:
+        slices = sorted(slices, key=lambda _slice: offsets[_slice.start])
+
+    return slices
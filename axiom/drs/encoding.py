@@ -0,0 +1,290 @@
+"""Output encoding profiles (chunking and compression), selected by output frequency and variable rank."""
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import xarray as xr
+from axiom.config import load_config
+import axiom.utilities as au
+
+
+# Compression filters provided by hdf5plugin (optional), written through h5netcdf
+HDF5PLUGIN_FILTERS = ['zstd', 'blosc', 'lz4', 'bzip2']
+
+# Vertical dimensions, a variable with one of these is considered rank 3
+VERTICAL_DIMS = ['lev', 'plev', 'height']
+
+MB = 1024 ** 2
+
+
+def get_rank(da):
+    """Get the rank of a variable, 3 if it has a vertical dimension, otherwise 2.
+
+    Args:
+        da (xarray.DataArray): Variable.
+
+    Returns:
+        int : Rank.
+    """
+    return 3 if any(dim in da.dims for dim in VERTICAL_DIMS) else 2
+
+
+def get_profile_name(output_frequency, rank):
+    """Get the name of the encoding profile for an output frequency and rank.
+
+    The most specific key in encoding_profile (drs.json) is used, in order: <frequency>_<rank>d (i.e. 1H_3d),
+    <frequency>, <rank>d, then default.
+
+    Args:
+        output_frequency (str): Output frequency, i.e. 1D.
+        rank (int): Rank of the variable (see get_rank).
+
+    Returns:
+        str : Profile name, None for no profile.
+    """
+    selection = load_config('drs').encoding_profile or dict()
+
+    for key in [f'{output_frequency}_{rank}d', output_frequency, f'{rank}d', 'default']:
+        if key in selection.keys():
+            return selection[key]
+
+    return None
+
+
+def get_profile(name):
+    """Get an encoding profile by name from encoding_profiles (drs.json).
+
+    Args:
+        name (str): Profile name.
+
+    Returns:
+        dict : Profile.
+
+    Raises:
+        KeyError : When the profile does not exist.
+    """
+    profiles = load_config('drs').encoding_profiles or dict()
+
+    if name not in profiles.keys():
+        raise KeyError(f'Encoding profile {name} is not defined in encoding_profiles (drs.json).')
+
+    return profiles[name]
+
+
+def get_chunksizes(da, chunks):
+    """Get the chunksizes encoding of a variable from chunk sizes by dimension name.
+
+    Args:
+        da (xarray.DataArray): Variable.
+        chunks (dict): Chunk size by dimension name, -1 (or missing) for the whole dimension.
+
+    Returns:
+        tuple : Chunk size for each dimension of the variable, None for scalars.
+    """
+    if da.ndim == 0:
+        return None
+
+    chunksizes = list()
+    for dim, size in zip(da.dims, da.shape):
+        chunk = chunks.get(dim, -1)
+        chunksizes.append(size if chunk == -1 else max(1, min(chunk, size)))
+
+    return tuple(chunksizes)
+
+
+def get_compression_filter(compression, complevel):
+    """Get the hdf5plugin filter for a compression, if hdf5plugin is installed.
+
+    Args:
+        compression (str): Compression, one of HDF5PLUGIN_FILTERS.
+        complevel (int): Compression level.
+
+    Returns:
+        dict-like : h5py filter (compression/compression_opts), None if hdf5plugin is not installed.
+    """
+    try:
+        import hdf5plugin
+    except ImportError:
+        return None
+
+    if compression == 'zstd':
+        return hdf5plugin.Zstd(clevel=complevel)
+
+    if compression == 'blosc':
+        return hdf5plugin.Blosc(cname='zstd', clevel=complevel, shuffle=hdf5plugin.Blosc.SHUFFLE)
+
+    if compression == 'lz4':
+        return hdf5plugin.LZ4()
+
+    return hdf5plugin.BZip2(blocksize=max(1, complevel))
+
+
+def apply_profile(encoding, da, profile):
+    """Apply an encoding profile on top of a variable encoding.
+
+    Args:
+        encoding (dict): Variable encoding, i.e. encoding.variables in drs.json.
+        da (xarray.DataArray): Variable.
+        profile (dict): Profile with optional chunks, shuffle, zlib, complevel and compression (zlib or one of HDF5PLUGIN_FILTERS).
+
+    Returns:
+        tuple : Encoding and the engine required to write it (None for the default).
+    """
+    logger = au.get_logger(__name__)
+
+    encoding = dict(encoding)
+    profile = dict(profile)
+    engine = None
+
+    chunks = profile.pop('chunks', None)
+    if chunks:
+        encoding['chunksizes'] = get_chunksizes(da, chunks)
+
+    compression = profile.pop('compression', None)
+    encoding.update(profile)
+
+    if compression in HDF5PLUGIN_FILTERS:
+
+        compression_filter = get_compression_filter(compression, encoding.get('complevel', 4))
+
+        # Fall back to zlib at the same level
+        if compression_filter is None:
+            logger.warning(f'{compression} compression requires hdf5plugin, falling back to zlib.')
+            encoding['zlib'] = True
+
+        else:
+            encoding.pop('zlib', None)
+            encoding.pop('complevel', None)
+            encoding['compression'] = compression_filter['compression']
+            encoding['compression_opts'] = compression_filter['compression_opts']
+            engine = 'h5netcdf'
+
+    elif compression == 'zlib':
+        encoding['zlib'] = True
+
+    elif compression is not None:
+        raise ValueError(f'Unsupported compression {compression}, use zlib or one of {", ".join(HDF5PLUGIN_FILTERS)}.')
+
+    return encoding, engine
+
+
+def get_variable_encoding(da, output_frequency):
+    """Get the encoding of an output variable, encoding.variables in drs.json with the selected profile applied.
+
+    Args:
+        da (xarray.DataArray): Variable.
+        output_frequency (str): Output frequency.
+
+    Returns:
+        tuple : Encoding and the engine required to write it (None for the default).
+    """
+    logger = au.get_logger(__name__)
+    config = load_config('drs')
+
+    encoding = config.encoding['variables'].copy()
+    name = get_profile_name(output_frequency, get_rank(da))
+
+    if not name:
+        return encoding, None
+
+    encoding, engine = apply_profile(encoding, da, get_profile(name))
+    logger.info(f'Encoding {da.name} with the {name} profile: {encoding}')
+
+    return encoding, engine
+
+
+def _time_read(filepath, variable, engine, indexers, repeats):
+    """Median time to read a selection of a variable from a freshly opened file."""
+    seconds = list()
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with xr.open_dataset(filepath, engine=engine) as ds:
+            ds[variable].isel(indexers).values
+        seconds.append(time.perf_counter() - start)
+
+    return float(np.median(seconds))
+
+
+def benchmark_profiles(filepath, profiles=None, variable=None, repeats=3, directory=None):
+    """Benchmark encoding profiles on a sample output.
+
+    The variable is rewritten with each profile, reporting the write speed, file size and latency of reading the
+    time series at a single point and a map at a single time. Reads are likely to be served from the page cache, so
+    latencies are best compared between profiles rather than taken as absolute.
+
+    Args:
+        filepath (str): Sample output (or input) file.
+        profiles (list, optional): Profile names, None within the list for encoding.variables alone. Defaults to None (encoding.variables alone, then all of encoding_profiles in drs.json).
+        variable (str, optional): Variable to benchmark. Defaults to None (the data variable with the most dimensions).
+        repeats (int, optional): Repeats of each read, the median is reported. Defaults to 3.
+        directory (str, optional): Directory for the rewritten files. Defaults to None (a temporary directory).
+
+    Returns:
+        pandas.DataFrame : One row per profile.
+    """
+    config = load_config('drs')
+
+    if profiles is None:
+        profiles = [None] + list(config.encoding_profiles.keys())
+
+    with xr.open_dataset(filepath) as ds:
+
+        if variable is None:
+            variable = max(ds.data_vars.keys(), key=lambda key: ds[key].ndim)
+
+        sample = ds[[variable]].load()
+
+    da = sample[variable]
+    nbytes = da.astype(config.encoding['variables'].get('dtype', da.dtype)).nbytes
+
+    # Middle of each dimension, the time series is read along time, the map across the rest
+    middle = {dim: size // 2 for dim, size in zip(da.dims, da.shape)}
+    timeseries = {dim: index for dim, index in middle.items() if dim != 'time'}
+    mapped = {dim: index for dim, index in middle.items() if dim == 'time' or dim in VERTICAL_DIMS}
+
+    own_directory = directory is None
+    directory = tempfile.mkdtemp() if own_directory else directory
+
+    results = list()
+
+    try:
+        for name in profiles:
+
+            profile = get_profile(name) if name else dict()
+            name = name or 'none'
+
+            encoding, engine = apply_profile(config.encoding['variables'].copy(), da, profile)
+            output_filepath = os.path.join(directory, f'{name}.nc')
+
+            start = time.perf_counter()
+            sample.to_netcdf(
+                output_filepath,
+                encoding={variable: encoding},
+                engine=engine,
+                unlimited_dims=['time'] if 'time' in da.dims else None
+            )
+            write_seconds = time.perf_counter() - start
+
+            size = os.path.getsize(output_filepath)
+
+            results.append(dict(
+                profile=name,
+                chunksizes=encoding.get('chunksizes'),
+                write_seconds=write_seconds,
+                write_mb_per_second=nbytes / MB / write_seconds,
+                size_mb=size / MB,
+                compression_ratio=nbytes / size,
+                timeseries_ms=_time_read(output_filepath, variable, engine, timeseries, repeats) * 1000,
+                map_ms=_time_read(output_filepath, variable, engine, mapped, repeats) * 1000
+            ))
+
+            os.remove(output_filepath)
+
+    finally:
+        if own_directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    return pd.DataFrame.from_records(results).set_index('profile')
@@ -0,0 +1,448 @@
+"""Persistent index of input file metadata, to avoid globbing and filtering large input trees on every run."""
+import os
+import glob
+import sqlite3
+from fnmatch import fnmatch
+import xarray as xr
+import axiom.utilities as au
+import axiom.drs.utilities as adu
+from axiom.config import load_config
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS files (
+        path TEXT PRIMARY KEY,
+        directory TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        variable TEXT,
+        start_year INTEGER,
+        end_year INTEGER,
+        resolution REAL,
+        mtime INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        time_start TEXT,
+        time_end TEXT,
+        time_steps INTEGER,
+        variables TEXT
+    )""",
+    'CREATE INDEX IF NOT EXISTS files_directory ON files (directory)',
+    'CREATE INDEX IF NOT EXISTS files_years ON files (start_year, end_year)',
+    """CREATE TABLE IF NOT EXISTS directories (
+        path TEXT NOT NULL,
+        pattern TEXT NOT NULL,
+        parent TEXT,
+        mtime INTEGER NOT NULL,
+        PRIMARY KEY (path, pattern)
+    )""",
+    'CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent, pattern)'
+]
+
+# Version of the filename parsing (see adu.parse_filenames), indexes parsed by an earlier version are parsed again
+PARSER_VERSION = 1
+
+
+def get_index_filepath():
+    """Get the path to the input index from configuration.
+
+    Returns:
+        str : Path to the index database, defaults to $HOME/.axiom/input_index.sqlite.
+    """
+    config = load_config('drs')
+    filepath = config.input_index['filepath'] if config.input_index else None
+    return filepath or os.path.join(au.get_user_data_root(), 'input_index.sqlite')
+
+
+def split_pattern(pattern):
+    """Split a globbable path into the static root directory and the remaining path components.
+
+    Args:
+        pattern (str): Globbable path.
+
+    Returns:
+        tuple : Root directory (str) and list of remaining (possibly globbable) components.
+    """
+    components = os.path.abspath(pattern).split(os.sep)
+    root = list()
+
+    for ix, component in enumerate(components):
+        if glob.has_magic(component):
+            break
+        root.append(component)
+    else:
+        # No magic at all, this is a single file
+        return os.sep.join(root[:-1]) or os.sep, root[-1:]
+
+    return os.sep.join(root) or os.sep, components[ix:]
+
+
+def _matches(components, pattern_components):
+    """Check that each path component matches its corresponding pattern component.
+
+    Args:
+        components (list): Path components (relative to the root).
+        pattern_components (list): Pattern components (relative to the root).
+
+    Returns:
+        bool : True if matched, False otherwise.
+    """
+    if len(components) > len(pattern_components):
+        return False
+
+    # Hidden files are not matched by glob unless explicit
+    for component, pattern_component in zip(components, pattern_components):
+        if component.startswith('.') and not pattern_component.startswith('.'):
+            return False
+        if not fnmatch(component, pattern_component):
+            return False
+
+    return True
+
+
+def summarise_time_axis(filepath):
+    """Read a summary of the time axis and the data variables in a file.
+
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        dict : Dictionary with time_start, time_end, time_steps and variables keys.
+    """
+    with xr.open_dataset(filepath, decode_times=True) as ds:
+
+        summary = dict(
+            time_start=None,
+            time_end=None,
+            time_steps=None,
+            variables=','.join(ds.data_vars.keys())
+        )
+
+        if not adu.is_time_invariant(ds) and ds.time.size > 0:
+            times = ds.time.values
+            summary['time_start'] = str(times[0])
+            summary['time_end'] = str(times[-1])
+            summary['time_steps'] = int(times.size)
+
+    return summary
+
+
+class InputIndex:
+
+    """Persistent (SQLite) index of input files, keyed by path.
+
+    Each file records the variable, year range and resolution parsed from its path, the modification time and
+    size, and optionally a summary of the time axis and data variables read from the file itself. Directory
+    modification times are tracked so that updates only list directories that have changed.
+
+    Usage:
+        >>> index = InputIndex('/path/to/index.sqlite')
+        >>> index.update('/path/to/inputs/*/*.nc')
+        >>> filepaths = index.query('/path/to/inputs/*/*.nc', variables=['tas'], years=(1999, 2001))
+
+    Args:
+        filepath (str, optional): Path to the index database. Defaults to None (see get_index_filepath).
+    """
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath or get_index_filepath()
+        os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+        self.connection = sqlite3.connect(self.filepath, timeout=60)
+
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] < PARSER_VERSION:
+            self._reparse_filenames()
+
+
+    def _reparse_filenames(self):
+        """Parse the filenames of the index again, after a change to the parsing (see PARSER_VERSION).
+
+        Year ranges read from the time axis are kept, as they are more reliable than the filename.
+        """
+        rows = self.connection.execute('SELECT path, time_start FROM files').fetchall()
+        parsed = adu.parse_filenames([path for path, _ in rows]).astype(object)
+        parsed = parsed.where(parsed.notna(), None)
+
+        with self.connection:
+
+            for (path, time_start), record in zip(rows, parsed.to_dict('records')):
+
+                if time_start is not None:
+                    record.pop('start_year')
+                    record.pop('end_year')
+
+                columns = [column for column in ['variable', 'start_year', 'end_year', 'resolution'] if column in record]
+                self.connection.execute(
+                    f'UPDATE files SET {", ".join(f"{column} = ?" for column in columns)} WHERE path = ?',
+                    [record[column] for column in columns] + [path]
+                )
+
+            self.connection.execute(f'PRAGMA user_version = {PARSER_VERSION}')
+
+
+    def close(self):
+        """Close the connection to the index."""
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+    def update(self, pattern, read_time_axis=False, check_files=False):
+        """Incrementally update the index for files matching a globbable path.
+
+        Only directories whose modification time has changed since the last update are listed.
+
+        Args:
+            pattern (str): Globbable path.
+            read_time_axis (bool, optional): Open new/changed files to summarise the time axis. Defaults to False.
+            check_files (bool, optional): Stat every file in unchanged directories, to pick up files rewritten in place. Defaults to False.
+
+        Returns:
+            dict : Number of files added/updated and removed.
+        """
+        logger = au.get_logger(__name__)
+        root, pattern_components = split_pattern(pattern)
+        counts = dict(updated=0, removed=0)
+
+        # Directory listings are tracked per pattern, as each only descends into the directories it could match
+        pattern = os.path.join(root, *pattern_components)
+
+        # Depth-first walk of the directories that could match
+        stack = [root]
+
+        with self.connection:
+
+            while stack:
+
+                directory = stack.pop()
+
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except FileNotFoundError:
+                    counts['removed'] += self._remove_directory(directory)
+                    continue
+
+                row = self.connection.execute(
+                    'SELECT mtime FROM directories WHERE path = ? AND pattern = ?', (directory, pattern)
+                ).fetchone()
+
+                # Unchanged listing, reuse the known subdirectories
+                if row is not None and row[0] == mtime:
+                    stack += [r[0] for r in self.connection.execute(
+                        'SELECT path FROM directories WHERE parent = ? AND pattern = ?', (directory, pattern)
+                    )]
+
+                    if check_files:
+                        filepaths = [r[0] for r in self.connection.execute('SELECT path FROM files WHERE directory = ?', (directory,))]
+                        filepaths = [filepath for filepath in filepaths if os.path.isfile(filepath)]
+                        counts['updated'] += self._update_files(filepaths, read_time_axis)
+
+                    continue
+
+                logger.debug(f'Listing {directory}')
+                depth = len(os.path.relpath(directory, root).split(os.sep)) if directory != root else 0
+                names, filepaths, subdirectories = set(), list(), list()
+
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+
+                        names.add(entry.path)
+                        components = os.path.relpath(entry.path, root).split(os.sep)
+
+                        if not _matches(components, pattern_components):
+                            continue
+
+                        if depth + 1 < len(pattern_components) and entry.is_dir():
+                            subdirectories.append(entry.path)
+
+                        elif depth + 1 == len(pattern_components) and entry.is_file():
+                            filepaths.append(entry.path)
+
+                # Remove anything that has since disappeared
+                known_subdirectories = self.connection.execute(
+                    'SELECT path FROM directories WHERE parent = ? AND pattern = ?', (directory, pattern)
+                ).fetchall()
+
+                for (known,) in known_subdirectories:
+                    if known not in names:
+                        counts['removed'] += self._remove_directory(known)
+
+                known_files = {r[0] for r in self.connection.execute('SELECT path FROM files WHERE directory = ?', (directory,))}
+                removed_files = known_files.difference(names)
+                self.connection.executemany('DELETE FROM files WHERE path = ?', [(f,) for f in removed_files])
+                counts['removed'] += len(removed_files)
+
+                counts['updated'] += self._update_files(filepaths, read_time_axis)
+
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO directories (path, pattern, parent, mtime) VALUES (?, ?, ?, ?)',
+                    [(subdirectory, pattern, directory, -1) for subdirectory in subdirectories]
+                )
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO directories (path, pattern, parent, mtime) VALUES (?, ?, ?, ?)',
+                    (directory, pattern, os.path.dirname(directory), mtime)
+                )
+
+                stack += subdirectories
+
+        logger.info(f'Index updated, {counts["updated"]} file(s) added/updated, {counts["removed"]} removed.')
+        return counts
+
+
+    def _update_files(self, filepaths, read_time_axis=False):
+        """Add or update the records for filepaths that are new or have changed.
+
+        Args:
+            filepaths (list): List of filepaths.
+            read_time_axis (bool, optional): Summarise the time axis of new/changed files. Defaults to False.
+
+        Returns:
+            int : Number of records added/updated.
+        """
+        if len(filepaths) == 0:
+            return 0
+
+        known = dict()
+        for filepath in filepaths:
+            row = self.connection.execute('SELECT mtime, size FROM files WHERE path = ?', (filepath,)).fetchone()
+            if row is not None:
+                known[filepath] = row
+
+        stats = dict()
+        for filepath in filepaths:
+            stat = os.stat(filepath)
+            if known.get(filepath) != (stat.st_mtime_ns, stat.st_size):
+                stats[filepath] = stat
+
+        records = list()
+        parsed = adu.parse_filenames(list(stats.keys())).astype(object)
+        parsed = parsed.where(parsed.notna(), None)
+
+        for record in parsed.to_dict('records'):
+
+            stat = stats[record['path']]
+            record.update(
+                directory=os.path.dirname(record['path']),
+                mtime=stat.st_mtime_ns,
+                size=stat.st_size,
+                time_start=None,
+                time_end=None,
+                time_steps=None,
+                variables=None
+            )
+            filepath = record['path']
+
+            if read_time_axis:
+                record.update(summarise_time_axis(filepath))
+
+                # The time axis is more reliable than the filename
+                if record['time_start'] is not None:
+                    record['start_year'] = int(record['time_start'][:4])
+                    record['end_year'] = int(record['time_end'][:4])
+
+            records.append(record)
+
+        if len(records) == 0:
+            return 0
+
+        columns = list(records[0].keys())
+        self.connection.executemany(
+            f'INSERT OR REPLACE INTO files ({", ".join(columns)}) VALUES ({", ".join(":" + c for c in columns)})',
+            records
+        )
+
+        return len(records)
+
+
+    def _remove_directory(self, directory):
+        """Remove a directory, and everything beneath it, from the index.
+
+        Args:
+            directory (str): Path to the directory.
+
+        Returns:
+            int : Number of file records removed.
+        """
+        prefix = directory.rstrip(os.sep) + os.sep
+        self.connection.execute('DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?', (directory, len(prefix), prefix))
+        cursor = self.connection.execute('DELETE FROM files WHERE directory = ? OR substr(directory, 1, ?) = ?', (directory, len(prefix), prefix))
+        return cursor.rowcount
+
+
+    def query(self, pattern, variables=None, years=None):
+        """Query the index for files matching a globbable path.
+
+        Args:
+            pattern (str): Globbable path.
+            variables (str or list, optional): Filter for files of these variables, either by filename (filename_filtering in drs.json) or by the data variables read from the file. Defaults to None.
+            years (tuple, optional): Filter for files overlapping an inclusive (start, end) year range, files without a year range are kept. Defaults to None.
+
+        Returns:
+            list : Sorted list of filepaths.
+        """
+        root, pattern_components = split_pattern(pattern)
+        prefix = root.rstrip(os.sep) + os.sep
+
+        sql = 'SELECT path, variables FROM files WHERE substr(path, 1, ?) = ?'
+        params = [len(prefix), prefix]
+
+        if years is not None:
+            sql += ' AND (start_year IS NULL OR (start_year <= ? AND end_year >= ?))'
+            params += [years[1], years[0]]
+
+        rows = self.connection.execute(sql, params).fetchall()
+
+        # Match the glob, component by component
+        _rows = list()
+        for path, _variables in rows:
+            components = os.path.relpath(path, root).split(os.sep)
+            if len(components) == len(pattern_components) and _matches(components, pattern_components):
+                _rows.append((path, _variables))
+
+        rows = _rows
+
+        if variables is not None:
+            variables = au.pluralise(variables)
+            filtered = set(adu.filter_by_variable_name([path for path, _ in rows], variables))
+
+            # Files that have been read are also matched on their contents
+            for path, _variables in rows:
+                if _variables and set(_variables.split(',')).intersection(variables):
+                    filtered.add(path)
+
+            rows = [(path, _variables) for path, _variables in rows if path in filtered]
+
+        return sorted(path for path, _ in rows)
+
+
+    def years(self, pattern):
+        """List the years covered by files matching a globbable path.
+
+        Args:
+            pattern (str): Globbable path.
+
+        Returns:
+            list : Sorted list of years.
+        """
+        root, pattern_components = split_pattern(pattern)
+        prefix = root.rstrip(os.sep) + os.sep
+        rows = self.connection.execute(
+            'SELECT path, start_year, end_year FROM files WHERE substr(path, 1, ?) = ? AND start_year IS NOT NULL',
+            (len(prefix), prefix)
+        )
+
+        years = set()
+        for path, start_year, end_year in rows:
+            components = os.path.relpath(path, root).split(os.sep)
+            if len(components) == len(pattern_components) and _matches(components, pattern_components):
+                years.update(range(start_year, end_year + 1))
+
+        return sorted(years)
+
@@ -0,0 +1,256 @@
+"""Stage-level instrumentation of DRS processing, written as JSON lines (see instrumentation in drs.json)."""
+import os
+import json
+import time
+import socket
+import resource
+import contextlib
+from datetime import datetime
+import pandas as pd
+from dask.distributed import get_client
+from axiom.config import load_config
+import axiom.utilities as au
+
+
+# Fields added to every span, i.e. variable and output_frequency (see set_context)
+_CONTEXT = dict()
+
+# Stages that are dominated by reading or writing data, the remainder are considered compute.
+IO_STAGES = ['glob', 'filter', 'index', 'open', 'write', 'copy']
+
+
+def is_enabled():
+    """Check if instrumentation is enabled.
+
+    Returns:
+        bool : True if enabled.
+    """
+    return bool(load_config('drs').instrumentation['enable'])
+
+
+def get_spans_filepath():
+    """Get the path to which spans are written.
+
+    Spans are written next to the log of a PBS job ($AXIOM_LOG_DIR/$PBS_JOBNAME.spans.jsonl) when available,
+    otherwise to instrumentation.filepath in drs.json.
+
+    Returns:
+        str : Path to the JSON lines file, None if there is nowhere to write.
+    """
+    if 'AXIOM_LOG_DIR' in os.environ.keys() and 'PBS_JOBNAME' in os.environ.keys():
+        return os.path.join(os.getenv('AXIOM_LOG_DIR'), os.getenv('PBS_JOBNAME') + '.spans.jsonl')
+
+    return load_config('drs').instrumentation['filepath']
+
+
+def set_context(**fields):
+    """Set fields that are added to every subsequent span, None removes a field.
+
+    Args:
+        **fields : Fields, i.e. variable='tas'.
+    """
+    for key, value in fields.items():
+        if value is None:
+            _CONTEXT.pop(key, None)
+        else:
+            _CONTEXT[key] = value
+
+
+def count_tasks(obj):
+    """Count the tasks in the dask graph of an object.
+
+    Args:
+        obj (object): Dask-backed object (i.e. xarray.Dataset).
+
+    Returns:
+        int : Number of tasks, None if the object is not backed by dask.
+    """
+    try:
+        graph = obj.__dask_graph__()
+    except AttributeError:
+        return None
+
+    return len(graph) if graph is not None else 0
+
+
+def _get_peak_rss():
+    """Peak resident set size of this process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_peak_worker_memory():
+    """Get the peak resident memory of the dask workers, so far.
+
+    Returns:
+        int : Largest peak RSS across workers in bytes, None without a client.
+    """
+    try:
+        client = get_client()
+    except ValueError:
+        return None
+
+    peaks = client.run(_get_peak_rss)
+    return max(peaks.values()) if peaks else None
+
+
+def get_filesizes(filepaths):
+    """Total size of a list of files.
+
+    Args:
+        filepaths (list): List of filepaths.
+
+    Returns:
+        int : Total size in bytes (missing files are ignored).
+    """
+    total = 0
+    for filepath in filepaths:
+        try:
+            total += os.path.getsize(filepath)
+        except OSError:
+            pass
+
+    return total
+
+
+def emit(record):
+    """Append a record to the spans file.
+
+    Args:
+        record (dict): Span record.
+    """
+    filepath = get_spans_filepath()
+    if not filepath:
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+
+    # A single write of a single line, so concurrent jobs appending to the same file do not interleave.
+    with open(filepath, 'a') as spans:
+        spans.write(json.dumps(record, default=str) + '\n')
+
+
+@contextlib.contextmanager
+def span(stage, **fields):
+    """Record a span around a stage of processing.
+
+    The record is yielded so that measurements only known within the stage can be added, i.e. bytes_read,
+    bytes_written and tasks (see count_tasks). Nothing is recorded unless instrumentation is enabled.
+
+    Usage:
+        >>> with span('write') as record:
+        >>>     ds.to_netcdf(filepath)
+        >>>     record['bytes_written'] = os.path.getsize(filepath)
+
+    Args:
+        stage (str): Name of the stage.
+        **fields : Additional fields for the record.
+
+    Yields:
+        dict : Span record.
+    """
+    record = dict(stage=stage, bytes_read=None, bytes_written=None, tasks=None)
+    record.update(fields)
+
+    if not is_enabled():
+        yield record
+        return
+
+    started = datetime.utcnow()
+    start = time.perf_counter()
+
+    try:
+        yield record
+        record['status'] = 'ok'
+
+    except BaseException as ex:
+        record['status'] = type(ex).__name__
+        raise
+
+    finally:
+        record['seconds'] = time.perf_counter() - start
+        record['start'] = started.isoformat()
+
+        if load_config('drs').instrumentation['worker_memory']:
+            record['peak_worker_memory'] = get_peak_worker_memory()
+
+        record.update(
+            host=socket.gethostname(),
+            pid=os.getpid(),
+            jobid=os.getenv('PBS_JOBID')
+        )
+
+        # Fields passed to the span take precedence over the context
+        for key, value in _CONTEXT.items():
+            record.setdefault(key, value)
+
+        try:
+            emit(record)
+        except Exception as ex:
+            au.get_logger(__name__).warning(f'Unable to record span {stage}: {ex}')
+
+
+def load_spans(filepaths):
+    """Load spans from one or more JSON lines files.
+
+    Args:
+        filepaths (str or list): Globbable path or list of filepaths.
+
+    Returns:
+        pandas.DataFrame : One row per span.
+    """
+    records = list()
+    for filepath in au.auto_glob(filepaths):
+        with open(filepath, 'r') as spans:
+            records += [json.loads(line) for line in spans if line.strip()]
+
+    return pd.DataFrame.from_records(records)
+
+
+def aggregate_spans(spans, by='stage'):
+    """Aggregate spans, i.e. across payloads.
+
+    Args:
+        spans (pandas.DataFrame): Spans, see load_spans.
+        by (str or list, optional): Columns to group by. Defaults to 'stage'.
+
+    Returns:
+        pandas.DataFrame : Count, total/mean/max seconds, bytes read/written, tasks, peak worker memory and share of the total time.
+    """
+    for column in ['bytes_read', 'bytes_written', 'tasks', 'peak_worker_memory']:
+        if column not in spans.columns:
+            spans[column] = None
+
+    aggregated = spans.groupby(by, dropna=False).agg(
+        count=('seconds', 'size'),
+        total_seconds=('seconds', 'sum'),
+        mean_seconds=('seconds', 'mean'),
+        max_seconds=('seconds', 'max'),
+        bytes_read=('bytes_read', 'sum'),
+        bytes_written=('bytes_written', 'sum'),
+        tasks=('tasks', 'sum'),
+        peak_worker_memory=('peak_worker_memory', 'max')
+    )
+
+    aggregated['share'] = aggregated['total_seconds'] / aggregated['total_seconds'].sum()
+    return aggregated.sort_values('total_seconds', ascending=False)
+
+
+def summarise_io(spans):
+    """Split the time spent into I/O and compute stages (see IO_STAGES).
+
+    Args:
+        spans (pandas.DataFrame): Spans, see load_spans.
+
+    Returns:
+        dict : Dictionary with io_seconds, compute_seconds and io_share.
+    """
+    io = spans['stage'].isin(IO_STAGES)
+    io_seconds = float(spans.loc[io, 'seconds'].sum())
+    compute_seconds = float(spans.loc[~io, 'seconds'].sum())
+    total = io_seconds + compute_seconds
+
+    return dict(
+        io_seconds=io_seconds,
+        compute_seconds=compute_seconds,
+        io_share=io_seconds / total if total else None
+    )
@@ -3,6 +3,9 @@ import enum
 import json
 import axiom.schemas as axs
 import axiom.utilities as au
+import axiom.drs.utilities as adu
+from axiom.config import load_config
+from axiom.drs.index import InputIndex
 
 
 class Payload:
@@ -19,6 +22,7 @@ class Payload:
         model (str): Model key from models.json.
         domain (str): Domain key from domains.json.
         variables (list, optional): List of variables to process. Defaults to [].
+        output_frequencies (list, optional): Output frequencies processed together in a cascade, the first of which is output_frequency. Defaults to None (output_frequency alone).
         **kwargs : Additional key/value pairs added as a metadata.
     
     Attributes:
@@ -31,10 +35,11 @@ class Payload:
         end_year (int): End year.
         variables (list): List of variable names to process.
         output_frequency (str): Output frequency/resolution of data.
+        output_frequencies (list): Output frequencies processed together in a cascade, None for output_frequency alone.
         extra (dict): Additional metadata key/value pairs.
     """
 
-    def __init__(self, input_files, output_directory, start_year, end_year, output_frequency, project, model, domain, variables=[], batch=1, **kwargs):
+    def __init__(self, input_files, output_directory, start_year, end_year, output_frequency, project, model, domain, variables=[], batch=1, output_frequencies=None, **kwargs):
         
         self.input_files = input_files
         self.output_directory = output_directory
@@ -48,6 +53,7 @@ class Payload:
         
         self.variables = variables
         self.output_frequency = output_frequency
+        self.output_frequencies = output_frequencies
 
         self.batch = batch
 
@@ -64,9 +70,22 @@ class Payload:
             >>> filename = payload.get_filename()
         """
         bbb = str(self.batch).zfill(3)
-        return f'payload.{self.start_year}.{self.output_frequency}.{bbb}.json'
+        frequency = '-'.join(self.get_output_frequencies())
+        return f'payload.{self.start_year}.{frequency}.{bbb}.json'
     
 
+    def get_output_frequencies(self):
+        """Get the output frequencies processed by this payload.
+
+        Returns:
+            list : Output frequencies.
+
+        Examples:
+            >>> for output_frequency in payload.get_output_frequencies():
+        """
+        return list(self.output_frequencies or [self.output_frequency])
+
+
     def to_dict(self):
         """Convert the Payload object to a dictionary.
 
@@ -143,7 +162,7 @@ def generate_payloads(input_files, output_directory, start_year, end_year, proje
         domain (str): Domain key from domains.json.
         variables (list(str), optional): List of variables to project. Defaults to None (read all from schema).
         schema (str): Schema name or filepath.
-        output_frequencies (list(str), optional): List of output frequencies. Defaults to ['1H', '6H', '1D', '1M'].
+        output_frequencies (list(str), optional): List of output frequencies, grouped into a single payload with cascade_frequencies in drs.json. Defaults to ['1H', '6H', '1D', '1M'].
         num_batches (int, optional): Number of batches to split processing into. Defaults to 1.
         **extra : Key/value pairs added as additional metadata.
     
@@ -161,9 +180,26 @@ def generate_payloads(input_files, output_directory, start_year, end_year, proje
     # Batch if required (could be a single batch)
     batches = au.batch_split(variables, num_batches)
 
-    for year in range(start_year, end_year+1):
+    years = range(start_year, end_year+1)
+
+    # Skip years without inputs, if the input index is enabled
+    config = load_config('drs')
+    if config.input_index['enable'] and isinstance(input_files, str):
+        with InputIndex(config.input_index['filepath']) as index:
+
+            if config.input_index['auto_update']:
+                index.update(input_files, read_time_axis=config.input_index['read_time_axis'])
+
+            available_years = set(index.years(input_files))
+
+        years = [year for year in years if year in available_years]
+
+    for year in years:
+
+        for group in adu.group_output_frequencies(output_frequencies):
 
-        for output_frequency in output_frequencies:
+            # Cascaded frequencies are listed separately, output_frequency is always a single frequency
+            group = au.pluralise(group)
 
             for batch_ix, batch in enumerate(batches):
         
@@ -176,8 +212,9 @@ def generate_payloads(input_files, output_directory, start_year, end_year, proje
                     domain=domain,
                     start_year=year,
                     end_year=year,
-                    variables=batch,
-                    output_frequency=output_frequency,
+                    variables=list(batch),
+                    output_frequency=group[0],
+                    output_frequencies=group if len(group) > 1 else None,
                     batch=batch_ix,
                     **extra
                 )
@@ -42,7 +42,7 @@ def preprocess_ccam(ds, **kwargs):
 
     Args:
         ds (xarray.Dataset): Dataset.
-        variable (str): Variable to extract along with bnds. Must be used as part of a lambda in open_mfdataset
+        variable (str or list): Variable(s) to extract along with bnds. Must be used as part of a lambda in open_mfdataset
 
     Returns:
         xarray.Dataset: Dataset with preprocessing applied.
@@ -64,7 +64,11 @@ def preprocess_ccam(ds, **kwargs):
     ds = _set_version_metadata(ds, version)
         
     # Extract the lat/lon bounds as well.
-    if variable:
+    if isinstance(variable, list):
+        # Batched variables, not every file will necessarily contain all of them.
+        ds = ds[[v for v in variable if v in ds.data_vars.keys()] + ['lat_bnds', 'lon_bnds']]
+
+    elif variable:
         ds = ds[[variable, 'lat_bnds', 'lon_bnds']]
 
     return ds
@@ -0,0 +1,217 @@
+"""Store of historical runtimes, from which timeouts are derived per variable, output frequency and resolution."""
+import os
+import sqlite3
+from datetime import datetime
+import numpy as np
+import axiom.utilities as au
+from axiom.config import load_config
+from axiom.supervisor import get_timeout as get_static_timeout
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS runtimes (
+        stage TEXT NOT NULL,
+        variable TEXT NOT NULL,
+        output_frequency TEXT NOT NULL,
+        resolution REAL,
+        years INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        recorded TEXT NOT NULL,
+        jobid TEXT
+    )""",
+    'CREATE INDEX IF NOT EXISTS runtimes_key ON runtimes (stage, variable, output_frequency, resolution, years)'
+]
+
+
+def get_store_filepath():
+    """Get the path to the runtime store from configuration.
+
+    Returns:
+        str : Path to the store database, defaults to $HOME/.axiom/runtimes.sqlite.
+    """
+    filepath = load_config('drs').adaptive_timeouts['filepath']
+    return filepath or os.path.join(au.get_user_data_root(), 'runtimes.sqlite')
+
+
+class RuntimeStore:
+
+    """Persistent (SQLite) store of the runtimes of successful stages of processing.
+
+    Runtimes are keyed by stage (see watchdog.timeouts in drs.json), variable, output frequency, input resolution and
+    the number of years processed.
+
+    Usage:
+        >>> with RuntimeStore() as store:
+        >>>     store.record('compute', 'tas', '1D', 10.0, 1, 42.0)
+        >>>     seconds = store.quantile('compute', 'tas', '1D', 10.0, 1, 0.99)
+
+    Args:
+        filepath (str, optional): Path to the store database. Defaults to None (see get_store_filepath).
+    """
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath or get_store_filepath()
+        os.makedirs(os.path.dirname(os.path.abspath(self.filepath)), exist_ok=True)
+        self.connection = sqlite3.connect(self.filepath, timeout=60)
+
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+
+    def close(self):
+        """Close the connection to the store."""
+        self.connection.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+    def record(self, stage, variable, output_frequency, resolution, years, seconds):
+        """Record the runtime of a stage.
+
+        Args:
+            stage (str): Stage, i.e. compute.
+            variable (str): Variable.
+            output_frequency (str): Output frequency.
+            resolution (float): Input resolution in km, may be None.
+            years (int): Number of years processed.
+            seconds (float): Runtime in seconds.
+        """
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO runtimes VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (stage, variable, output_frequency, resolution, years, seconds, datetime.utcnow().isoformat(), os.getenv('PBS_JOBID'))
+            )
+
+
+    def runtimes(self, stage, variable, output_frequency, resolution, years, limit=None):
+        """Get the most recent runtimes of a stage.
+
+        Args:
+            stage (str): Stage, i.e. compute.
+            variable (str): Variable.
+            output_frequency (str): Output frequency.
+            resolution (float): Input resolution in km, may be None.
+            years (int): Number of years processed.
+            limit (int, optional): Maximum number of runtimes. Defaults to None (all of them).
+
+        Returns:
+            list : Runtimes in seconds, most recent first.
+        """
+        rows = self.connection.execute(
+            """SELECT seconds FROM runtimes
+            WHERE stage = ? AND variable = ? AND output_frequency = ? AND resolution IS ? AND years = ?
+            ORDER BY rowid DESC LIMIT ?""",
+            (stage, variable, output_frequency, resolution, years, -1 if limit is None else limit)
+        )
+        return [row[0] for row in rows]
+
+
+    def quantile(self, stage, variable, output_frequency, resolution, years, quantile, min_samples=1, limit=None):
+        """Get a quantile of the runtimes of a stage.
+
+        Args:
+            stage (str): Stage, i.e. compute.
+            variable (str): Variable.
+            output_frequency (str): Output frequency.
+            resolution (float): Input resolution in km, may be None.
+            years (int): Number of years processed.
+            quantile (float): Quantile, i.e. 0.99.
+            min_samples (int, optional): Number of runtimes required. Defaults to 1.
+            limit (int, optional): Only use the most recent runtimes. Defaults to None (all of them).
+
+        Returns:
+            float : Seconds, None with fewer than min_samples runtimes.
+        """
+        runtimes = self.runtimes(stage, variable, output_frequency, resolution, years, limit=limit)
+
+        if len(runtimes) == 0 or len(runtimes) < min_samples:
+            return None
+
+        return float(np.quantile(runtimes, quantile))
+
+
+def is_enabled():
+    """Check if adaptive timeouts are enabled.
+
+    Returns:
+        bool : True if enabled.
+    """
+    return bool(load_config('drs').adaptive_timeouts['enable'])
+
+
+def get_timeout(stage, variable, output_frequency, resolution, years=1):
+    """Get the timeout of a stage from historical runtimes, quantile × factor (see adaptive_timeouts in drs.json).
+
+    The static timeout of the stage (see axiom.supervisor.get_timeout) is used when adaptive timeouts are disabled,
+    there are fewer than min_samples runtimes or the store cannot be read.
+
+    Args:
+        stage (str): Stage, i.e. compute.
+        variable (str): Variable.
+        output_frequency (str): Output frequency.
+        resolution (float): Input resolution in km, may be None.
+        years (int, optional): Number of years processed. Defaults to 1.
+
+    Returns:
+        float : Seconds.
+    """
+    static = get_static_timeout(stage)
+
+    if not is_enabled():
+        return static
+
+    logger = au.get_logger(__name__)
+    config = load_config('drs').adaptive_timeouts
+
+    try:
+        with RuntimeStore() as store:
+            seconds = store.quantile(
+                stage, variable, output_frequency, resolution, years,
+                quantile=config['quantile'],
+                min_samples=config['min_samples'],
+                limit=config['max_samples']
+            )
+    except sqlite3.Error as ex:
+        logger.warning(f'Unable to read runtimes ({ex}), using the static timeout.')
+        return static
+
+    if seconds is None:
+        logger.debug(f'Not enough runtimes for {stage} {variable} {output_frequency}, using the static timeout of {static} seconds.')
+        return static
+
+    timeout = max(seconds * config['factor'], config['min_seconds'])
+    if config['max_seconds']:
+        timeout = min(timeout, config['max_seconds'])
+
+    logger.info(f'Adaptive timeout for {stage} {variable} {output_frequency} is {timeout:.0f} seconds (p{config["quantile"] * 100:g} {seconds:.0f} seconds).')
+    return timeout
+
+
+def record_runtime(stage, variable, output_frequency, resolution, seconds, years=1):
+    """Record the runtime of a successful stage, if adaptive timeouts are enabled.
+
+    Failures to record are logged rather than raised, so they do not fail the processing.
+
+    Args:
+        stage (str): Stage, i.e. compute.
+        variable (str): Variable.
+        output_frequency (str): Output frequency.
+        resolution (float): Input resolution in km, may be None.
+        seconds (float): Runtime in seconds.
+        years (int, optional): Number of years processed. Defaults to 1.
+    """
+    if not is_enabled():
+        return
+
+    try:
+        with RuntimeStore() as store:
+            store.record(stage, variable, output_frequency, resolution, years, seconds)
+    except sqlite3.Error as ex:
+        au.get_logger(__name__).warning(f'Unable to record the runtime of {stage} {variable}: {ex}')
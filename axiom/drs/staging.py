@@ -0,0 +1,199 @@
+"""Staging of outputs on node-local storage (i.e. $PBS_JOBFS), copied to the DRS destination in the background."""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from concurrent.futures import wait as wait_futures
+from axiom.config import load_config
+from axiom.exceptions import OutputSanityException
+import axiom.utilities as au
+import axiom.drs.instrumentation as ain
+
+
+# Stager of the processing currently underway, see get_stager
+_STAGER = None
+
+MB = 1024 ** 2
+
+
+def get_stager():
+    """Get the stager of the processing currently underway.
+
+    Returns:
+        Stager : Stager, None if outputs are not being staged.
+    """
+    return _STAGER
+
+
+class Stager:
+
+    """Copy staged outputs into place in a pool of threads, so that the next variable can compute in the meantime.
+
+    The stager is active from creation until it is closed, copies that fail are retried and those that still fail
+    are returned from close().
+
+    Usage:
+        >>> stager = Stager()
+        >>> stager.submit(write, commit)
+        >>> failed = stager.close()
+
+    Args:
+        threads (int, optional): Number of copies in flight. Defaults to None (staging.threads in drs.json).
+        retries (int, optional): Number of times to retry a failed copy. Defaults to None (staging.retries in drs.json).
+        retry_seconds (float, optional): Seconds to wait before retrying, multiplied by the attempt. Defaults to None (staging.retry_seconds in drs.json).
+        max_pending (int, optional): Number of staged outputs after which submit() waits for a copy to finish, bounding the space used on node-local storage. Defaults to None (staging.max_pending in drs.json).
+    """
+
+    def __init__(self, threads=None, retries=None, retry_seconds=None, max_pending=None):
+        global _STAGER
+
+        config = load_config('drs').staging
+
+        self.threads = threads or config['threads']
+        self.retries = config['retries'] if retries is None else retries
+        self.retry_seconds = config['retry_seconds'] if retry_seconds is None else retry_seconds
+        self.max_pending = max_pending or config['max_pending']
+
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='axiom-staging')
+        self.futures = dict()
+        self.failed = list()
+
+        # Throughput
+        self.lock = threading.Lock()
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+        self.logger = au.get_logger(__name__)
+
+        _STAGER = self
+
+    def submit(self, write, commit):
+        """Copy a staged output into place in the background.
+
+        Args:
+            write (dict): Write from _process_dataset, with filepath, write_filepath and variable keys.
+            commit (callable): Function to move the output into place, called as commit(write, discard=bool).
+        """
+        pending = [future for future in self.futures.keys() if not future.done()]
+
+        if len(pending) >= self.max_pending:
+            self.logger.info(f'{len(pending)} staged outputs are waiting to be copied, waiting for one to finish.')
+            wait_futures(pending, return_when=FIRST_COMPLETED)
+
+        future = self.executor.submit(self._copy, write, commit)
+        self.futures[future] = write
+
+    def _copy(self, write, commit):
+        """Copy an output into place, with retries.
+
+        Args:
+            write (dict): Write from _process_dataset.
+            commit (callable): Function to move the output into place.
+        """
+        size = os.path.getsize(write['write_filepath'])
+        attempt = 1
+
+        while True:
+
+            start = time.perf_counter()
+
+            try:
+                with ain.span('copy', variable=write['variable'], attempt=attempt) as record:
+                    commit(write, discard=attempt > self.retries)
+                    record['bytes_written'] = size
+
+            # Nothing to be gained from another attempt
+            except OutputSanityException:
+                raise
+
+            except Exception as ex:
+
+                if attempt > self.retries:
+                    raise
+
+                seconds = self.retry_seconds * attempt
+                self.logger.warning(f'Unable to copy {write["filepath"]} ({ex}), retrying in {seconds} seconds.')
+                time.sleep(seconds)
+                attempt += 1
+                continue
+
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.files += 1
+                self.bytes += size
+                self.seconds += elapsed
+
+            self.logger.info(f'Copied {write["filepath"]} ({size / MB:.1f} MB at {get_rate(size, elapsed):.1f} MB/s).')
+            return
+
+    def get_throughput(self):
+        """Get the throughput of the copies so far.
+
+        Returns:
+            dict : Dictionary with files, bytes, seconds (spent copying, summed across threads) and mb_per_second (per thread).
+        """
+        with self.lock:
+            return dict(
+                files=self.files,
+                bytes=self.bytes,
+                seconds=self.seconds,
+                mb_per_second=get_rate(self.bytes, self.seconds)
+            )
+
+    def wait(self):
+        """Wait for the copies submitted so far.
+
+        Returns:
+            list : Writes that failed (since the last wait), with the exception added under the exception key.
+        """
+        failed = list()
+
+        for future, write in list(self.futures.items()):
+
+            exception = future.exception()
+
+            if exception is not None:
+                self.logger.error(f'Unable to copy {write["filepath"]}: {exception}')
+                failed.append(dict(write, exception=exception))
+
+            del self.futures[future]
+
+        self.failed += failed
+
+        throughput = self.get_throughput()
+        self.logger.info(f'Copied {throughput["files"]} staged output(s), {throughput["bytes"] / MB:.1f} MB at {throughput["mb_per_second"]:.1f} MB/s per thread.')
+
+        return failed
+
+    def close(self):
+        """Wait for the remaining copies and deactivate the stager.
+
+        Returns:
+            list : Writes that failed, with the exception added under the exception key.
+        """
+        global _STAGER
+
+        try:
+            self.wait()
+            self.executor.shutdown()
+
+        finally:
+            if _STAGER is self:
+                _STAGER = None
+
+        return self.failed
+
+
+def get_rate(nbytes, seconds):
+    """Get a transfer rate.
+
+    Args:
+        nbytes (int): Bytes transferred.
+        seconds (float): Seconds taken.
+
+    Returns:
+        float : MB/s, 0 if no time was taken.
+    """
+    return nbytes / MB / seconds if seconds else 0.0
@@ -16,12 +16,15 @@ from calendar import monthrange
 import pandas as pd
 from datetime import datetime, timedelta
 from uuid import uuid4
-import re
-from axiom.exceptions import ResolutionDetectionException, MalformedDRSJSONPayloadException
+from axiom.exceptions import ResolutionDetectionException, MalformedDRSJSONPayloadException, OutputSanityException
 from cerberus import Validator
 from axiom.drs.domain import Domain
 from axiom.config import load_config
 import shutil
+import socket
+import functools
+import warnings
+import dask.array
 
 
 def is_fixed_variable(config, variable):
@@ -588,6 +591,7 @@ def filter_by_variable_name(filepaths, variable):
 
     Args:
         filepaths (list): List of filepaths.
+        variable (str or list): Variable name(s).
 
     Returns:
         list : List of filepaths that include the variable name.
@@ -598,18 +602,11 @@ def filter_by_variable_name(filepaths, variable):
     if not config['filename_filtering']['variable']:
         return filepaths
     
-    # Get the regex information, interpolate the variable name
-    pattern_template = config['filename_filtering']['variable_regex']
-    pattern = pattern_template % dict(variable=variable)
-
-    # Filter for the variable name
-    filtered_filepaths = list()
-    for filepath in filepaths:
-        filename = os.path.basename(filepath)
-        if re.search(pattern, filename):
-            filtered_filepaths.append(filepath)
-    
-    return filtered_filepaths
+    return filter_filepaths(
+        filepaths,
+        variables=variable,
+        variable_regex=config['filename_filtering']['variable_regex']
+    )
 
 
 def get_start_and_end_dates(year, output_frequency):
@@ -635,3 +632,751 @@ def generate_years_list(start_year, end_year):
         iterator : Years to process.
     """
     return range(start_year, end_year+1, 10)
+
+
+# Patterns used to parse filenames into records
+VARIABLE_REGEX = re.compile(r'^([^_.]+)_')
+# A date or date range (YYYY up to YYYYMMDDHHMM) at the end of the filename, before the extension(s)
+DATE_REGEX = re.compile(r'(?:^|[._])([0-9]{4})(?:[0-9]{2}){0,4}(?:-([0-9]{4})(?:[0-9]{2}){0,4})?(?:\.[A-Za-z][A-Za-z0-9]*)*$')
+RESOLUTION_REGEX = re.compile(r'([0-9.]+)km')
+
+
+def _parse_filepath(filepath):
+    """Parse a single filepath into a record tuple (see parse_filenames).
+
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        tuple : (path, filename, variable, start_year, end_year, resolution)
+    """
+    filename = filepath.rpartition(os.sep)[2]
+
+    match = VARIABLE_REGEX.match(filename)
+    variable = match.group(1) if match else None
+
+    match = DATE_REGEX.search(filename)
+    start_year = int(match.group(1)) if match else None
+    end_year = int(match.group(2) or match.group(1)) if match else None
+
+    # Resolution may also be in the directory structure
+    resolutions = set(RESOLUTION_REGEX.findall(filepath))
+    resolution = float(resolutions.pop()) if len(resolutions) == 1 else None
+
+    return filepath, filename, variable, start_year, end_year, resolution
+
+
+def parse_filenames(filepaths):
+    """Parse the variable, year range and resolution out of a list of filepaths, once, into structured records.
+
+    The variable is taken as everything before the first underscore of the filename, years from the date or date
+    range at the end of the filename (YYYY up to YYYYMMDDHHMM, i.e. _19900101-19901231.nc or .200001.nc) and the
+    resolution from a "<number>km" string anywhere in the path. Anything that can't be parsed is missing (None/NA).
+
+    Args:
+        filepaths (list): List of filepaths.
+
+    Returns:
+        pandas.DataFrame : Records with path, filename, variable, start_year, end_year and resolution columns.
+    """
+    records = pd.DataFrame(
+        [_parse_filepath(filepath) for filepath in filepaths],
+        columns=['path', 'filename', 'variable', 'start_year', 'end_year', 'resolution']
+    )
+
+    records['start_year'] = records['start_year'].astype('Int64')
+    records['end_year'] = records['end_year'].astype('Int64')
+    records['resolution'] = records['resolution'].astype(float)
+
+    return records
+
+
+def parse_filename(filepath):
+    """Parse the variable, year range and resolution out of a filepath (see parse_filenames).
+
+    Args:
+        filepath (str): Path to the file.
+
+    Returns:
+        dict : Dictionary with variable, start_year, end_year and resolution keys.
+    """
+    _, _, variable, start_year, end_year, resolution = _parse_filepath(filepath)
+    return dict(
+        variable=variable,
+        start_year=start_year,
+        end_year=end_year,
+        resolution=resolution
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def compile_variable_regex(variable_regex, variables):
+    """Compile the filename regex for one or more variables.
+
+    Args:
+        variable_regex (str): Regex template with a %(variable)s placeholder (see filename_filtering in drs.json).
+        variables (tuple): Variable names.
+
+    Returns:
+        re.Pattern : Compiled pattern matching a filename of any of the variables.
+    """
+    return re.compile('|'.join(f'(?:{variable_regex % dict(variable=variable)})' for variable in variables))
+
+
+def filter_filepaths(filepaths, variables=None, years=None, variable_regex=None):
+    """Filter filepaths by variable and year range, parsing each filename once.
+
+    Duplicate filepaths are removed, the order is otherwise preserved.
+
+    Args:
+        filepaths (list or pandas.DataFrame): List of filepaths or records from parse_filenames.
+        variables (str or list, optional): Keep files matching any of these variables. Defaults to None.
+        years (tuple, optional): Keep files overlapping the inclusive (start, end) year range, and those without a date in the filename. Defaults to None.
+        variable_regex (str, optional): Regex template for variables. Defaults to None (filename_filtering in drs.json).
+
+    Returns:
+        list : List of filtered filepaths.
+    """
+    records = filepaths if isinstance(filepaths, pd.DataFrame) else parse_filenames(filepaths)
+    mask = np.ones(len(records), dtype=bool)
+
+    if variables is not None:
+
+        if variable_regex is None:
+            variable_regex = load_config('drs')['filename_filtering']['variable_regex']
+
+        pattern = compile_variable_regex(variable_regex, tuple(au.pluralise(variables)))
+        mask &= np.fromiter((pattern.search(filename) is not None for filename in records['filename']), dtype=bool, count=len(records))
+
+    if years is not None:
+        start_year, end_year = years
+        mask &= ((records['start_year'] <= end_year) & (records['end_year'] >= start_year)).fillna(True).to_numpy(dtype=bool)
+
+    return records['path'][mask].drop_duplicates().tolist()
+
+
+def chunk_to_budget(ds, budget_mb, dim='time'):
+    """Rechunk a dataset along a dimension so that no variable chunk exceeds a memory budget.
+
+    Other dimensions are left whole, a single step along DIM that exceeds the budget is kept as one chunk.
+
+    Args:
+        ds (xarray.Dataset): Dataset.
+        budget_mb (float): Maximum size of a chunk in megabytes.
+        dim (str, optional): Dimension to chunk along. Defaults to 'time'.
+
+    Returns:
+        xarray.Dataset : Rechunked dataset.
+    """
+    if dim not in ds.dims:
+        return ds
+
+    # Size of one step along dim for the largest variable
+    step_bytes = max(
+        [ds[variable].dtype.itemsize * ds[variable].size // ds.sizes[dim] for variable in ds.data_vars if dim in ds[variable].dims],
+        default=0
+    )
+
+    if step_bytes == 0:
+        return ds
+
+    steps = int(max(1, min(ds.sizes[dim], budget_mb * 1024 ** 2 // step_bytes)))
+    return ds.chunk({dim: steps})
+
+
+def get_auxiliary_variables(da):
+    """Get the names of the variables a variable refers to in its CF attributes.
+
+    These are the grid_mapping (including the extended form, i.e. "crs: lat lon"), ancillary_variables,
+    coordinates and bounds attributes, which xarray may have moved into the encoding when decoding.
+
+    Args:
+        da (xarray.DataArray): Variable.
+
+    Returns:
+        list : Names of the referenced variables.
+    """
+    names = list()
+
+    for key in ['grid_mapping', 'ancillary_variables', 'coordinates', 'bounds']:
+
+        value = da.attrs.get(key, da.encoding.get(key))
+
+        if not isinstance(value, str):
+            continue
+
+        tokens = value.split()
+
+        # Extended grid_mapping lists the coordinates of each grid mapping variable after a colon
+        if key == 'grid_mapping' and ':' in value:
+            tokens = [token[:-1] for token in tokens if token.endswith(':')]
+
+        names += tokens
+
+    return names
+
+
+def select_variables(ds, variables):
+    """Select variables from the data, along with the bounds of each coordinate and the variables they refer to.
+
+    Variables named in the grid_mapping, ancillary_variables, coordinates and bounds attributes of those selected
+    (i.e. rotated_pole) are kept, so that the outputs do not refer to variables that do not exist.
+
+    Args:
+        ds (xarray.Dataset): Data.
+        variables (str or list): Variable(s), those missing from the data are ignored. None for all of them.
+
+    Returns:
+        xarray.Dataset : Data with just the variables, bounds and auxiliary variables.
+    """
+    if not variables:
+        return ds
+
+    bounds = list()
+    for coord in ds.coords.keys():
+        bounds += [ds[coord].attrs.get('bounds'), f'{coord}_bnds', f'{coord}_bounds']
+
+    selection = [name for name in au.pluralise(variables) + bounds if name in ds.data_vars.keys()]
+
+    # Auxiliary variables may refer to others in turn (i.e. their own bounds)
+    pending = list(selection)
+    while pending:
+        for name in get_auxiliary_variables(ds[pending.pop(0)]):
+            if name in ds.data_vars.keys() and name not in selection:
+                selection.append(name)
+                pending.append(name)
+
+    return ds[list(dict.fromkeys(selection))]
+
+
+def sort_lazily(ds, coords):
+    """Sort data by coordinates, only reordering those that are not already in ascending order.
+
+    Coordinates that are already ascending are left alone, strictly descending coordinates are reversed with a slice,
+    only the remainder are sorted with sortby (which indexes every chunk).
+
+    Args:
+        ds (xarray.Dataset): Data.
+        coords (list): Coordinates to sort by.
+
+    Returns:
+        tuple : Sorted data and the path taken for each coordinate (ascending, reversed or sorted).
+    """
+    paths = dict()
+    reverse = dict()
+    unsorted = list()
+
+    for coord in coords:
+
+        index = ds.indexes.get(coord) if ds[coord].ndim == 1 else None
+
+        if index is not None and index.is_monotonic_increasing:
+            paths[coord] = 'ascending'
+
+        # Reversing duplicates would not keep their order, as a stable sort does
+        elif index is not None and index.is_monotonic_decreasing and index.is_unique:
+            paths[coord] = 'reversed'
+            reverse[coord] = slice(None, None, -1)
+
+        else:
+            paths[coord] = 'sorted'
+            unsorted.append(coord)
+
+    if reverse:
+        ds = ds.isel(reverse)
+
+    if unsorted:
+        ds = ds.sortby(unsorted)
+
+    return ds, paths
+
+
+def get_window_steps(output_frequency, step):
+    """Get the number of input time steps in each resample window of an output frequency.
+
+    Args:
+        output_frequency (str): Output frequency, i.e. 1D.
+        step (pandas.Timedelta): Input time step.
+
+    Returns:
+        int : Steps per window, None if windows vary in length (i.e. months) or the frequency is not a resample.
+    """
+    try:
+        window = pd.to_timedelta(pd.tseries.frequencies.to_offset(output_frequency))
+    except (ValueError, TypeError):
+        return None
+
+    if step <= pd.Timedelta(0) or window % step != pd.Timedelta(0):
+        return None
+
+    return int(window // step)
+
+
+def get_input_chunks(filepath, variables, output_frequencies, target_mb, dim='time'):
+    """Derive the chunks to load inputs with from the on-disk chunking, dtype, a target size and the output frequencies.
+
+    Chunks along DIM are whole multiples of the on-disk chunk and of the resample windows of fixed-length output
+    frequencies (i.e. 24 steps for hourly to 1D), so no window straddles a chunk. A file that fits within the target is
+    loaded as a single chunk. Other dimensions are only split when a single window exceeds the target.
+
+    Args:
+        filepath (str): A representative input file.
+        variables (str or list): Variable(s) to be processed, the largest per time step is used.
+        output_frequencies (str or list): Output frequencies.
+        target_mb (float): Target chunk size in megabytes.
+        dim (str, optional): Time dimension. Defaults to 'time'.
+
+    Returns:
+        dict : Chunks by dimension name, None if the inputs are time-invariant.
+    """
+    logger = au.get_logger(__name__)
+
+    target_bytes = target_mb * 1024 ** 2
+
+    with xr.open_dataset(filepath, decode_cf=False) as ds:
+
+        candidates = [ds[variable] for variable in au.pluralise(variables) if variable in ds.data_vars.keys() and dim in ds[variable].dims]
+        candidates = candidates or [da for da in ds.data_vars.values() if dim in da.dims]
+
+        if len(candidates) == 0 or ds.sizes[dim] == 0:
+            return None
+
+        da = max(candidates, key=lambda da: da.dtype.itemsize * da.size // da.sizes[dim])
+        # Contiguous variables can be read in slabs of any size
+        disk = dict(zip(da.dims, da.encoding.get('chunksizes') or [1] * da.ndim))
+
+        steps = ds.sizes[dim]
+        step_bytes = da.dtype.itemsize * da.size // steps
+
+        times = xr.decode_cf(ds[[dim]])[dim].values
+        step = pd.Timedelta(np.median(np.diff(times))) if steps > 1 else pd.Timedelta(0)
+
+    # Chunks along dim are multiples of this
+    windows = [get_window_steps(output_frequency, step) for output_frequency in au.pluralise(output_frequencies)]
+    windows = [window for window in windows if window]
+    unit = np.lcm.reduce([disk[dim]] + windows)
+
+    target_steps = max(1, int(target_bytes // step_bytes))
+
+    if steps <= target_steps or unit >= steps:
+        chunks = {dim: -1}
+        time_steps = steps
+    else:
+        time_steps = int(max(unit, target_steps // unit * unit))
+        chunks = {dim: time_steps}
+
+    # Split the outermost other dimension when even one unit is too big
+    others = [_dim for _dim in da.dims if _dim != dim]
+    if others and step_bytes * time_steps > target_bytes:
+        outer = others[0]
+        outer_bytes = step_bytes * time_steps // da.sizes[outer]
+        outer_steps = max(1, int(target_bytes // outer_bytes))
+        outer_steps = max(disk[outer], outer_steps // disk[outer] * disk[outer])
+        if outer_steps < da.sizes[outer]:
+            chunks[outer] = outer_steps
+
+    chunk_bytes = step_bytes * time_steps
+    if len(chunks) > 1:
+        chunk_bytes = chunk_bytes * chunks[others[0]] // da.sizes[others[0]]
+
+    aligned = [output_frequency for output_frequency in au.pluralise(output_frequencies) if get_window_steps(output_frequency, step)]
+    aligned = f'aligned with {", ".join(aligned)} windows' if aligned else 'no fixed-length windows to align with'
+    logger.info(
+        f'Input chunks {chunks} (~{chunk_bytes / 1024 ** 2:.1f} MB of {da.name} {da.dtype}, on-disk chunks {disk}, '
+        f'{steps} steps per file, {aligned}).'
+    )
+
+    return chunks
+
+
+def _get_mean_dtype(dtype):
+    """Same dtype as a mean with xarray (i.e. float32 is kept, integers become float64)."""
+    return np.mean(np.zeros(1, dtype=dtype)).dtype
+
+
+def _broadcast_along(da, dim, size):
+    """Broadcast a variable without DIM along it, as xarray does when resampling a dataset."""
+    return da.variable.set_dims({dim: size, **da.sizes}).astype(_get_mean_dtype(da.dtype))
+
+
+def _block_mean(block, axis):
+    """Mean of a block along an axis, keeping the axis (NaNs are skipped, as with xarray)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmean(block, axis=axis, keepdims=True)
+
+
+def _block_sum(block, axis):
+    """Sum of a block along an axis, keeping the axis (NaNs are skipped, as with xarray)."""
+    return np.nansum(block, axis=axis, keepdims=True)
+
+
+# Blockwise reductions and their dtype, by name
+BLOCK_REDUCTIONS = dict(
+    mean=(_block_mean, _get_mean_dtype),
+    sum=(_block_sum, lambda dtype: np.sum(np.zeros(1, dtype=dtype)).dtype)
+)
+
+
+def resample_mean(ds, output_frequency, dim='time', label='left'):
+    """Resample to the mean of each window of an output frequency with a blockwise reduction.
+
+    Equivalent to ds.resample(time=output_frequency, label=label).mean(), but each variable is rechunked so that a
+    chunk holds exactly one window and each chunk is reduced on its own, with no communication between chunks. Falls
+    back to xarray where that is not possible, i.e. empty windows, non-standard calendars, data that are not backed by
+    dask, non-numeric variables or other coordinates along dim.
+
+    Args:
+        ds (xarray.Dataset): Data.
+        output_frequency (str): Output frequency, i.e. 1D.
+        dim (str, optional): Time dimension. Defaults to 'time'.
+        label (str, optional): Label of each window. Defaults to 'left'.
+
+    Returns:
+        xarray.Dataset : Resampled data.
+    """
+    return resample_blockwise(ds, output_frequency, how='mean', dim=dim, label=label)
+
+
+def resample_blockwise(ds, output_frequency, how='mean', dim='time', label='left'):
+    """Resample with a blockwise reduction of each window of an output frequency (see resample_mean).
+
+    Args:
+        ds (xarray.Dataset): Data.
+        output_frequency (str): Output frequency, i.e. 1D.
+        how (str, optional): Reduction, one of BLOCK_REDUCTIONS. Defaults to 'mean'.
+        dim (str, optional): Time dimension. Defaults to 'time'.
+        label (str, optional): Label of each window. Defaults to 'left'.
+
+    Returns:
+        xarray.Dataset : Resampled data.
+    """
+    logger = au.get_logger(__name__)
+
+    reduction, get_dtype = BLOCK_REDUCTIONS[how]
+
+    index = ds.indexes.get(dim)
+    timed = [da for da in ds.data_vars.values() if dim in da.dims]
+
+    counts = None
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 0:
+        counts = pd.Series(np.ones(len(index)), index=index).resample(output_frequency, label=label).count()
+
+    if (
+        counts is None or (counts == 0).any()
+        or any(dim in coord.dims for name, coord in ds.coords.items() if name != dim)
+        or any(not isinstance(da.data, dask.array.Array) or da.dtype.kind not in 'biuf' for da in timed)
+    ):
+        logger.debug('Unable to resample blockwise, using xarray.')
+        return getattr(ds.resample({dim: output_frequency}, label=label), how)()
+
+    windows = tuple(int(count) for count in counts.values)
+
+    variables = dict()
+    for name, da in ds.data_vars.items():
+
+        # Variables without the dimension are broadcast along it, as with xarray
+        if dim not in da.dims:
+            variables[name] = _broadcast_along(da, dim, len(windows))
+            continue
+
+        axis = da.get_axis_num(dim)
+        data = da.data.rechunk({axis: windows})
+        chunks = tuple((1,) * len(windows) if _axis == axis else _chunks for _axis, _chunks in enumerate(data.chunks))
+
+        reduced = data.map_blocks(reduction, axis=axis, dtype=get_dtype(da.dtype), chunks=chunks)
+        variables[name] = xr.Variable(da.dims, reduced, attrs=da.attrs)
+
+    coords = {name: coord.variable for name, coord in ds.coords.items() if name != dim}
+    coords[dim] = xr.Variable(dim, counts.index.values, attrs=ds[dim].attrs)
+
+    return xr.Dataset(variables, coords=coords, attrs=ds.attrs)
+
+
+def group_output_frequencies(output_frequencies):
+    """Group output frequencies into those processed together.
+
+    With cascade_frequencies in drs.json, all of the output frequencies are processed from a single read of the
+    inputs (see resample_cascade), otherwise each is processed on its own.
+
+    Args:
+        output_frequencies (str or list): Output frequencies.
+
+    Returns:
+        list : Output frequency (str), or output frequencies (list), for each group.
+    """
+    output_frequencies = au.pluralise(output_frequencies)
+
+    if load_config('drs').cascade_frequencies and len(output_frequencies) > 1:
+        return [list(output_frequencies)]
+
+    return list(output_frequencies)
+
+
+def is_nested_frequency(fine, coarse):
+    """Check if every resample window of a coarse frequency is made up of whole windows of a fine frequency.
+
+    Windows of fixed length (i.e. 6H, 1D) start at midnight, so they nest within a longer fixed length they divide
+    and within calendar windows (i.e. 1M) when they divide a day. Calendar windows are not used as a source.
+
+    Args:
+        fine (str): Fine frequency, i.e. 6H.
+        coarse (str): Coarse frequency, i.e. 1D.
+
+    Returns:
+        bool : True if nested.
+    """
+    try:
+        fine, coarse = pd.tseries.frequencies.to_offset(fine), pd.tseries.frequencies.to_offset(coarse)
+    except (ValueError, TypeError):
+        return False
+
+    if not isinstance(fine, pd.offsets.Tick) or fine == coarse:
+        return False
+
+    fine = pd.to_timedelta(fine)
+
+    if isinstance(coarse, pd.offsets.Tick):
+        coarse = pd.to_timedelta(coarse)
+        return coarse > fine and coarse % fine == pd.Timedelta(0)
+
+    return pd.Timedelta('1D') % fine == pd.Timedelta(0)
+
+
+def get_cascade(output_frequencies):
+    """Get the order in which to derive output frequencies from one another, finest first.
+
+    Args:
+        output_frequencies (list): Output frequencies, i.e. ['1H', '6H', '1D', '1M'].
+
+    Returns:
+        list : Tuples of output frequency and the output frequency it is derived from, None for the input data.
+    """
+    def _key(output_frequency):
+        offset = pd.tseries.frequencies.to_offset(output_frequency)
+        return pd.to_timedelta(offset) if isinstance(offset, pd.offsets.Tick) else pd.Timedelta(offset.n * 28, 'D')
+
+    cascade = list()
+    for output_frequency in sorted(dict.fromkeys(output_frequencies), key=_key):
+
+        # The coarsest earlier frequency that nests, as it has the fewest steps to reduce
+        sources = [source for source, _ in cascade if is_nested_frequency(source, output_frequency)]
+        cascade.append((output_frequency, sources[-1] if sources else None))
+
+    return cascade
+
+
+def resample_cascade(ds, output_frequencies, dim='time', label='left', persist=False):
+    """Resample to the mean of several output frequencies, deriving each from a finer one where possible.
+
+    The inputs are reduced once, to the finest frequency, alongside the number of valid values in each window. Each
+    coarser frequency is then the count-weighted mean of the finest one that nests within it (see get_cascade), so
+    missing values and windows of different lengths are weighted as a mean of the inputs would be. Reductions are
+    blockwise (see resample_blockwise).
+
+    Args:
+        ds (xarray.Dataset): Data.
+        output_frequencies (list): Output frequencies, i.e. ['1H', '6H', '1D', '1M'].
+        dim (str, optional): Time dimension. Defaults to 'time'.
+        label (str, optional): Label of each window. Defaults to 'left'.
+        persist (bool, optional): Persist each frequency before deriving the next. Defaults to False.
+
+    Returns:
+        dict : Resampled data by output frequency, finest first.
+    """
+    logger = au.get_logger(__name__)
+
+    timed = [name for name, da in ds.data_vars.items() if dim in da.dims]
+    others = [name for name in ds.data_vars.keys() if name not in timed]
+
+    _resample = functools.partial(resample_blockwise, dim=dim, label=label)
+
+    means, counts, resampled = dict(), dict(), dict()
+
+    for output_frequency, source in get_cascade(output_frequencies):
+
+        if source is None:
+            logger.debug(f'Resampling to {output_frequency} mean from the inputs.')
+            mean = _resample(ds[timed], output_frequency, how='mean')
+            count = _resample(ds[timed].notnull().astype('int32'), output_frequency, how='sum')
+
+        else:
+            logger.debug(f'Resampling to {output_frequency} mean from {source}.')
+            weights = counts[source]
+            total = _resample(means[source] * weights, output_frequency, how='sum')
+            count = _resample(weights, output_frequency, how='sum')
+            mean = total / count.where(count > 0)
+            mean = xr.Dataset({name: mean[name].astype(_get_mean_dtype(ds[name].dtype)) for name in timed})
+
+        count = count.astype('int32')
+
+        if persist:
+            mean, count = mean.persist(), count.persist()
+
+        means[output_frequency], counts[output_frequency] = mean, count
+
+        _ds = mean.copy()
+        for name in timed:
+            _ds[name].attrs = dict(ds[name].attrs)
+
+        for name in others:
+            _ds[name] = _broadcast_along(ds[name], dim, _ds.sizes[dim])
+
+        _ds.attrs = dict(ds.attrs)
+        resampled[output_frequency] = _ds[list(ds.data_vars.keys())]
+
+    return resampled
+
+
+# Leading bytes of NetCDF files, HDF5 (NETCDF4) and classic/64-bit offset/64-bit data.
+NETCDF_SIGNATURES = [b'\x89HDF\r\n\x1a\n', b'CDF\x01', b'CDF\x02', b'CDF\x05']
+
+
+def get_temporary_filepath(output_filepath, tmp_directory=None):
+    """Get a temporary filepath to write an output to before it is moved into place.
+
+    Args:
+        output_filepath (str): Final path of the output.
+        tmp_directory (str, optional): Directory for the temporary file, 'jobfs' for $PBS_JOBFS. Defaults to None (the output directory).
+
+    Returns:
+        str : Temporary filepath, unique to this process.
+    """
+    if tmp_directory == 'jobfs':
+        tmp_directory = os.getenv('PBS_JOBFS')
+
+    filename = os.path.basename(output_filepath)
+
+    # Hidden, so that a killed job leaves nothing that looks like an output. The host and pid identify the writer,
+    # so that files left by killed jobs can be removed (see remove_stale_temporary_files).
+    if not tmp_directory:
+        return os.path.join(os.path.dirname(output_filepath), f'.{filename}.{socket.gethostname()}.{os.getpid()}.tmp')
+
+    os.makedirs(tmp_directory, exist_ok=True)
+    return os.path.join(tmp_directory, f'{uuid4().hex}.{filename}')
+
+
+def remove_stale_temporary_files(directory):
+    """Remove the temporary outputs (see get_temporary_filepath) left in a directory by killed jobs.
+
+    Only files written by processes on this host that are no longer running are removed, those of other hosts cannot
+    be checked and are left alone.
+
+    Args:
+        directory (str): Output directory.
+
+    Returns:
+        list : Removed filepaths.
+    """
+    pattern = re.compile(r'^\..+\.' + re.escape(socket.gethostname()) + r'\.(\d+)\.tmp$')
+    removed = list()
+
+    try:
+        filenames = os.listdir(directory)
+    except FileNotFoundError:
+        return removed
+
+    for filename in filenames:
+
+        match = pattern.match(filename)
+        if match is None or au.is_process_running(int(match.group(1))):
+            continue
+
+        filepath = os.path.join(directory, filename)
+        discard_output(filepath)
+        removed.append(filepath)
+
+    return removed
+
+
+def check_output(filepath, variable=None, min_bytes=0):
+    """Check that an output file is a readable NetCDF file.
+
+    Only the size, signature and header are read, not the data.
+
+    Args:
+        filepath (str): Path to the file.
+        variable (str, optional): Variable expected in the file. Defaults to None.
+        min_bytes (int, optional): Minimum size of the file. Defaults to 0.
+
+    Raises:
+        OutputSanityException : When the file fails the check.
+    """
+    size = os.path.getsize(filepath)
+    if size < max(min_bytes, 1):
+        raise OutputSanityException(f'{filepath} is {size} bytes, expected at least {min_bytes}.')
+
+    with open(filepath, 'rb') as output:
+        header = output.read(8)
+
+    if not any(header.startswith(signature) for signature in NETCDF_SIGNATURES):
+        raise OutputSanityException(f'{filepath} is not a NetCDF file.')
+
+    # HDF5 files are read through h5py, which can decode any filter registered by hdf5plugin (see axiom.drs.encoding)
+    engine = 'h5netcdf' if header.startswith(NETCDF_SIGNATURES[0]) else None
+
+    try:
+        with xr.open_dataset(filepath, engine=engine, decode_times=False, decode_cf=False) as ds:
+            variables = list(ds.variables.keys())
+    except Exception as ex:
+        raise OutputSanityException(f'Unable to read the header of {filepath}: {ex}')
+
+    if variable is not None and variable not in variables:
+        raise OutputSanityException(f'{variable} is missing from {filepath}.')
+
+
+def commit_output(tmp_filepath, output_filepath, variable=None, discard=True):
+    """Move a written output from its temporary filepath into place, after an optional sanity check.
+
+    The final path only ever holds a complete file. Temporary files on another filesystem (i.e. $PBS_JOBFS) are
+    copied next to the output first, so the final step is always a rename.
+
+    Args:
+        tmp_filepath (str): Temporary filepath (see get_temporary_filepath).
+        output_filepath (str): Final path of the output.
+        variable (str, optional): Variable expected in the file, for the sanity check. Defaults to None.
+        discard (bool, optional): Remove the temporary file if the move fails, False to allow another attempt. Defaults to True.
+
+    Raises:
+        OutputSanityException : When the file fails the sanity check (atomic_writes.sanity_check in drs.json), it is always removed.
+    """
+    config = load_config('drs')
+
+    if config.atomic_writes['sanity_check']:
+        try:
+            check_output(tmp_filepath, variable=variable, min_bytes=config.atomic_writes['min_bytes'])
+        except OutputSanityException:
+            discard_output(tmp_filepath)
+            raise
+
+    # Same directory unless the file was written elsewhere
+    staged_filepath = tmp_filepath
+
+    try:
+        if os.path.dirname(os.path.abspath(tmp_filepath)) != os.path.dirname(os.path.abspath(output_filepath)):
+            staged_filepath = get_temporary_filepath(output_filepath)
+            shutil.copyfile(tmp_filepath, staged_filepath)
+
+        os.replace(staged_filepath, output_filepath)
+
+    except BaseException:
+        if staged_filepath != tmp_filepath:
+            discard_output(staged_filepath)
+        if discard:
+            discard_output(tmp_filepath)
+        raise
+
+    if staged_filepath != tmp_filepath:
+        discard_output(tmp_filepath)
+
+
+def discard_output(tmp_filepath):
+    """Remove a temporary output, if it exists.
+
+    Args:
+        tmp_filepath (str): Temporary filepath.
+    """
+    try:
+        os.remove(tmp_filepath)
+    except OSError:
+        pass
@@ -22,3 +22,7 @@ class DRSContextInterpolationException(Exception):
         msg = 'The following placeholders have been unsuccessfully interpolated:\n'
         msg += '\n'.join(placeholders)
         super().__init__(msg)
+
+class OutputSanityException(Exception):
+    """Raised when a written output file fails the sanity check before being moved into place."""
+    pass
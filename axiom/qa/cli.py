@@ -67,7 +67,7 @@ def qc(schema, payload, start_year, end_year, report_dir=None, nstd=2.0, pct_mea
     logger = au.get_logger(__name__)
 
     # Start building context
-    context = config.get('metadata_defaults')
+    context = config.get('metadata_defaults').copy()
     
     drs_template = adu.get_template(config, 'drs_path')
     filename_template = adu.get_template(config, 'filename')
@@ -83,18 +83,21 @@ def qc(schema, payload, start_year, end_year, report_dir=None, nstd=2.0, pct_mea
     context['gcm_model'] = '*'
     context['rcm_model'] = '*'
 
-    context['frequency_mapping'] = config.get('frequency_mapping')[_payload.output_frequency]
+    # A payload may process several output frequencies in a cascade
+    output_frequencies = _payload.get_output_frequencies()
 
     expected_filepaths = list()
     variables = list()
     years = list()
+    frequencies = list()
 
     # Create a list of variables to check
     variables2check = _schema['variables'].keys()
     variables2ignore = list()
 
-    # Get a list of variables that are in the input directory to exclude.
+    # Get a list of variables that are in the input directory to exclude, with the frequency of each.
     input_variables = list()
+    input_frequencies = dict()
 
     logger.info('Assembling a list of variables to check.')
 
@@ -123,34 +126,45 @@ def qc(schema, payload, start_year, end_year, report_dir=None, nstd=2.0, pct_mea
                 ds = xr.open_dataset(input_filepath, chunks=dict(time=1))
                 freq = adu.detect_input_frequency(ds)
             
-                if freq != _payload.output_frequency and config.allow_subdaily_resampling == False:
+                if all(freq != output_frequency for output_frequency in output_frequencies) and config.allow_subdaily_resampling == False:
                     logger.info(f'{input_variable} is on a different frequency and allow_subdaily_resampling is disabled. Ignoring')
                     variables2ignore.append(input_variable)
                     continue
 
+                input_frequencies[input_variable] = freq
+
             logger.info(f'Adding {input_variable} to the list to be checked.')                    
             input_variables.append(input_variable)
 
         # Perform an intersection to get the true list of variables to check.
         variables2check = list(set(variables2check) & set(input_variables))
 
-    # Loop through all of the variables
-    for variable in variables2check:
-        
-        for year in range(start_year, end_year+1):
-
-            context['variable'] = variable
-            context['start_date'], context['end_date'] = adu.get_start_and_end_dates(year, _payload.output_frequency)
-            drs_path = drs_template % context
-            filename = filename_template % context
-            expected_filepath = os.path.join(drs_path, filename)
-            expected_filepaths.append(expected_filepath)
-            variables.append(variable)
-            years.append(year)
+    # Loop through all of the variables and output frequencies
+    for output_frequency in output_frequencies:
+
+        context['frequency_mapping'] = config.get('frequency_mapping')[output_frequency]
+
+        for variable in variables2check:
+
+            # Only the frequencies of the inputs are expected without subdaily resampling
+            if variable in input_frequencies and input_frequencies[variable] != output_frequency and config.allow_subdaily_resampling == False:
+                continue
+
+            for year in range(start_year, end_year+1):
+
+                context['variable'] = variable
+                context['start_date'], context['end_date'] = adu.get_start_and_end_dates(year, output_frequency)
+                drs_path = drs_template % context
+                filename = filename_template % context
+                expected_filepath = os.path.join(drs_path, filename)
+                expected_filepaths.append(expected_filepath)
+                variables.append(variable)
+                years.append(year)
+                frequencies.append(output_frequency)
     
     # Check all of the files in parallel
     logger.info(f'Checking timeseries...')
-    results = parallelise(_check_file, num_threads=8, filepath=expected_filepaths, year=years, variable=variables)
+    results = parallelise(_check_file, num_threads=8, filepath=expected_filepaths, year=years, variable=variables, output_frequency=frequencies)
     results = unpack_results(results)
 
     # Assemble a dataframe for aggregate statistics
@@ -160,11 +174,8 @@ def qc(schema, payload, start_year, end_year, report_dir=None, nstd=2.0, pct_mea
     df_nan = None
     df_pct_mean = None
 
-    # Check the results
-    for variable in df.variable.unique().tolist():
-
-        # Extract just this variable
-        var_df = df[df.variable == variable]
+    # Check the results, file sizes are only comparable within an output frequency
+    for (variable, output_frequency), var_df in df.groupby(['variable', 'output_frequency'], sort=False):
 
         # Do nan check
         if 'nan' in checks:
@@ -282,11 +293,11 @@ def _filter_nan(df):
     return df[df['size'].isnull()]
 
 
-def _check_file(filepath, year, variable):
+def _check_file(filepath, year, variable, output_frequency):
 
     found_files = au.auto_glob(filepath)
 
-    result = dict(year=year, variable=variable)
+    result = dict(year=year, variable=variable, output_frequency=output_frequency)
 
     # Check if the variable is actually fixed?
     fixed_path = os.path.join(
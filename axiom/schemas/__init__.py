@@ -2,8 +2,10 @@
 import os
 import glob
 import json
+import re
 from importlib.metadata import version
-from axiom.utilities import get_installed_data_root, get_user_data_root
+from axiom.utilities import get_installed_data_root, get_user_data_root, compile_schema_plan
+from axiom.config import freeze
 
 
 # Order dependent, user to override system
@@ -20,7 +22,7 @@ def list_schema_filepaths():
         list: List of filepaths
     """
     schema_filepaths = list()
-    # Get the installed schemas first, then the user schemas
+    # Get the user schemas first, then the installed schemas
     for schema_dir in SCHEMA_DIRS:
         if os.path.isdir(schema_dir):
             schema_filepaths += sorted(glob.glob(os.path.join(schema_dir, '*.json')))
@@ -28,36 +30,84 @@ def list_schema_filepaths():
     return schema_filepaths
     
 
+# Process-wide caches (see get_schema_manifest and load_schema_file)
+_MANIFEST_CACHE = dict()
+_SCHEMA_CACHE = dict()
+
+# The name is the first key of every schema file, which saves parsing the whole file to find it.
+NAME_REGEX = re.compile(r'^\s*\{\s*"name"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def read_schema_name(filepath):
+    """Read the name of a schema from the start of the file, falling back to parsing the whole file.
+
+    Args:
+        filepath (str): Path to the schema file.
+
+    Returns:
+        str : Schema name.
+    """
+    with open(filepath, 'r') as schema_file:
+        head = schema_file.read(1024)
+
+    match = NAME_REGEX.match(head)
+    if match:
+        return json.loads(match.group(1))
+
+    return load_schema_file(filepath)['name']
+
+
+def get_schema_manifest():
+    """Get a manifest of schema names and filepaths, without loading the schemas.
+
+    The manifest is cached until a schema file is added, removed or modified.
+
+    Returns:
+        dict : Dictionary of schema name: filepath
+    """
+    filepaths = list_schema_filepaths()
+    signature = tuple((filepath, os.path.getmtime(filepath)) for filepath in filepaths)
+
+    cached = _MANIFEST_CACHE.get('manifest')
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    # Note, user schemas will override system schemas
+    manifest = dict()
+    for schema_dir in reversed(SCHEMA_DIRS):
+        for schema_filepath in filepaths:
+            if os.path.dirname(schema_filepath) == schema_dir:
+                manifest[read_schema_name(schema_filepath)] = schema_filepath
+
+    _MANIFEST_CACHE['manifest'] = (signature, manifest)
+    return manifest
+
+
 def load_schemas():
     """Load all of the schemas into a dictionary object.
 
     Returns:
         dict : Dictionary of schemas
     """
-    schemas = dict()
-    for schema_filepath in list_schema_filepaths():
-        schema = load_schema_file(schema_filepath)
-
-        # Note, user schemas will override system schemas
-        schemas[schema['name']] = schema
-    
-    return schemas
+    return {name: load_schema_file(filepath) for name, filepath in get_schema_manifest().items()}
 
 
 def load_schema(key_or_filepath):
     """Load the schema.
 
+    Only the requested schema is parsed, see get_schema_manifest.
+
     Args:
         key_or_filepath (str): Schema key or filepath.
     
     Returns:
-        dict : Schema dictionary.
+        dict : Schema dictionary (read-only).
     """
 
-    # Load direct from the dictionary
-    schemas = load_schemas()
-    if key_or_filepath in schemas.keys():
-        return schemas[key_or_filepath]
+    # Load from the manifest
+    manifest = get_schema_manifest()
+    if key_or_filepath in manifest.keys():
+        return load_schema_file(manifest[key_or_filepath])
 
     # Attempt to load the file directly
     return load_schema_file(key_or_filepath)
@@ -66,14 +116,58 @@ def load_schema(key_or_filepath):
 def load_schema_file(filepath):
     """Actually load a schema filepath.
 
+    Schemas are cached until the file is modified, the object returned is shared and therefore read-only.
+
     Args:
         filepath (str): Path to the schema file.
     
     Returns:
         dict : Schema.
     """
-    return json.loads(open(filepath, 'r').read())
-    
+    filepath = os.path.abspath(filepath)
+    mtime = os.path.getmtime(filepath)
+
+    cached = _SCHEMA_CACHE.get(filepath)
+    if cached is not None and cached['mtime'] == mtime:
+        return cached['schema']
+
+    schema = freeze(json.loads(open(filepath, 'r').read()))
+    _SCHEMA_CACHE[filepath] = dict(mtime=mtime, schema=schema, attribute_maps=None)
+
+    return schema
+
+
+def compile_attribute_maps(schema):
+    """Compile the attributes with an expected value (the first allowed value) out of a schema.
+
+    Args:
+        schema (dict): Axiom schema dictionary.
+
+    Returns:
+        dict : Dictionary with _global (attribute: value) and variables (variable: attribute: value) keys.
+    """
+    return compile_schema_plan(schema)
+
+
+def load_attribute_maps(key_or_filepath):
+    """Load the attribute maps of a schema (see compile_attribute_maps), compiling them once per schema.
+
+    Args:
+        key_or_filepath (str): Schema key or filepath.
+
+    Returns:
+        dict : Dictionary with _global and variables keys (read-only).
+    """
+    schema = load_schema(key_or_filepath)
+
+    for cached in _SCHEMA_CACHE.values():
+        if cached['schema'] is schema:
+            if cached['attribute_maps'] is None:
+                cached['attribute_maps'] = freeze(compile_attribute_maps(schema))
+            return cached['attribute_maps']
+
+    return freeze(compile_attribute_maps(schema))
+
 
 def list_schemas():
     """List the available schemas (the json filepath).
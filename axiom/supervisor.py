@@ -1,5 +1,9 @@
-"""Supervisor class for handling long-running jobs."""
+"""Supervisor and watchdog classes for handling long-running jobs."""
+import math
 import signal
+import threading
+from distributed import futures_of, get_client
+from axiom.config import load_config
 
 class Supervisor:
 
@@ -42,4 +46,171 @@ class Supervisor:
     def __exit__(self, type, value, traceback):
         """Exit the context manager."""
         # Cancel any set timers.
-        signal.alarm(0)
\ No newline at end of file
+        signal.alarm(0)
+
+class Watchdog:
+
+    """Watchdog context manager, which cancels the dask futures of a section of code that does not complete in time.
+
+    Unlike Supervisor, the watchdog works from any thread. On timeout the watched futures are cancelled, so that they
+    stop using the workers, which interrupts any wait on them. The workers that were still processing can be
+    restarted as well. A TimeoutError is raised on exit in either case. Outside of the main thread, work that is not
+    watched (i.e. computed without a client) can only be detected as late once it has finished.
+
+    Usage:
+        >>> with Watchdog(seconds=10, error_msg='Code took too long.') as watchdog:
+        >>>     ds = watchdog.watch(ds.persist())
+        >>>     progress(ds)
+
+    Args:
+        seconds (int): Number of seconds to allow for the contained code to run, None for no limit.
+        error_msg (str): Error message to raise with the TimeoutError.
+        client (distributed.Client, optional): Dask client. Defaults to None (the current client, if any).
+        restart_workers (bool, optional): Restart the workers that were still processing on timeout. Defaults to None (watchdog.restart_workers in drs.json).
+    """
+
+    def __init__(self, seconds, error_msg, client=None, restart_workers=None):
+        self.seconds = seconds
+        self.error_msg = error_msg
+        self.client = client
+        self.restart_workers = load_config('drs').watchdog['restart_workers'] if restart_workers is None else restart_workers
+
+        self.futures = list()
+        self.timed_out = False
+        self.lock = threading.Lock()
+        self.timer = None
+        self.alarm = False
+        self.alarmed = False
+        self.previous_handler = None
+
+
+    def watch(self, obj):
+        """Watch the futures of an object, cancelling them on timeout.
+
+        Args:
+            obj (object): Future, list of futures or a persisted dask collection (i.e. xarray.Dataset).
+
+        Returns:
+            object : The object, for chaining.
+        """
+        with self.lock:
+            self.futures += futures_of(obj)
+            timed_out = self.timed_out
+
+        # Submitted after the timeout
+        if timed_out:
+            self._cancel()
+
+        return obj
+
+
+    def _get_client(self):
+        """Get the client of the watched futures."""
+        if self.client is not None:
+            return self.client
+
+        try:
+            return get_client()
+        except ValueError:
+            return None
+
+
+    def _cancel(self):
+        """Cancel the watched futures and optionally restart the workers that were still processing."""
+        with self.lock:
+            futures = list(self.futures)
+
+        client = self._get_client()
+
+        if client is None or len(futures) == 0:
+            return
+
+        workers = list()
+        if self.restart_workers:
+            keys = set(future.key for future in futures)
+            processing = client.processing()
+
+            # Workers still processing the watched tasks, otherwise any that are still busy
+            workers = [worker for worker, _keys in processing.items() if keys.intersection(_keys)]
+            workers = workers or [worker for worker, _keys in processing.items() if _keys]
+
+        client.cancel(futures, force=True)
+
+        if workers:
+            client.restart_workers(workers=workers, raise_for_error=False)
+
+
+    def _timeout(self):
+        """Mark the watchdog as timed out and cancel the watched futures."""
+        with self.lock:
+            self.timed_out = True
+
+        self._cancel()
+
+
+    def _alarm(self, signum, frame):
+        """Raise a TimeoutError from the main thread, for work that is not watched.
+
+        The main thread may hold the lock when the signal arrives, so this only flags the timeout, the watched futures
+        are cancelled on exit.
+
+        Args:
+            signum : Not used, added for compatibility.
+            frame : Not used, added for compatibility.
+
+        Raises:
+            TimeoutError: When the number of seconds expires.
+        """
+        self.alarmed = True
+        raise TimeoutError(self.error_msg)
+
+
+    def __enter__(self):
+        """Enter the context manager."""
+        if not self.seconds:
+            return self
+
+        self.timer = threading.Timer(self.seconds, self._timeout)
+        self.timer.daemon = True
+        self.timer.start()
+
+        # In the main thread, also interrupt work that is not watched (a second earlier than the timer would not).
+        if threading.current_thread() is threading.main_thread():
+            self.previous_handler = signal.signal(signal.SIGALRM, self._alarm)
+            signal.alarm(int(math.ceil(self.seconds)) + 1)
+            self.alarm = True
+
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        """Exit the context manager."""
+        if self.timer is not None:
+            self.timer.cancel()
+
+        if self.alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+
+        # Not already cancelled by the timer
+        if self.alarmed and not self.timed_out:
+            self.timed_out = True
+            self._cancel()
+
+        # The work was interrupted (or finished late), report the timeout rather than the cancellation
+        if self.timed_out and not isinstance(value, TimeoutError):
+            raise TimeoutError(self.error_msg) from value
+
+
+def get_timeout(stage):
+    """Get the timeout of a stage of processing.
+
+    Args:
+        stage (str): Stage, a key of watchdog.timeouts in drs.json (i.e. compute, write).
+
+    Returns:
+        int : Seconds, processing_timeout_seconds if the stage has no timeout of its own.
+    """
+    config = load_config('drs')
+    seconds = config.watchdog['timeouts'].get(stage)
+    return config.processing_timeout_seconds if seconds is None else seconds
@@ -0,0 +1,58 @@
+"""Test the completion records of DRS outputs."""
+import os
+import axiom.drs.checkpoints as acp
+
+
+def test_checkpoints(tmp_path):
+    """Test that completed outputs are recognised for the same run only, and not once changed."""
+    output_directory = str(tmp_path)
+    output_filepath = os.path.join(output_directory, 'a', 'b', 'tas.nc')
+    os.makedirs(os.path.dirname(output_filepath))
+
+    with open(output_filepath, 'wb') as output:
+        output.write(b'data')
+
+    args = dict(input_files='/inputs/*.nc', output_directory=output_directory, project='p', model='m', domain='d', start_year=2000, end_year=2000)
+    run = acp.get_run_key(dict(args, variable='tas', overwrite=True))
+
+    # The variables and overwrite flag do not change the run
+    assert run == acp.get_run_key(dict(args, variable='pr', overwrite=False))
+    assert run != acp.get_run_key(dict(args, start_year=2001))
+    assert run != acp.get_run_key(dict(args, run_id='payload.json@1'))
+
+    assert not acp.is_complete(output_filepath, output_directory, run)
+
+    record = acp.record_complete(output_filepath, output_directory, run, checksum='sha256')
+    assert record['filepath'] == os.path.join('a', 'b', 'tas.nc')
+    assert os.path.isfile(os.path.join(output_directory, '.checkpoints', 'a', 'b', 'tas.nc.json'))
+
+    assert acp.is_complete(output_filepath, output_directory, run, verify=True)
+    assert not acp.is_complete(output_filepath, output_directory, 'another run')
+
+    # Same size and mtime, different contents
+    stat = os.stat(output_filepath)
+    with open(output_filepath, 'wb') as output:
+        output.write(b'date')
+    os.utime(output_filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert acp.is_complete(output_filepath, output_directory, run, verify=False)
+    assert not acp.is_complete(output_filepath, output_directory, run, verify=True)
+
+    os.remove(output_filepath)
+    assert not acp.is_complete(output_filepath, output_directory, run)
+
+
+def test_run_key_inputs(tmp_path):
+    """Test that changed input files change the run."""
+    input_file = str(tmp_path / 'tas_2000.nc')
+
+    with open(input_file, 'wb') as data:
+        data.write(b'data')
+
+    args = dict(input_files=str(tmp_path / '*.nc'), output_directory=str(tmp_path), start_year=2000, end_year=2000)
+    run = acp.get_run_key(args, [input_file])
+    assert run == acp.get_run_key(args, [input_file])
+
+    stat = os.stat(input_file)
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert run != acp.get_run_key(args, [input_file])
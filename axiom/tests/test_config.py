@@ -1,4 +1,5 @@
 """Test the configuration object."""
+import pytest
 from axiom.config import Config, load_config
 
 
@@ -21,4 +22,20 @@ def test_keys_in_installed_drs_json():
             missing_keys.append(key)
     
     if len(missing_keys) > 0:
-        raise AssertionError('The following keys are missing from the installed defaults: ' + ', '.join(missing_keys))
\ No newline at end of file
+        raise AssertionError('The following keys are missing from the installed defaults: ' + ', '.join(missing_keys))
+
+def test_load_config_cached_read_only():
+    """Test that load_config returns a shared, read-only object."""
+    config = load_config('drs')
+    assert load_config('drs') is config
+
+    with pytest.raises(TypeError):
+        config.dask['enable'] = False
+
+    with pytest.raises(TypeError):
+        config.launch['directives'].append('-I')
+
+    # Copies are mutable
+    directives = list(config.launch['directives'])
+    directives.append('-I')
+    assert '-I' not in config.launch['directives']
@@ -1,6 +1,14 @@
 """Tests for the DRS subsystem."""
+import os
 import re
+import pytest
+import numpy as np
+import xarray as xr
+import axiom.drs as ad
 import axiom.drs.utilities as adu
+import axiom.drs.checkpoints as acp
+from axiom.drs.domain import Domain
+from axiom.exceptions import NoFilesToProcessException
 
 
 
@@ -19,6 +27,28 @@ def test_parse_domain():
     assert result == expected
 
 
+def test_domain_subset_xarray():
+    """Test subsetting by index, including a domain that crosses the antimeridian."""
+    ds = xr.Dataset(
+        dict(tas=(('lat', 'lon'), np.random.rand(10, 36))),
+        coords=dict(lat=np.linspace(-45, 45, 10), lon=np.arange(-180, 180, 10))
+    )
+
+    domain = Domain('test', 1.0, -20.0, 20.0, 100.0, 160.0)
+    xr.testing.assert_identical(domain.subset_xarray(ds), ds.sel(lat=slice(-20, 20), lon=slice(100, 160)))
+
+    # Slices are cached by grid
+    assert domain.get_indexers(ds) is domain.get_indexers(ds.copy(deep=True))
+
+    # Two slices either side of the antimeridian, joined from lon_min with longitude unwrapped
+    wrapped = Domain('wrapped', 1.0, -20.0, 20.0, 150.0, -160.0)
+    assert wrapped.subset_xarray(ds).lon.values.tolist() == [150, 160, 170, 180, 190, 200]
+
+    # A single slice on a 0-360 grid
+    ds = ds.assign_coords(lon=ds.lon % 360).sortby('lon')
+    assert wrapped.subset_xarray(ds).lon.values.tolist() == [150, 160, 170, 180, 190, 200]
+
+
 def test_get_uninterpolated_placeholders():
     """Test uninterpolated value check."""
     
@@ -28,4 +58,159 @@ def test_get_uninterpolated_placeholders():
 
     expect_nothing = 'this is a test of b'
     result = adu.get_uninterpolated_placeholders(expect_nothing)
-    assert len(result) == 0
\ No newline at end of file
+    assert len(result) == 0
+
+def test_find_input_files_multiple_variables():
+    """Test that filtering for a batch of variables keeps the files for each, in order."""
+    filepaths = [
+        'pr_ccam_10km.2000.nc',
+        'ps_ccam_10km.2000.nc',
+        'tas_ccam_10km.2000.nc',
+        'tas_ccam_10km.2010.nc',
+    ]
+
+    result = ad.find_input_files(filepaths, ['tas', 'pr'], 2000)
+    assert result == ['pr_ccam_10km.2000.nc', 'tas_ccam_10km.2000.nc']
+
+    with pytest.raises(NoFilesToProcessException):
+        ad.find_input_files(filepaths, ['orog'], 2000)
+
+
+def test_compute_writes(tmp_path):
+    """Test that deferred writes are computed together."""
+    ds = xr.Dataset(dict(tas=(('time',), np.arange(10.0)))).chunk(dict(time=5))
+
+    writes = list()
+    for i in range(2):
+        filepath = str(tmp_path / f'tas_{i}.nc')
+        writes.append(dict(variable='tas', output_frequency='1D', filepath=filepath, write=ds.to_netcdf(filepath, compute=False)))
+
+    assert ad.compute_writes(writes) == []
+    assert all(xr.open_dataset(write['filepath']).tas.sum() == 45 for write in writes)
+
+
+def test_compute_writes_timeout(tmp_path, monkeypatch):
+    """Test that writes still running on timeout are discarded as failed rather than moved into place."""
+    import time
+    import dask
+    from distributed import Client
+    import axiom.drs.runtimes as art
+
+    monkeypatch.setattr(art, 'get_timeout', lambda *args, **kwargs: 1)
+
+    def _write(filepath, seconds):
+        with open(filepath, 'w') as f:
+            f.write('partial')
+            f.flush()
+            time.sleep(seconds)
+            f.write(' complete')
+
+    writes = list()
+    for i, seconds in enumerate([0, 5]):
+        filepath = str(tmp_path / f'tas_{i}.nc')
+        write_filepath = adu.get_temporary_filepath(filepath)
+        writes.append(dict(
+            variable='tas', output_frequency='1D', filepath=filepath, write_filepath=write_filepath,
+            write=dask.delayed(_write)(write_filepath, seconds)
+        ))
+
+    with Client(n_workers=1, threads_per_worker=2, processes=False, dashboard_address=None) as client:
+        failed = ad.compute_writes(writes, client=client)
+
+    # Nothing is moved into place, even the write that finished in time
+    assert sorted(failure['filepath'] for failure in failed) == [write['filepath'] for write in writes]
+    assert all(isinstance(failure['exception'], TimeoutError) for failure in failed)
+    assert os.listdir(tmp_path) == []
+
+
+def test_consume_generated_payload(tmp_path, monkeypatch):
+    """Test that the batch index of a generated payload does not select batch processing."""
+    from axiom.drs.payload import generate_payloads
+
+    calls = list()
+    monkeypatch.setattr(ad, 'start_client', lambda: None)
+    monkeypatch.setattr(ad, 'stop_client', lambda client: None)
+    monkeypatch.setattr(ad, '_process_multi', lambda variables, domain, project, batch_variables, client, **kwargs: calls.append((batch_variables, kwargs)))
+
+    payloads = generate_payloads('files.nc', 'output', 2000, 2000, 'CORDEX', 'ACCESS', 'AUS-10i', ['tas', 'pr'], 'CORDEX', ['1D'], 2)
+
+    filepaths = list()
+    for payload in payloads:
+        filepath = str(tmp_path / payload.get_filename())
+        payload.to_json(filepath)
+        assert ad.consume(filepath)
+        filepaths.append(filepath)
+
+    # Left to batch_variables in drs.json, the index is passed through as metadata
+    assert [batch_variables for batch_variables, _ in calls] == [None, None]
+    assert [kwargs['batch'] for _, kwargs in calls] == [0, 1]
+
+    # Each payload is its own run for the completion records
+    assert [kwargs['run_id'] for _, kwargs in calls] == [acp.get_payload_run_id(filepath) for filepath in filepaths]
+
+
+def test_drain_releases_claims(tmp_path):
+    """Test that payloads that fail are released, and consumed payloads are skipped."""
+    failing = tmp_path / 'failing.json'
+    failing.write_text('not json')
+
+    consumed = tmp_path / 'consumed.json'
+    consumed.write_text('{}')
+    (tmp_path / 'consumed.consumed').touch()
+
+    assert ad.drain(str(tmp_path / '*.json')) == []
+    assert not os.path.isfile(f'{failing}.lock')
+
+
+def test_streaming_matches_persisted(tmp_path, monkeypatch):
+    """Test that streamed outputs are identical to those computed from persisted data."""
+    import json
+    import glob
+    import pandas as pd
+    from distributed import Client
+
+    times = pd.date_range('2000-01-01', '2000-12-31', freq='1D')
+    lat = np.linspace(-45, -38, 8)
+    lon = np.linspace(143, 149, 10)
+    data = np.random.default_rng(0).random((len(times), lat.size, lon.size)).astype('float32')
+
+    input_directory = tmp_path / 'inputs'
+    input_directory.mkdir()
+    ds = xr.Dataset(dict(tas=(('time', 'lat', 'lon'), data, dict(units='K'))), coords=dict(time=times, lat=lat, lon=lon))
+    ds.to_netcdf(input_directory / 'tas_2000.nc')
+
+    metadata = dict(
+        contact='x', driving_experiment_name='evaluation', ensemble='r1i1p1', gcm_institute='ECMWF', gcm_model='ERA5',
+        model_id='CCAM-2201', rcm_model_cordex='CCAM', rcm_model='CCAM', rcm_version_cordex='v1', rcm_version_id='v1',
+        rcm_institute='CSIRO'
+    )
+
+    outputs = dict()
+
+    with Client(n_workers=1, threads_per_worker=2, dashboard_address=None):
+
+        for streaming in [False, True]:
+
+            # A budget of a few time steps, so the inputs and outputs are split into many chunks
+            home = tmp_path / f'home_{streaming}'
+            (home / '.axiom').mkdir(parents=True)
+            (home / '.axiom' / 'drs.json').write_text(json.dumps(dict(streaming=dict(enable=streaming, chunk_budget_mb=0.001))))
+            monkeypatch.setenv('HOME', str(home))
+
+            output_directory = str(tmp_path / f'outputs_{streaming}')
+            ad.process(
+                str(input_directory / '*.nc'), output_directory, 'tas', 'ACS', 'ERA5', 'TAS-10', 2000, 2000, ['1D', '1M'],
+                input_resolution=10, **metadata
+            )
+
+            filepaths = sorted(glob.glob(os.path.join(output_directory, '**', '*.nc'), recursive=True))
+            outputs[streaming] = {os.path.relpath(filepath, output_directory): filepath for filepath in filepaths}
+
+    assert len(outputs[False]) == 2
+    assert outputs[True].keys() == outputs[False].keys()
+
+    for relpath in outputs[False].keys():
+        with xr.open_dataset(outputs[False][relpath]) as persisted, xr.open_dataset(outputs[True][relpath]) as streamed:
+            # Means are summed in a different order across the smaller chunks
+            xr.testing.assert_allclose(streamed.tas, persisted.tas, rtol=1e-6)
+            assert streamed.tas.attrs == persisted.tas.attrs
@@ -1,5 +1,11 @@
 """Test utility functions."""
+import os
+import pytest
 import axiom.drs.utilities as adu
+import numpy as np
+import pandas as pd
+import xarray as xr
+from axiom.exceptions import OutputSanityException
 
 def test_is_error_recoverable():
     """Test is_error_recoverable."""
@@ -55,4 +61,234 @@ def test_filter_by_variable_name():
 
     # Ensure that only one file is returned
     result = adu.filter_by_variable_name(filepaths, 'var1')
-    assert len(result) == 1 and result[0] == filepaths[0]
\ No newline at end of file
+    assert len(result) == 1 and result[0] == filepaths[0]
+
+def test_parse_filename():
+    """Test parse_filename."""
+
+    result = adu.parse_filename('/data/10km/tas_AUS-10_ccam_10km_day_19990101-20011231.nc')
+    assert result == dict(variable='tas', start_year=1999, end_year=2001, resolution=10.0)
+
+    result = adu.parse_filename('surf.ccam_12.5km.200001.nc')
+    assert result == dict(variable=None, start_year=2000, end_year=2000, resolution=12.5)
+
+    # Only the date (range) at the end counts, not model versions or domains
+    result = adu.parse_filename('tas_AUS-22_ECMWF-ERA5_evaluation_r1i1p1_CSIRO-CCAM-2203_v1_1hr_200001010030-200012312330.nc')
+    assert (result['start_year'], result['end_year']) == (2000, 2000)
+
+    result = adu.parse_filename('tas_AUS-2200_CCAM-2203_v20210215_day_2001.nc')
+    assert (result['start_year'], result['end_year']) == (2001, 2001)
+
+    result = adu.parse_filename('orog_AUS-2200_CCAM-2203_v20210215_fx.nc')
+    assert (result['start_year'], result['end_year']) == (None, None)
+
+
+def test_filter_filepaths():
+    """Test filter_filepaths."""
+
+    filepaths = [
+        'tas_AUS-10_ccam_day_19990101-20011231.nc',
+        'tas_AUS-10_ccam_day_20020101-20041231.nc',
+        'pr_AUS-10_ccam_day_20020101-20041231.nc',
+        'tas_AUS-10_ccam_day_20020101-20041231.nc',
+    ]
+
+    # Year range overlap, duplicates removed
+    result = adu.filter_filepaths(filepaths, years=(2001, 2002))
+    assert result == filepaths[:3]
+
+    result = adu.filter_filepaths(filepaths, variables=['tas'], years=(2003, 2003), variable_regex='^%(variable)s_')
+    assert result == [filepaths[1]]
+
+    # Files without a date are kept
+    result = adu.filter_filepaths(filepaths + ['orog_AUS-10_CCAM-2203_fx.nc'], years=(2003, 2003))
+    assert result == [filepaths[1], filepaths[2], 'orog_AUS-10_CCAM-2203_fx.nc']
+
+
+def test_chunk_to_budget():
+    """Test chunk_to_budget."""
+
+    # 100 x 1 MB steps
+    ds = xr.Dataset(dict(tas=(('time', 'x'), np.zeros((100, 131072)))))
+
+    result = adu.chunk_to_budget(ds, 10)
+    assert result.chunks['time'][0] == 10
+
+    # Steps larger than the budget are kept whole
+    result = adu.chunk_to_budget(ds, 0.5)
+    assert result.chunks['time'][0] == 1
+
+
+def test_commit_output(tmp_path):
+    """Test that outputs are only moved into place once written, from the same or another directory."""
+    output_filepath = str(tmp_path / 'out' / 'tas.nc')
+    os.makedirs(os.path.dirname(output_filepath))
+
+    ds = xr.Dataset(dict(tas=(('time',), np.arange(3.0))))
+
+    for tmp_directory in [None, str(tmp_path / 'jobfs')]:
+        tmp_filepath = adu.get_temporary_filepath(output_filepath, tmp_directory)
+        ds.to_netcdf(tmp_filepath)
+        assert not os.path.isfile(output_filepath)
+
+        adu.commit_output(tmp_filepath, output_filepath)
+        assert os.path.isfile(output_filepath)
+        assert not os.path.isfile(tmp_filepath)
+
+        adu.check_output(output_filepath, variable='tas')
+        os.remove(output_filepath)
+
+    # Truncated output
+    truncated = str(tmp_path / 'truncated.nc')
+    with open(truncated, 'wb') as data:
+        data.write(b'CDF')
+
+    with pytest.raises(OutputSanityException):
+        adu.check_output(truncated)
+
+
+def test_get_input_chunks(tmp_path):
+    """Test that input chunks follow the on-disk chunking, target size and resample windows."""
+    filepath = str(tmp_path / 'hourly.nc')
+    time = pd.date_range('2000-01-01', periods=24 * 10, freq='1H')
+    ds = xr.Dataset(dict(tas=(('time', 'lat', 'lon'), np.zeros((len(time), 40, 50), dtype='float32'))), coords=dict(time=time))
+    ds.to_netcdf(filepath, encoding=dict(tas=dict(chunksizes=(16, 10, 50))))
+
+    # The whole file fits
+    assert adu.get_input_chunks(filepath, 'tas', '1D', 128) == dict(time=-1)
+
+    # Multiples of the on-disk chunk and the day
+    step_mb = 40 * 50 * 4 / 1024 ** 2
+    assert adu.get_input_chunks(filepath, 'tas', ['1D', '1M'], 100 * step_mb) == dict(time=96)
+
+    # Months vary in length, only the on-disk chunk applies
+    assert adu.get_input_chunks(filepath, 'tas', '1M', 40 * step_mb) == dict(time=32)
+
+    # A single window is too big, so latitudes are split
+    assert adu.get_input_chunks(filepath, 'tas', '1D', 12 * step_mb) == dict(time=48, lat=10)
+
+
+@pytest.mark.parametrize('input_frequency,output_frequency,steps', [('1H', '1D', 24 * 40), ('1D', '1M', 400)])
+def test_resample_mean(input_frequency, output_frequency, steps):
+    """Test that the blockwise resample matches xarray, with fewer tasks."""
+    time = pd.date_range('2000-01-01', periods=steps, freq=input_frequency)
+    data = np.random.default_rng(0).random((steps, 4, 5)).astype('float32')
+    data[::7, 0, 0] = np.nan
+
+    ds = xr.Dataset(
+        dict(
+            tas=(('time', 'lat', 'lon'), data, dict(units='K')),
+            lat_bnds=(('lat', 'bnds'), np.zeros((4, 2)))
+        ),
+        coords=dict(time=time, lat=np.arange(4), lon=np.arange(5)),
+        attrs=dict(source='test')
+    ).chunk(time=100)
+
+    expected = ds.resample(time=output_frequency, label='left').mean()
+    actual = adu.resample_mean(ds, output_frequency)
+
+    xr.testing.assert_allclose(actual.compute(), expected.compute())
+    assert actual.tas.dtype == expected.tas.dtype
+    assert actual.tas.attrs == expected.tas.attrs
+    assert actual.attrs == ds.attrs
+    assert len(actual.tas.__dask_graph__()) < len(expected.tas.__dask_graph__())
+
+
+def test_resample_cascade():
+    """Test that each frequency of a cascade matches resampling the inputs, with partial windows and missing values."""
+    assert adu.get_cascade(['1M', '1D', '6H']) == [('6H', None), ('1D', '6H'), ('1M', '1D')]
+    assert adu.get_cascade(['1M', '5D', '3H']) == [('3H', None), ('5D', '3H'), ('1M', '3H')]
+
+    time = pd.date_range('2000-01-01 05:00', periods=24 * 70, freq='1H')
+    data = np.random.default_rng(0).random((len(time), 3, 4)).astype('float32')
+    data[::5, 0, 0] = np.nan
+    data[100:200, 1, 1] = np.nan
+
+    ds = xr.Dataset(
+        dict(
+            tas=(('time', 'lat', 'lon'), data, dict(units='K')),
+            lat_bnds=(('lat', 'bnds'), np.zeros((3, 2)))
+        ),
+        coords=dict(time=time)
+    ).chunk(time=100)
+
+    cascade = adu.resample_cascade(ds, ['1M', '6H', '1D'])
+    assert list(cascade.keys()) == ['6H', '1D', '1M']
+
+    for output_frequency, actual in cascade.items():
+        expected = ds.resample(time=output_frequency, label='left').mean()
+        xr.testing.assert_allclose(actual.compute(), expected.compute(), rtol=1e-5)
+        assert actual.tas.dtype == expected.tas.dtype
+        assert actual.tas.attrs == ds.tas.attrs
+
+
+def test_sort_lazily():
+    """Test that only unsorted coordinates are sorted, descending coordinates are reversed."""
+    ds = xr.Dataset(
+        dict(tas=(('time', 'lat', 'lon'), np.random.default_rng(0).random((4, 3, 5)))),
+        coords=dict(time=pd.date_range('2000-01-01', periods=4), lat=[3, 2, 1], lon=[0, 4, 1, 3, 2])
+    ).chunk(time=2)
+
+    actual, paths = adu.sort_lazily(ds, ['time', 'lat', 'lon'])
+
+    assert paths == dict(time='ascending', lat='reversed', lon='sorted')
+    xr.testing.assert_identical(actual, ds.sortby(['time', 'lat', 'lon']))
+
+    # Already sorted, nothing to do
+    _, paths = adu.sort_lazily(actual, ['time', 'lat', 'lon'])
+    assert set(paths.values()) == {'ascending'}
+
+
+def test_select_variables():
+    """Test that variables are selected along with the bounds of each coordinate."""
+    ds = xr.Dataset(
+        dict(
+            tas=(('lat',), np.zeros(3)),
+            pr=(('lat',), np.zeros(3)),
+            lat_bnds=(('lat', 'bnds'), np.zeros((3, 2)))
+        ),
+        coords=dict(lat=[0, 1, 2])
+    )
+
+    assert list(adu.select_variables(ds, 'tas').data_vars) == ['tas', 'lat_bnds']
+    assert list(adu.select_variables(ds, ['pr', 'orog']).data_vars) == ['pr', 'lat_bnds']
+    assert list(adu.select_variables(ds, None).data_vars) == ['tas', 'pr', 'lat_bnds']
+
+
+def test_select_variables_auxiliary():
+    """Test that the variables named in CF attributes of the selected variables are kept."""
+    ds = xr.Dataset(
+        dict(
+            tas=(('lat',), np.zeros(3), dict(grid_mapping='rotated_pole', ancillary_variables='tas_flag')),
+            pr=(('lat',), np.zeros(3), dict(grid_mapping='crs: lat')),
+            tas_flag=(('lat',), np.zeros(3)),
+            rotated_pole=((), 0),
+            crs=((), 0),
+        ),
+        coords=dict(lat=[0, 1, 2])
+    )
+
+    assert list(adu.select_variables(ds, 'tas').data_vars) == ['tas', 'rotated_pole', 'tas_flag']
+    assert list(adu.select_variables(ds, 'pr').data_vars) == ['pr', 'crs']
+
+
+def test_remove_stale_temporary_files(tmp_path):
+    """Test that temporary outputs are only removed once their writer is no longer running."""
+    import subprocess
+
+    output_filepath = str(tmp_path / 'tas.nc')
+    running = adu.get_temporary_filepath(output_filepath)
+
+    # Written by a process that has since exited
+    process = subprocess.Popen(['true'])
+    process.wait()
+    killed = running.replace(f'.{os.getpid()}.tmp', f'.{process.pid}.tmp')
+
+    # Written on another host
+    other = str(tmp_path / f'.tas.nc.otherhost.{process.pid}.tmp')
+
+    for filepath in [running, killed, other]:
+        open(filepath, 'w').close()
+
+    assert adu.remove_stale_temporary_files(str(tmp_path)) == [killed]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(filepath) for filepath in [running, other])
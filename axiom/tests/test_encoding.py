@@ -0,0 +1,33 @@
+"""Test the output encoding profiles."""
+import numpy as np
+import xarray as xr
+import axiom.drs.encoding as aen
+
+
+def test_apply_profile():
+    """Test that profiles set chunk sizes by dimension name and compression on top of the base encoding."""
+    da = xr.DataArray(np.zeros((365, 2, 30, 40), dtype='float32'), dims=('time', 'lev', 'lat', 'lon'), name='ta')
+    assert aen.get_rank(da) == 3
+    assert aen.get_rank(da.isel(lev=0)) == 2
+
+    base = dict(dtype='float32', zlib=True, complevel=1)
+    profile = dict(chunks=dict(time=-1, lev=1, lat=16, lon=100), shuffle=True, complevel=4)
+
+    encoding, engine = aen.apply_profile(base, da, profile)
+    assert encoding == dict(dtype='float32', zlib=True, complevel=4, shuffle=True, chunksizes=(365, 1, 16, 40))
+    assert engine is None
+    assert base == dict(dtype='float32', zlib=True, complevel=1)
+
+    # Dimensions that are not listed are kept whole
+    assert aen.get_chunksizes(da, dict(time=1)) == (1, 2, 30, 40)
+
+
+def test_benchmark_profiles(tmp_path):
+    """Test that the benchmark reports each profile."""
+    filepath = str(tmp_path / 'sample.nc')
+    xr.Dataset(dict(tas=(('time', 'lat', 'lon'), np.zeros((10, 4, 5), dtype='float32')))).to_netcdf(filepath)
+
+    results = aen.benchmark_profiles(filepath, profiles=[None, 'timeseries', 'maps'], repeats=1)
+    assert list(results.index) == ['none', 'timeseries', 'maps']
+    assert results.loc['maps', 'chunksizes'] == (1, 4, 5)
+    assert (results['size_mb'] > 0).all()
@@ -0,0 +1,74 @@
+"""Test the input index."""
+import os
+from axiom.drs.index import InputIndex, split_pattern
+
+
+def _touch(filepath):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    open(filepath, 'w').close()
+
+
+def test_split_pattern():
+    """Test splitting a glob into the static root and the globbable components."""
+    root, components = split_pattern('/data/ccam/*/surf.*.nc')
+    assert root == '/data/ccam'
+    assert components == ['*', 'surf.*.nc']
+
+
+def test_index_update_and_query(tmp_path):
+    """Test that the index matches the glob and picks up added/removed files."""
+    for year in [1999, 2000, 2001]:
+        _touch(str(tmp_path / 'a' / f'tas_ccam_10km.{year}01.nc'))
+        _touch(str(tmp_path / 'a' / f'pr_ccam_10km.{year}01.nc'))
+
+    _touch(str(tmp_path / 'a' / 'notes.txt'))
+    _touch(str(tmp_path / 'a' / 'nested' / 'tas_ccam_10km.200001.nc'))
+
+    pattern = str(tmp_path / '*' / '*.nc')
+
+    with InputIndex(str(tmp_path / 'index.sqlite')) as index:
+
+        counts = index.update(pattern)
+        assert counts['updated'] == 6
+
+        result = index.query(pattern, variables='tas', years=(2000, 2001))
+        assert [os.path.basename(r) for r in result] == ['tas_ccam_10km.200001.nc', 'tas_ccam_10km.200101.nc']
+        assert index.years(pattern) == [1999, 2000, 2001]
+
+        # Nothing has changed
+        assert index.update(pattern) == dict(updated=0, removed=0)
+
+        # Remove a file
+        os.remove(str(tmp_path / 'a' / 'pr_ccam_10km.199901.nc'))
+        assert index.update(pattern) == dict(updated=0, removed=1)
+        assert len(index.query(pattern, variables='pr')) == 2
+
+
+def test_index_cordex_filenames(tmp_path):
+    """Test that years come from the date range at the end of the filename, not the model version or domain."""
+    filenames = [
+        'tas_AUS-22_ECMWF-ERA5_evaluation_r1i1p1_CSIRO-CCAM-2203_v1_day_20000101-20001231.nc',
+        'tas_AUS-22_ECMWF-ERA5_evaluation_r1i1p1_CSIRO-CCAM-2203_v1_1hr_200101010030-200112312330.nc',
+        'orog_AUS-22_ECMWF-ERA5_evaluation_r0i0p0_CSIRO-CCAM-2203_v1_fx.nc',
+    ]
+
+    for filename in filenames:
+        _touch(str(tmp_path / 'v20210215' / filename))
+
+    pattern = str(tmp_path / '*' / '*.nc')
+
+    with InputIndex(str(tmp_path / 'index.sqlite')) as index:
+        index.update(pattern)
+        assert index.years(pattern) == [2000, 2001]
+
+        # Files without a date are kept
+        result = index.query(pattern, years=(2001, 2001))
+        assert [os.path.basename(r) for r in result] == sorted(filenames[1:])
+
+        # Indexes parsed by an earlier version are parsed again
+        index.connection.execute('UPDATE files SET start_year = 2203, end_year = 2203')
+        index.connection.execute('PRAGMA user_version = 0')
+        index.connection.commit()
+
+    with InputIndex(str(tmp_path / 'index.sqlite')) as index:
+        assert index.years(pattern) == [2000, 2001]
@@ -0,0 +1,38 @@
+"""Test the DRS instrumentation."""
+import pytest
+import axiom.drs.instrumentation as ain
+
+
+def test_span_and_aggregate(tmp_path, monkeypatch):
+    """Test that spans are written as JSON lines and aggregate across files."""
+    monkeypatch.setattr(ain, 'is_enabled', lambda: True)
+
+    for job in ['a', 'b']:
+        monkeypatch.setattr(ain, 'get_spans_filepath', lambda: str(tmp_path / f'{job}.spans.jsonl'))
+        ain.set_context(variable='tas')
+
+        with ain.span('open') as record:
+            record['bytes_read'] = 100
+
+        with ain.span('resample') as record:
+            record['tasks'] = 10
+
+        with pytest.raises(ValueError):
+            with ain.span('write'):
+                raise ValueError()
+
+    ain.set_context(variable=None)
+
+    spans = ain.load_spans(str(tmp_path / '*.spans.jsonl'))
+    assert len(spans) == 6
+    assert set(spans.variable) == {'tas'}
+    assert list(spans[spans.stage == 'write'].status) == ['ValueError', 'ValueError']
+
+    aggregated = ain.aggregate_spans(spans)
+    assert aggregated.loc['open', 'count'] == 2
+    assert aggregated.loc['open', 'bytes_read'] == 200
+    assert aggregated.loc['resample', 'tasks'] == 20
+    assert aggregated['share'].sum() == pytest.approx(1)
+
+    summary = ain.summarise_io(spans)
+    assert summary['io_seconds'] + summary['compute_seconds'] == pytest.approx(spans.seconds.sum())
@@ -13,3 +13,19 @@ def test_generate_payloads():
     assert p2.start_year == 2021 and p2.model == 'ACCESS'
 
 
+
+def test_generate_payloads_cascade(monkeypatch):
+    """Test that cascaded frequencies are listed separately, output_frequency stays a single frequency."""
+    import axiom.drs.utilities as adu
+    from axiom.drs.payload import Payload
+
+    monkeypatch.setattr(adu, 'group_output_frequencies', lambda output_frequencies: [list(output_frequencies)])
+
+    payloads = generate_payloads('files.nc', 'output', 2000, 2001, 'CORDEX', 'ACCESS', 'AUS-10i', ['tas'], 'CORDEX', ['1H', '6H'], 1)
+
+    assert len(payloads) == 2
+    assert payloads[0].output_frequency == '1H'
+    assert payloads[0].get_filename() == 'payload.2000.1H-6H.000.json'
+
+    payload = Payload.from_dict(payloads[0].to_dict())
+    assert payload.get_output_frequencies() == ['1H', '6H']
@@ -0,0 +1,28 @@
+"""Test the runtime store and adaptive timeouts."""
+import axiom.drs.runtimes as art
+from axiom.drs.runtimes import RuntimeStore
+
+
+def test_adaptive_timeout(tmp_path, monkeypatch):
+    """Test that timeouts are learned from recorded runtimes, falling back to the static timeout."""
+    filepath = str(tmp_path / 'runtimes.sqlite')
+    monkeypatch.setattr(art, 'is_enabled', lambda: True)
+    monkeypatch.setattr(art, 'get_store_filepath', lambda: filepath)
+    monkeypatch.setattr(art, 'get_static_timeout', lambda stage: 600)
+
+    # Not enough runtimes yet
+    for seconds in [100, 110, 120, 130]:
+        art.record_runtime('compute', 'tas', '1D', 10.0, seconds)
+
+    assert art.get_timeout('compute', 'tas', '1D', 10.0) == 600
+
+    art.record_runtime('compute', 'tas', '1D', 10.0, 140)
+    assert art.get_timeout('compute', 'tas', '1D', 10.0) == 3 * (130 + 0.96 * 10)
+
+    # Keyed by stage, variable, output frequency and resolution
+    assert art.get_timeout('compute', 'tas', '1M', 10.0) == 600
+    assert art.get_timeout('compute', 'tas', '1D', None) == 600
+
+    with RuntimeStore(filepath) as store:
+        assert store.runtimes('compute', 'tas', '1D', 10.0, 1, limit=2) == [140, 130]
+        assert store.runtimes('streaming', 'tas', '1D', 10.0, 1) == []
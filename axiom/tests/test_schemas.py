@@ -0,0 +1,27 @@
+"""Test the schema registry."""
+import json
+import axiom.schemas as axs
+
+
+def test_read_schema_name(tmp_path):
+    """Test that the name is read from the start of the file, or parsed if elsewhere."""
+    filepath = tmp_path / 'schema.json'
+
+    filepath.write_text(json.dumps(dict(name='My "schema"', variables=dict()), indent=4))
+    assert axs.read_schema_name(str(filepath)) == 'My "schema"'
+
+    filepath.write_text(json.dumps(dict(variables=dict(), name='Later')))
+    assert axs.read_schema_name(str(filepath)) == 'Later'
+
+
+def test_load_schema_registry():
+    """Test that schemas are found by name, memoised and compiled into attribute maps."""
+    manifest = axs.get_schema_manifest()
+    assert 'CORDEX' in manifest.keys()
+
+    schema = axs.load_schema('CORDEX')
+    assert axs.load_schema('CORDEX') is schema
+    assert axs.load_schema(manifest['CORDEX']) is schema
+
+    attribute_maps = axs.load_attribute_maps('CORDEX')
+    assert attribute_maps['variables']['tas']['standard_name'] == 'air_temperature'
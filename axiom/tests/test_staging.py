@@ -0,0 +1,42 @@
+"""Test the staging of outputs."""
+import axiom.drs.staging as ast
+from axiom.exceptions import OutputSanityException
+
+
+def test_stager_retries(tmp_path):
+    """Test that failed copies are retried, and reported once out of attempts."""
+    attempts = dict()
+
+    def commit(write, discard=True):
+        attempts[write['filepath']] = attempts.get(write['filepath'], 0) + 1
+
+        if write['variable'] == 'sanity':
+            raise OutputSanityException()
+
+        if write['variable'] == 'flaky' and attempts[write['filepath']] < 3:
+            raise OSError('Flaky filesystem')
+
+        if write['variable'] == 'broken':
+            raise OSError('Broken filesystem')
+
+    writes = list()
+    for variable in ['ok', 'flaky', 'broken', 'sanity']:
+        write_filepath = tmp_path / f'{variable}.tmp'
+        write_filepath.write_bytes(b'data')
+        writes.append(dict(variable=variable, filepath=f'{variable}.nc', write_filepath=str(write_filepath)))
+
+    stager = ast.Stager(threads=2, retries=2, retry_seconds=0, max_pending=1)
+    assert ast.get_stager() is stager
+
+    for write in writes:
+        stager.submit(write, commit)
+
+    failed = stager.close()
+    assert ast.get_stager() is None
+
+    assert sorted(failure['variable'] for failure in failed) == ['broken', 'sanity']
+    assert attempts == {'ok.nc': 1, 'flaky.nc': 3, 'broken.nc': 3, 'sanity.nc': 1}
+
+    throughput = stager.get_throughput()
+    assert throughput['files'] == 2
+    assert throughput['bytes'] == 8
@@ -16,4 +16,49 @@ def test_supervisor_pass():
     # Test a job that should complete in time.
     with Supervisor(seconds=5, error_msg='Job that should work.'):
         time.sleep(2)
-        assert True
\ No newline at end of file
+        assert True
+
+def test_watchdog_cancels_futures():
+    """Test that the watchdog cancels the futures it watches on timeout, outside of the main thread."""
+    from concurrent.futures import ThreadPoolExecutor
+    from distributed import Client, wait
+    from axiom.supervisor import Watchdog
+
+    with Client(n_workers=1, threads_per_worker=1, processes=False, dashboard_address=None) as client:
+
+        def _run():
+            with Watchdog(seconds=1, error_msg='Job took too long.', client=client, restart_workers=False) as watchdog:
+                future = watchdog.watch(client.submit(time.sleep, 5))
+                wait(future)
+            return future
+
+        start = time.time()
+        with ThreadPoolExecutor(1) as executor:
+            with pytest.raises(TimeoutError):
+                executor.submit(_run).result()
+
+        assert time.time() - start < 4
+
+
+def test_watchdog_alarm():
+    """Test that the alarm does not take the lock, and that the previous SIGALRM handler is restored."""
+    import signal
+    from axiom.supervisor import Watchdog
+
+    def _handler(signum, frame):
+        pass
+
+    previous = signal.signal(signal.SIGALRM, _handler)
+
+    try:
+        with pytest.raises(TimeoutError):
+            with Watchdog(seconds=60, error_msg='Job took too long.', restart_workers=False) as watchdog:
+
+                # Arrives while the main thread holds the lock (i.e. in watch)
+                with watchdog.lock:
+                    watchdog._alarm(signal.SIGALRM, None)
+
+        assert signal.getsignal(signal.SIGALRM) is _handler
+
+    finally:
+        signal.signal(signal.SIGALRM, previous)
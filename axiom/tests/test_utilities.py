@@ -3,6 +3,10 @@ import axiom.utilities as au
 import xarray as xr
 import numpy as np
 import pytest
+import os
+import json
+import time
+import subprocess
 
 
 def test_isolate_coordinate():
@@ -31,4 +35,112 @@ def test_load_package_json():
 
     # Test something that does not exist
     with pytest.raises(FileNotFoundError):
-        result = au.load_package_json('does_not_exist.json')
\ No newline at end of file
+        result = au.load_package_json('does_not_exist.json')
+
+def test_try_lock(tmp_path):
+    """Test that a lock can only be acquired once."""
+    filepath = str(tmp_path / 'payload.json')
+    assert au.try_lock(filepath)
+    assert not au.try_lock(filepath)
+    au.unlock(filepath)
+    assert au.try_lock(filepath)
+
+
+def test_stale_lock(tmp_path):
+    """Test that locks left by dead or silent owners are reclaimed."""
+    filepath = str(tmp_path / 'payload.json')
+
+    # Owner on this host that is no longer running
+    process = subprocess.Popen(['true'])
+    process.wait()
+
+    au.lock(filepath)
+    owner = au.read_lock(filepath)
+    owner['pid'] = process.pid
+    json.dump(owner, open(au.get_lock_filepath(filepath), 'w'))
+
+    assert not au.is_locked(filepath)
+    assert au.try_lock(filepath)
+    assert au.read_lock(filepath)['pid'] == os.getpid()
+
+    # Live owner, with and without a recent heartbeat
+    assert au.is_locked(filepath, stale_seconds=60)
+    os.utime(au.get_lock_filepath(filepath), (0, 0))
+    assert not au.is_locked(filepath, stale_seconds=60)
+
+    with au.Heartbeat(filepath, seconds=0.1):
+        time.sleep(0.3)
+
+    assert au.is_locked(filepath, stale_seconds=60)
+
+    # Empty locks of older versions are only stale by age
+    open(au.get_lock_filepath(filepath), 'w').close()
+    assert au.is_locked(filepath, stale_seconds=60)
+    os.utime(au.get_lock_filepath(filepath), (0, 0))
+    assert not au.is_locked(filepath, stale_seconds=60)
+
+
+def test_release_lock(tmp_path):
+    """Test that only the owner of a lock releases it."""
+    filepath = str(tmp_path / 'payload.json')
+    assert au.try_lock(filepath)
+    assert au.is_lock_owner(filepath)
+
+    # Reclaimed by another process
+    owner = au.read_lock(filepath)
+    owner['pid'] = os.getpid() + 1
+    json.dump(owner, open(au.get_lock_filepath(filepath), 'w'))
+
+    assert not au.release_lock(filepath)
+    assert au.read_lock(filepath)['pid'] == os.getpid() + 1
+
+    au.lock(filepath)
+    assert au.release_lock(filepath)
+    assert not os.path.isfile(au.get_lock_filepath(filepath))
+
+
+def test_heartbeat_survives_missing_lock(tmp_path):
+    """Test that the heartbeat carries on after the lock is briefly moved aside, and stops for another owner."""
+    filepath = str(tmp_path / 'payload.json')
+    lock_filepath = au.get_lock_filepath(filepath)
+    assert au.try_lock(filepath)
+
+    with au.Heartbeat(filepath, seconds=0.05) as heartbeat:
+
+        # Moved aside, as when another process checks if it is stale
+        os.rename(lock_filepath, f'{lock_filepath}.aside')
+        time.sleep(0.2)
+        os.rename(f'{lock_filepath}.aside', lock_filepath)
+
+        os.utime(lock_filepath, (0, 0))
+        time.sleep(0.2)
+        assert au.is_locked(filepath, stale_seconds=60)
+
+        # Reclaimed by another process
+        owner = au.read_lock(filepath)
+        owner['pid'] = os.getpid() + 1
+        json.dump(owner, open(lock_filepath, 'w'))
+        os.utime(lock_filepath, (0, 0))
+        time.sleep(0.2)
+
+        assert not heartbeat._thread.is_alive()
+        assert os.path.getmtime(lock_filepath) == 0
+
+
+def test_apply_schema_plan():
+    """Test that a compiled schema plan applies the expected values to variables and coordinates."""
+    schema = dict(
+        _global=dict(project_id=dict(allowed=['CORDEX']), contact=dict(type='string')),
+        variables=dict(
+            tas=dict(units=dict(allowed=['K']), long_name=dict(type='string')),
+            lat=dict(units=dict(allowed=['degrees_north']))
+        )
+    )
+
+    ds = xr.Dataset(dict(tas=(('lat',), np.zeros(3))), coords=dict(lat=[1, 2, 3]))
+    plan = au.compile_schema_plan(schema)
+
+    for result in [au.apply_schema_plan(ds.copy(deep=True), plan), au.apply_schema(ds.copy(deep=True), schema)]:
+        assert result.attrs == dict(project_id='CORDEX')
+        assert result.tas.attrs == dict(units='K')
+        assert result.lat.attrs == dict(units='degrees_north')
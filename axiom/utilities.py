@@ -14,6 +14,8 @@ from configparser import ConfigParser, ExtendedInterpolation
 from pathlib import Path
 import importlib
 import time
+import socket
+import threading
 import subprocess as sp
 import numpy as np
 from jinja2 import Environment, BaseLoader
@@ -374,40 +376,64 @@ def load_package_data(slug, package_name='axiom', return_type='json'):
     raise Exception('Unknown return type.')
 
 
-def apply_schema(ds, schema):
-    """Apply a metadata schema on a dataset.
+def compile_schema_plan(schema, variables=None):
+    """Compile a schema into a plan of the attributes to apply (those with an expected value).
+
+    A plan for the whole schema depends only on the schema, so it can be reused for every dataset, variable and year.
 
     Args:
-        ds (xarray.Dataset): Dataset.
         schema (dict): Axiom schema dictionary.
+        variables (iterable, optional): Only compile these variables. Defaults to None (all variables).
 
     Returns:
-        xarray.Dataset : Dataset with schema-defined metadata applied.
+        dict : Dictionary with _global (attribute: value) and variables (variable: attribute: value) keys.
     """
-    # Apply the global metadata, if available
-    for key, _schema in schema['_global'].items():
-        if 'allowed' in _schema.keys():
-            ds.attrs[key] = _schema['allowed'][0]
+    def _compile(attributes):
+        return {key: _schema['allowed'][0] for key, _schema in attributes.items() if 'allowed' in _schema.keys()}
 
-    # Loop through each variable on the dataset
-    for variable in list(ds.data_vars.keys()) + list(ds.coords.keys()):
+    schema_variables = schema.get('variables', dict())
+    if variables is None:
+        variables = schema_variables.keys()
+
+    return dict(
+        _global=_compile(schema.get('_global', dict())),
+        variables={variable: _compile(schema_variables[variable]) for variable in variables if variable in schema_variables}
+    )
 
-        # If the variable is define
-        if variable in schema['variables'].keys():
 
-            # Extract the schema for the variable itself
-            var_schema = schema['variables'][variable]
+def apply_schema_plan(ds, plan):
+    """Apply a compiled schema plan on a dataset, with one attribute update per variable.
+
+    Args:
+        ds (xarray.Dataset): Dataset.
+        plan (dict): Plan from compile_schema_plan.
 
-            # Loop through attributes
-            for key, _schema in var_schema.items():
+    Returns:
+        xarray.Dataset : Dataset with schema-defined metadata applied.
+    """
+    ds.attrs.update(plan['_global'])
 
-                # Apply if there is an expected value
-                if 'allowed' in _schema.keys():
-                    ds[variable].attrs[key] = _schema['allowed'][0]
+    # Update the underlying variables directly, rather than constructing a DataArray for each.
+    for variable, _variable in ds.variables.items():
+        attrs = plan['variables'].get(variable)
+        if attrs:
+            _variable.attrs.update(attrs)
 
-    # Return the updated schema
     return ds
 
+
+def apply_schema(ds, schema):
+    """Apply a metadata schema on a dataset.
+
+    Args:
+        ds (xarray.Dataset): Dataset.
+        schema (dict): Axiom schema dictionary.
+
+    Returns:
+        xarray.Dataset : Dataset with schema-defined metadata applied.
+    """
+    return apply_schema_plan(ds, compile_schema_plan(schema, variables=ds.variables.keys()))
+
 def _diff_metadata(meta_a, meta_b, ignore_matches=True):
 
     # Dictionaries are equal
@@ -551,13 +577,178 @@ def get_lock_filepath(filepath):
     return f'{filepath}.lock'
 
 
+def get_lock_owner():
+    """Get a description of this process for a lock file.
+
+    Returns:
+        dict: Owner pid, host, jobid (PBS_JOBID, if set) and creation time.
+    """
+    return dict(
+        pid=os.getpid(),
+        host=socket.gethostname(),
+        jobid=os.getenv('PBS_JOBID'),
+        created=datetime.utcnow().isoformat()
+    )
+
+
 def lock(filepath):
-    """Place a lock on a filepath.
+    """Place a lock on a filepath, regardless of an existing lock.
 
     Args:
         filepath (str): Path to the file.
     """
-    touch(get_lock_filepath(filepath))
+    with open(get_lock_filepath(filepath), 'w') as lockfile:
+        json.dump(get_lock_owner(), lockfile)
+
+
+def try_lock(filepath, stale_seconds=None):
+    """Atomically place a lock on a filepath, if it is not already locked.
+
+    Stale locks (see is_stale_lock) are reclaimed.
+
+    Args:
+        filepath (str): Path to the file.
+        stale_seconds (int, optional): Age of a heartbeat after which a lock is stale. Defaults to None (only dead local owners are stale).
+
+    Returns:
+        bool: True if the lock was acquired, False if the file was already locked.
+    """
+    lock_filepath = get_lock_filepath(filepath)
+
+    for attempt in range(2):
+
+        try:
+            fd = os.open(lock_filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+        except FileExistsError:
+
+            # Only try to reclaim once
+            if attempt == 0 and is_stale_lock(filepath, stale_seconds) and reclaim_lock(filepath, stale_seconds):
+                continue
+
+            return False
+
+        with os.fdopen(fd, 'w') as lockfile:
+            json.dump(get_lock_owner(), lockfile)
+
+        return True
+
+    return False
+
+
+def read_lock(filepath):
+    """Read the owner of a lock.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+
+    Returns:
+        dict: Owner information (see get_lock_owner), empty for locks without it, None if not locked.
+    """
+    return _read_lock_filepath(get_lock_filepath(filepath))
+
+
+def _read_lock_filepath(lock_filepath):
+    """Read the owner out of a lock file (see read_lock)."""
+    try:
+        with open(lock_filepath, 'r') as lockfile:
+            content = lockfile.read()
+    except FileNotFoundError:
+        return None
+
+    try:
+        return json.loads(content)
+    except ValueError:
+        return dict()
+
+
+def is_stale_lock(filepath, stale_seconds=None):
+    """Check if a lock has been left behind by an owner that is no longer running.
+
+    A lock is stale if the owner was on this host and the process no longer exists, or if the heartbeat (the
+    modification time of the lock, see Heartbeat) is older than stale_seconds. Locks without owner information
+    (i.e. created by older versions) are only stale by the age of the lock.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+        stale_seconds (int, optional): Age of a heartbeat after which a lock is stale. Defaults to None (only check the process).
+
+    Returns:
+        bool: True if the lock is stale.
+    """
+    return _is_stale_lock_filepath(get_lock_filepath(filepath), stale_seconds)
+
+
+def is_process_running(pid):
+    """Check if a process is running on this host.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        bool: True if running (including processes of other users).
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def _is_stale_lock_filepath(lock_filepath, stale_seconds=None):
+    """Check if a lock file is stale (see is_stale_lock)."""
+    owner = _read_lock_filepath(lock_filepath)
+
+    if owner is None:
+        return False
+
+    if owner.get('host') == socket.gethostname() and not is_process_running(owner['pid']):
+        return True
+
+    if stale_seconds is None:
+        return False
+
+    try:
+        age = time.time() - os.path.getmtime(lock_filepath)
+    except FileNotFoundError:
+        return False
+
+    return age > stale_seconds
+
+
+def reclaim_lock(filepath, stale_seconds=None):
+    """Remove a stale lock, without removing a lock that another process has just taken.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+        stale_seconds (int, optional): Age of a heartbeat after which a lock is stale. Defaults to None.
+
+    Returns:
+        bool: True if a stale lock was removed.
+    """
+    lock_filepath = get_lock_filepath(filepath)
+    reclaimed_filepath = f'{lock_filepath}.{socket.gethostname()}.{os.getpid()}'
+
+    # Only one process can move the lock aside
+    try:
+        os.rename(lock_filepath, reclaimed_filepath)
+    except FileNotFoundError:
+        return False
+
+    # Another process may have reclaimed and relocked between the check and the move, put it back if so.
+    stale = _is_stale_lock_filepath(reclaimed_filepath, stale_seconds)
+
+    if not stale:
+        try:
+            os.link(reclaimed_filepath, lock_filepath)
+        except FileExistsError:
+            pass
+
+    os.remove(reclaimed_filepath)
+    return stale
 
 
 def unlock(filepath):
@@ -569,13 +760,115 @@ def unlock(filepath):
     os.remove(get_lock_filepath(filepath))
 
 
-def is_locked(filepath):
-    """Check if a file is locked.
+def is_lock_owner(filepath):
+    """Check if a lock is owned by this process.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+
+    Returns:
+        bool: True if the lock records this process as its owner.
+    """
+    return _is_lock_owner_filepath(get_lock_filepath(filepath))
+
+
+def _is_lock_owner_filepath(lock_filepath):
+    """Check if a lock file is owned by this process (see is_lock_owner)."""
+    owner = _read_lock_filepath(lock_filepath) or dict()
+    return owner.get('pid') == os.getpid() and owner.get('host') == socket.gethostname()
+
+
+def release_lock(filepath):
+    """Remove a lock on a filepath, only if it is owned by this process.
+
+    A lock reclaimed by another process (i.e. after the heartbeat of this one stalled) is left in place.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+
+    Returns:
+        bool: True if the lock was removed.
+    """
+    lock_filepath = get_lock_filepath(filepath)
+    released_filepath = f'{lock_filepath}.{socket.gethostname()}.{os.getpid()}'
+
+    # Move the lock aside first, so that a lock taken by another process in the meantime is not removed
+    try:
+        os.rename(lock_filepath, released_filepath)
+    except FileNotFoundError:
+        return False
+
+    owned = _is_lock_owner_filepath(released_filepath)
+
+    if not owned:
+        try:
+            os.link(released_filepath, lock_filepath)
+        except FileExistsError:
+            pass
+
+    os.remove(released_filepath)
+    return owned
+
+
+def is_locked(filepath, stale_seconds=None):
+    """Check if a file is locked, ignoring stale locks (see is_stale_lock).
 
     Args:
         filepath (str): Path to the file.
+        stale_seconds (int, optional): Age of a heartbeat after which a lock is stale. Defaults to None.
     """
-    return os.path.isfile(get_lock_filepath(filepath))
+    return os.path.isfile(get_lock_filepath(filepath)) and not is_stale_lock(filepath, stale_seconds)
+
+
+class Heartbeat:
+
+    """Heartbeat context manager. Periodically touches the lock on a file to show that the owner is still running.
+
+    Usage:
+        >>> with Heartbeat('payload.json', seconds=60):
+        >>>     # ... long running code while payload.json is locked.
+
+    Args:
+        filepath (str): Path to the (locked) file.
+        seconds (int): Seconds between heartbeats.
+    """
+
+    def __init__(self, filepath, seconds):
+        self.filepath = filepath
+        self.lock_filepath = get_lock_filepath(filepath)
+        self.seconds = seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+
+    def _beat(self):
+        """Touch the lock file until stopped, or the lock is owned by another process.
+
+        The lock may be missing briefly while another process checks it (see reclaim_lock), so a missing lock is
+        retried on the next heartbeat.
+        """
+        while not self._stop.wait(self.seconds):
+
+            # Do not keep the lock of another process alive
+            if read_lock(self.filepath) and not is_lock_owner(self.filepath):
+                return
+
+            try:
+                os.utime(self.lock_filepath)
+            except FileNotFoundError:
+                pass
+
+
+    def __enter__(self):
+        """Enter the context manager."""
+        self._thread.start()
+        return self
+
+
+    def __exit__(self, type, value, traceback):
+        """Exit the context manager."""
+        self._stop.set()
+        self._thread.join()
 
 
 class ListAwareConfigParser(ConfigParser):
@@ -668,6 +961,13 @@ class Timer:
         self._start_time = None
         return elapsed_time
 
+    def elapsed(self):
+        """Elapsed time without stopping the timer.
+
+        Returns:
+            float : Elapsed time in seconds"""
+        return time.perf_counter() - self._start_time
+
 
 def shell(cmd, shell=True, check=True, capture_output=True, **kwargs):
     """Execute a shell command.
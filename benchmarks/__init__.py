@@ -0,0 +1 @@
+"""Benchmarks for Axiom (asv-compatible)."""
@@ -0,0 +1,12 @@
+"""Run the benchmarks without asv, recording the time or peak memory of the body of each in a fresh process.
+
+Usage:
+    $ python -m benchmarks [filter] [--output results.json]
+
+The benchmarks are also compatible with asv (see asv.conf.json in the repository root).
+"""
+from benchmarks.runner import main
+
+
+if __name__ == '__main__':
+    main()
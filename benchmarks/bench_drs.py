@@ -0,0 +1,116 @@
+"""Benchmarks for the stages of the DRS pipeline on synthetic CCAM-like inputs (see benchmarks.data)."""
+import os
+import shutil
+import tempfile
+import axiom.drs as ad
+import axiom.utilities as au
+import axiom.schemas as axs
+from axiom.config import load_config
+from axiom.drs.domain import Domain
+from axiom.drs.processing.ccam import preprocess_ccam
+from distributed import Client, LocalCluster
+from benchmarks.data import make_ccam_inputs
+
+
+VARIABLES = ['tas', 'pr', 'ps']
+
+# Metadata required to interpolate the output paths
+METADATA = dict(
+    contact='benchmark', driving_experiment_name='evaluation', ensemble='r1i1p1', gcm_institute='ECMWF',
+    gcm_model='ERA5', model_id='CCAM-2201', rcm_model_cordex='CCAM', rcm_model='CCAM', rcm_version_cordex='v1',
+    rcm_version_id='v1', rcm_institute='CSIRO'
+)
+
+
+def preprocess(ds, *args, **kwargs):
+    """CCAM preprocessing of the inputs as they are loaded."""
+    return preprocess_ccam(ds, variable=VARIABLES, kwargs=dict(model_id=METADATA['model_id']))
+
+
+class Stages:
+
+    """Load, resample, schema application, subsetting and write, across grid sizes and file counts."""
+
+    params = (['small', 'medium'], [1, 4])
+    param_names = ['grid', 'num_files']
+    timeout = 600
+
+    def setup(self, grid, num_files):
+        self.filepaths = make_ccam_inputs(grid, num_files)
+        self.ds = self._load()
+        self.daily = self.ds.resample(time='1D', label='left').mean().load()
+        self.plan = axs.load_attribute_maps(load_config('drs')['default_schema'])
+        self.domain = Domain.from_directive('benchmark,0.1,-40.0,-20.0,120.0,150.0')
+        self.output_directory = tempfile.mkdtemp()
+
+    def teardown(self, grid, num_files):
+        shutil.rmtree(self.output_directory, ignore_errors=True)
+
+    def _load(self):
+        return ad.load_inputs(self.filepaths, 2000, preprocess)
+
+    def time_load(self, grid, num_files):
+        self._load().load()
+
+    def time_resample(self, grid, num_files):
+        self.ds.resample(time='1D', label='left').mean().compute()
+
+    def time_apply_schema(self, grid, num_files):
+        au.apply_schema_plan(self.ds.copy(), self.plan)
+
+    def time_subset(self, grid, num_files):
+        self.domain.subset_xarray(self.ds, drop=True).compute()
+
+    def time_write(self, grid, num_files):
+        self.daily.to_netcdf(os.path.join(self.output_directory, 'daily.nc'), encoding=dict(tas=dict(zlib=True, complevel=1)))
+
+    def peakmem_load(self, grid, num_files):
+        self._load().load()
+
+    def peakmem_resample(self, grid, num_files):
+        self.ds.resample(time='1D', label='left').mean().compute()
+
+    def peakmem_apply_schema(self, grid, num_files):
+        au.apply_schema_plan(self.ds.copy(), self.plan)
+
+    def peakmem_subset(self, grid, num_files):
+        self.domain.subset_xarray(self.ds, drop=True).compute()
+
+    def peakmem_write(self, grid, num_files):
+        self.daily.to_netcdf(os.path.join(self.output_directory, 'daily.nc'), encoding=dict(tas=dict(zlib=True, complevel=1)))
+
+
+class ProcessMulti:
+
+    """End-to-end processing of daily and monthly means on a dask client, for per-variable inputs."""
+
+    params = (['small'], [2, 6], [False, True])
+    param_names = ['grid', 'num_files', 'batch']
+    timeout = 1200
+
+    def setup(self, grid, num_files, batch):
+        self.filepaths = make_ccam_inputs(grid, num_files, per_variable=True)
+        self.output_directory = tempfile.mkdtemp()
+        self.client = Client(LocalCluster(n_workers=1, threads_per_worker=2))
+
+    def teardown(self, grid, num_files, batch):
+        ad.stop_client(self.client)
+        shutil.rmtree(self.output_directory, ignore_errors=True)
+
+    def time_process_multi(self, grid, num_files, batch):
+        ad.process_multi(
+            variables=VARIABLES,
+            domain='benchmark,0.1,-40.0,-20.0,120.0,150.0',
+            project='ACS',
+            model='ERA5',
+            input_files=os.path.join(os.path.dirname(self.filepaths[0]), '*.nc'),
+            output_directory=self.output_directory,
+            start_year=2000,
+            end_year=2000,
+            output_frequency=['1D', '1M'],
+            preprocessor='ccam',
+            postprocessor='ccam',
+            batch_variables=batch,
+            client=self.client,
+            **METADATA
+        )
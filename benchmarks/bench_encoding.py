@@ -0,0 +1,49 @@
+"""Benchmarks for the output encoding profiles (see encoding_profiles in drs.json).
+
+For a sample of real output, prefer the built-in command:
+
+    $ axiom drs_benchmark_encoding /path/to/output.nc
+"""
+import os
+import shutil
+import tempfile
+import xarray as xr
+import axiom.drs.encoding as aen
+from benchmarks.data import GRIDS, make_ccam_dataset
+
+
+class EncodingProfiles:
+
+    """Write a month of 6-hourly data with each profile, then read a time series at a point and a map at a time."""
+
+    params = (['small', 'medium'], [None, 'timeseries', 'maps', 'balanced'])
+    param_names = ['grid', 'profile']
+
+    def setup(self, grid, profile):
+        nlat, nlon = GRIDS[grid]
+        self.ds = make_ccam_dataset(2000, 1, nlat, nlon, variables=('tas',), freq='6H')[['tas']]
+        self.encoding, self.engine = aen.apply_profile(dict(dtype='float32', zlib=True, complevel=1), self.ds.tas, aen.get_profile(profile) if profile else dict())
+
+        self.directory = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.directory, 'tas.nc')
+        self._write(self.filepath)
+
+    def teardown(self, grid, profile):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self, filepath):
+        self.ds.to_netcdf(filepath, encoding=dict(tas=self.encoding), engine=self.engine, unlimited_dims=['time'])
+
+    def time_write(self, grid, profile):
+        self._write(os.path.join(self.directory, 'write.nc'))
+
+    def time_read_timeseries(self, grid, profile):
+        with xr.open_dataset(self.filepath, engine=self.engine) as ds:
+            ds.tas.isel(lat=ds.lat.size // 2, lon=ds.lon.size // 2).values
+
+    def time_read_map(self, grid, profile):
+        with xr.open_dataset(self.filepath, engine=self.engine) as ds:
+            ds.tas.isel(time=ds.time.size // 2).values
+
+    def track_size_mb(self, grid, profile):
+        return os.path.getsize(self.filepath) / 1024 ** 2
@@ -0,0 +1,45 @@
+"""Benchmarks for resampling with xarray against the blockwise reduction (see axiom.drs.utilities.resample_mean)."""
+import numpy as np
+import pandas as pd
+import xarray as xr
+import axiom.drs.utilities as adu
+from benchmarks.data import GRIDS
+
+
+# Input frequency, output frequency and number of input steps (a year)
+CASES = {
+    '1H->1D': ('1H', '1D', 24 * 366),
+    '1D->1M': ('1D', '1M', 366)
+}
+
+
+class Resample:
+
+    """Mean of a year of data chunked by 100 time steps, as loaded by default."""
+
+    params = (list(CASES.keys()), ['small', 'medium'], ['xarray', 'blockwise'])
+    param_names = ['case', 'grid', 'engine']
+    timeout = 600
+
+    def setup(self, case, grid, engine):
+        input_frequency, self.output_frequency, steps = CASES[case]
+        nlat, nlon = GRIDS[grid]
+
+        time = pd.date_range('2000-01-01', periods=steps, freq=input_frequency)
+        data = np.random.default_rng(0).random((steps, nlat, nlon), dtype='float32')
+        self.ds = xr.Dataset(dict(tas=(('time', 'lat', 'lon'), data)), coords=dict(time=time)).chunk(time=100)
+
+    def _resample(self, engine):
+        if engine == 'blockwise':
+            return adu.resample_mean(self.ds, self.output_frequency)
+
+        return self.ds.resample(time=self.output_frequency, label='left').mean()
+
+    def time_resample(self, case, grid, engine):
+        self._resample(engine).compute()
+
+    def time_graph(self, case, grid, engine):
+        self._resample(engine).__dask_graph__()
+
+    def track_tasks(self, case, grid, engine):
+        return len(self._resample(engine).__dask_graph__())
@@ -0,0 +1,75 @@
+"""Benchmarks for applying metadata schemas.
+
+Run directly for a quick comparison of the compiled schema plan against the previous implementation:
+
+    $ python -m benchmarks.bench_schema
+"""
+import timeit
+import numpy as np
+import xarray as xr
+import axiom.utilities as au
+import axiom.schemas as axs
+
+
+def apply_schema_legacy(ds, schema):
+    """Apply a schema one attribute at a time (the implementation prior to compiled schema plans).
+
+    Args:
+        ds (xarray.Dataset): Dataset.
+        schema (dict): Axiom schema dictionary.
+
+    Returns:
+        xarray.Dataset : Dataset with schema-defined metadata applied.
+    """
+    for key, _schema in schema['_global'].items():
+        if 'allowed' in _schema.keys():
+            ds.attrs[key] = _schema['allowed'][0]
+
+    for variable in list(ds.data_vars.keys()) + list(ds.coords.keys()):
+        if variable in schema['variables'].keys():
+            var_schema = schema['variables'][variable]
+            for key, _schema in var_schema.items():
+                if 'allowed' in _schema.keys():
+                    ds[variable].attrs[key] = _schema['allowed'][0]
+
+    return ds
+
+
+class ApplySchema:
+
+    """Apply the default CORDEX schema to a small dataset with several variables."""
+
+    params = ['CORDEX', 'CORDEX-CMIP6']
+    param_names = ['schema']
+
+    def setup(self, schema_key):
+        self.schema = axs.load_schema(schema_key)
+        self.plan = axs.load_attribute_maps(schema_key)
+
+        shape = (12, 10, 10)
+        self.ds = xr.Dataset(
+            {variable: (('time', 'lat', 'lon'), np.zeros(shape, dtype='float32')) for variable in ['tas', 'pr', 'ps', 'huss', 'uas', 'vas']},
+            coords=dict(time=np.arange(shape[0]), lat=np.linspace(-45, -10, shape[1]), lon=np.linspace(110, 155, shape[2]))
+        )
+
+    def time_apply_schema_legacy(self, schema_key):
+        apply_schema_legacy(self.ds, self.schema)
+
+    def time_apply_schema(self, schema_key):
+        au.apply_schema(self.ds, self.schema)
+
+    def time_apply_schema_plan(self, schema_key):
+        au.apply_schema_plan(self.ds, self.plan)
+
+
+if __name__ == '__main__':
+
+    for schema_key in ApplySchema.params:
+
+        benchmark = ApplySchema()
+        benchmark.setup(schema_key)
+
+        for method in ['time_apply_schema_legacy', 'time_apply_schema', 'time_apply_schema_plan']:
+            number = 200
+            seconds = min(timeit.repeat(lambda: getattr(benchmark, method)(schema_key), number=number, repeat=5)) / number
+            print(f'{schema_key:<15} {method:<28} {seconds * 1e6:10.1f} us')
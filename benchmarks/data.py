@@ -0,0 +1,110 @@
+"""Synthetic CCAM-like inputs for benchmarking."""
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+
+# Grid sizes (lat, lon) used across the benchmarks
+GRIDS = dict(
+    small=(50, 60),
+    medium=(100, 120)
+)
+
+
+def get_data_root():
+    """Get the directory in which to generate synthetic data, set AXIOM_BENCHMARK_DATA to keep it between runs.
+
+    Returns:
+        str : Directory.
+    """
+    return os.getenv('AXIOM_BENCHMARK_DATA', os.path.join(tempfile.gettempdir(), 'axiom_benchmark_data'))
+
+
+def make_ccam_dataset(year, month, nlat, nlon, variables=('tas', 'pr', 'ps'), freq='1H', seed=0):
+    """Make a month of synthetic CCAM output.
+
+    Args:
+        year (int): Year.
+        month (int): Month.
+        nlat (int): Number of latitudes.
+        nlon (int): Number of longitudes.
+        variables (tuple, optional): Variables. Defaults to ('tas', 'pr', 'ps').
+        freq (str, optional): Time frequency. Defaults to '1H'.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        xarray.Dataset : Dataset with time/lat/lon, lat_bnds/lon_bnds and a CCAM-style history attribute.
+    """
+    rng = np.random.default_rng(seed)
+
+    start = pd.Timestamp(year=year, month=month, day=1)
+    time = pd.date_range(start, start + pd.offsets.MonthBegin(1), freq=freq, inclusive='left')
+    lat = np.linspace(-45.0, -10.0, nlat)
+    lon = np.linspace(110.0, 155.0, nlon)
+    dlat, dlon = (lat[1] - lat[0]) / 2, (lon[1] - lon[0]) / 2
+
+    data = {
+        variable: (('time', 'lat', 'lon'), rng.random((len(time), nlat, nlon), dtype='float32'), dict(units='K', cell_methods='time: point'))
+        for variable in variables
+    }
+
+    data['lat_bnds'] = (('lat', 'bnds'), np.stack([lat - dlat, lat + dlat], axis=1))
+    data['lon_bnds'] = (('lon', 'bnds'), np.stack([lon - dlon, lon + dlon], axis=1))
+
+    return xr.Dataset(
+        data,
+        coords=dict(time=time, lat=lat, lon=lon),
+        attrs=dict(history='Created on 2022-01-10 by ccam')
+    )
+
+
+def make_ccam_inputs(grid='small', num_files=2, res_km=10, start_year=2000, variables=('tas', 'pr', 'ps'), per_variable=False, root=None):
+    """Generate (or reuse) monthly synthetic CCAM files.
+
+    Multi-variable files are named surf.ccam_<res>km.YYYYMM.nc, per-variable files <variable>_ccam_<res>km.YYYYMM.nc.
+
+    Args:
+        grid (str, optional): Grid size key from GRIDS. Defaults to 'small'.
+        num_files (int, optional): Number of monthly files. Defaults to 2.
+        res_km (int, optional): Resolution in the filenames. Defaults to 10.
+        start_year (int, optional): First year. Defaults to 2000.
+        variables (tuple, optional): Variables. Defaults to ('tas', 'pr', 'ps').
+        per_variable (bool, optional): Write a file per variable. Defaults to False.
+        root (str, optional): Output directory. Defaults to None (see get_data_root).
+
+    Returns:
+        list : Sorted list of filepaths.
+    """
+    nlat, nlon = GRIDS[grid]
+    layout = 'per_variable' if per_variable else 'multi_variable'
+    root = root or get_data_root()
+    directory = os.path.join(root, f'{grid}_{num_files}_{layout}')
+    os.makedirs(directory, exist_ok=True)
+
+    filepaths = list()
+    for ix in range(num_files):
+
+        year, month = start_year + ix // 12, ix % 12 + 1
+        yyyymm = f'{year}{month:02d}'
+
+        if per_variable:
+            expected = [os.path.join(directory, f'{variable}_ccam_{res_km}km.{yyyymm}.nc') for variable in variables]
+        else:
+            expected = [os.path.join(directory, f'surf.ccam_{res_km}km.{yyyymm}.nc')]
+
+        filepaths += expected
+
+        if all(os.path.isfile(filepath) for filepath in expected):
+            continue
+
+        ds = make_ccam_dataset(year, month, nlat, nlon, variables=variables, seed=ix)
+
+        if per_variable:
+            for variable, filepath in zip(variables, expected):
+                ds[[variable, 'lat_bnds', 'lon_bnds']].to_netcdf(filepath)
+        else:
+            ds.to_netcdf(expected[0])
+
+    return sorted(filepaths)
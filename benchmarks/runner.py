@@ -0,0 +1,168 @@
+"""Run the benchmarks without asv, each in a fresh process, recording the time or peak memory of the benchmark body."""
+import argparse
+import importlib
+import inspect
+import itertools
+import json
+import multiprocessing
+import pkgutil
+import time
+import tracemalloc
+import benchmarks
+
+
+def discover(pattern=None):
+    """Discover the benchmark methods (time_* and peakmem_*) of the classes in the bench_* modules.
+
+    Args:
+        pattern (str, optional): Only include benchmarks with this string in their name. Defaults to None.
+
+    Returns:
+        list : List of (module name, class name, method name, params) tuples.
+    """
+    discovered = list()
+
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+
+        if not module_info.name.startswith('bench_'):
+            continue
+
+        module_name = f'benchmarks.{module_info.name}'
+        module = importlib.import_module(module_name)
+
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+
+            if cls.__module__ != module_name:
+                continue
+
+            params = getattr(cls, 'params', [])
+
+            # A single parameter list is allowed by asv
+            if params and not isinstance(params[0], (list, tuple)):
+                params = [params]
+
+            for method_name in [name for name in dir(cls) if name.startswith(('time_', 'peakmem_'))]:
+
+                name = f'{module_info.name}.{class_name}.{method_name}'
+                if pattern and pattern not in name:
+                    continue
+
+                for combination in itertools.product(*params):
+                    discovered.append((module_name, class_name, method_name, combination))
+
+    return discovered
+
+
+def _read_status(key):
+    """Read a memory figure from /proc/self/status, i.e. VmRSS or VmHWM (the peak RSS), in bytes."""
+    with open('/proc/self/status', 'r') as status:
+        for line in status:
+            if line.startswith(f'{key}:'):
+                return int(line.split()[1]) * 1024
+
+    raise OSError(f'{key} not found in /proc/self/status.')
+
+
+def measure_peak_memory(func, *args):
+    """Measure the peak memory of a call above the memory in use before it, so that setup is not included.
+
+    On Linux the peak RSS is reset before the call (through /proc/self/clear_refs). Elsewhere, the peak of the
+    allocations traced by tracemalloc is used instead, which includes numpy but not C libraries such as HDF5.
+
+    Args:
+        func (callable): Function to call.
+        *args: Arguments to the function.
+
+    Returns:
+        int : Peak memory in bytes.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        before = _read_status('VmRSS')
+
+    except OSError:
+        tracemalloc.start()
+        try:
+            func(*args)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    func(*args)
+    return max(0, _read_status('VmHWM') - before)
+
+
+def _run(module_name, class_name, method_name, params, queue):
+    """Run a single benchmark, in its own process."""
+    cls = getattr(importlib.import_module(module_name), class_name)
+    instance = cls()
+
+    if hasattr(instance, 'setup'):
+        instance.setup(*params)
+
+    method = getattr(instance, method_name)
+    result = dict()
+
+    # Only the body is measured, as asv does
+    if method_name.startswith('peakmem_'):
+        result['peak_memory'] = measure_peak_memory(method, *params)
+    else:
+        start = time.perf_counter()
+        method(*params)
+        result['seconds'] = time.perf_counter() - start
+
+    if hasattr(instance, 'teardown'):
+        instance.teardown(*params)
+
+    queue.put(result)
+
+
+def run(pattern=None):
+    """Run the benchmarks, each in a fresh process so that the memory is attributable.
+
+    Args:
+        pattern (str, optional): Only include benchmarks with this string in their name. Defaults to None.
+
+    Returns:
+        list : List of result dictionaries.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = list()
+
+    for module_name, class_name, method_name, params in discover(pattern):
+
+        queue = context.Queue()
+        process = context.Process(target=_run, args=(module_name, class_name, method_name, params, queue))
+        process.start()
+        process.join()
+
+        name = f'{module_name.split(".")[-1]}.{class_name}.{method_name}{list(params)}'
+        result = dict(name=name, seconds=None, peak_memory=None)
+
+        if process.exitcode == 0:
+            result.update(queue.get())
+            if result['peak_memory'] is not None:
+                print(f'{name:<70} {result["peak_memory"] / 1024 ** 2:10.1f} MB', flush=True)
+            else:
+                print(f'{name:<70} {result["seconds"]:10.3f} s', flush=True)
+        else:
+            print(f'{name:<70} failed', flush=True)
+
+        results.append(result)
+
+    return results
+
+
+def main():
+    """Command-line entrypoint (python -m benchmarks)."""
+    parser = argparse.ArgumentParser(description='Run the Axiom benchmarks.')
+    parser.add_argument('filter', type=str, nargs='?', default=None, help='Only run benchmarks with this string in their name.')
+    parser.add_argument('--output', type=str, default=None, help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    results = run(args.filter)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=4)